@@ -0,0 +1,128 @@
+"""Grouped expense totals computed in SQL for `GET /expenses/aggregate`.
+
+Queries that don't involve budgets read `expense_daily`, which holds one
+row per franchise, branch, day and category (see `app.rollups`), so the
+GROUP BY runs over a few thousand pre-summed rows instead of every
+expense. Grouping or filtering by budget falls back to `expenses`, grouped
+separately from `expenses_archive` and the two sets of groups added up.
+
+Time buckets are rendered as strings by the database (`2025-05-12` for a
+day or the Monday starting a week, `2025-05` for a month) so every
+dialect returns the same keys. Results come back column-oriented: one
+list per group key plus `count` and `total`, all the same length.
+"""
+from datetime import date
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.models.budget import Expense
+from app.models.rollup import ExpenseDaily
+from app.periods import with_archive
+from app.rollups import NO_BRANCH
+
+GROUP_KEYS = ("day", "week", "month", "category", "franchise", "branch", "budget")
+
+
+def _bucket(dialect: str, unit: str, column):
+    if dialect == "postgresql":
+        if unit == "week":
+            return func.to_char(func.date_trunc("week", column), "YYYY-MM-DD")
+        return func.to_char(column, "YYYY-MM-DD" if unit == "day" else "YYYY-MM")
+    if unit == "week":
+        # Monday on or before the date, matching date_trunc('week')
+        return func.date(column, "-6 days", "weekday 1")
+    return func.strftime("%Y-%m-%d" if unit == "day" else "%Y-%m", column)
+
+
+def _daily_columns() -> dict:
+    return {
+        "date": ExpenseDaily.day,
+        "category": ExpenseDaily.category,
+        "franchise": ExpenseDaily.franchise_id,
+        "branch": func.nullif(ExpenseDaily.branch_id, NO_BRANCH),
+        "branch_filter": ExpenseDaily.branch_id,
+        "count": func.coalesce(func.sum(ExpenseDaily.expense_count), 0),
+        "total": func.coalesce(func.sum(ExpenseDaily.total_amount), 0),
+    }
+
+
+def _expense_columns(model=Expense) -> dict:
+    return {
+        "date": model.date,
+        "category": model.category,
+        "franchise": model.franchise_id,
+        "branch": model.branch_id,
+        "branch_filter": model.branch_id,
+        "budget": model.budget_id,
+        "count": func.count(),
+        "total": func.coalesce(func.sum(model.amount), 0),
+    }
+
+
+def parse_group_by(group_by: Optional[str]) -> list[str]:
+    keys = [k.strip() for k in (group_by or "").split(",") if k.strip()]
+    unknown = [k for k in keys if k not in GROUP_KEYS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot group by {', '.join(unknown)}; choose from {', '.join(GROUP_KEYS)}",
+        )
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail="group_by lists a key twice")
+    return keys
+
+
+def aggregate_expenses(
+    db: Session,
+    group_by: list[str],
+    franchise_ids: Optional[list[int]] = None,
+    branch_id: Optional[int] = None,
+    budget_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> dict:
+    """Count and sum expenses per combination of `group_by` keys; dates are inclusive."""
+    dialect = db.get_bind().dialect.name
+
+    def grouped(cols: dict):
+        keys = []
+        for k in group_by:
+            expr = _bucket(dialect, k, cols["date"]) if k in ("day", "week", "month") else cols[k]
+            keys.append(expr.label(k))
+        stmt = select(*keys, cols["count"].label("count"), cols["total"].label("total"))
+        if franchise_ids:
+            stmt = stmt.where(cols["franchise"].in_(franchise_ids))
+        if branch_id is not None:
+            stmt = stmt.where(cols["branch_filter"] == branch_id)
+        if budget_id is not None:
+            stmt = stmt.where(cols["budget"] == budget_id)
+        if date_from is not None:
+            stmt = stmt.where(cols["date"] >= date_from)
+        if date_to is not None:
+            stmt = stmt.where(cols["date"] <= date_to)
+        return stmt.group_by(*keys) if keys else stmt, keys
+
+    by_budget = budget_id is not None or "budget" in group_by
+    if by_budget:
+        groups = with_archive(lambda model: grouped(_expense_columns(model))[0])
+        keys = [groups.c[k] for k in group_by]
+        stmt = select(*keys, func.sum(groups.c.count), func.sum(groups.c.total))
+        if keys:
+            stmt = stmt.group_by(*keys)
+    else:
+        cols = _daily_columns()
+        stmt, keys = grouped(cols)
+        # days whose expenses were all deleted leave rows with a zero count
+        stmt = stmt.having(cols["count"] > 0)
+    if keys:
+        stmt = stmt.order_by(*keys)
+
+    rows = db.execute(stmt).all()
+    if not keys and not rows:
+        # HAVING removed the single ungrouped row; report zeros like the expenses query does
+        rows = [(0, 0)]
+    columns = {k: [row[i] for row in rows] for i, k in enumerate(group_by)}
+    columns["count"] = [int(row[-2]) for row in rows]
+    columns["total"] = [float(row[-1]) for row in rows]
+    return {"group_by": group_by, "rows": len(rows), "columns": columns}
@@ -0,0 +1,80 @@
+"""One-time startup work that must not race between worker processes.
+
+`serve.py` (and the gunicorn `on_starting` hook) run `prepare_database` once
+in the parent process, then set `SCHEMA_READY_ENV` so the workers only
+check that the schema is current. A bare `uvicorn main:app` still prepares
+the database from the app's startup hook, which is fine for a single
+process.
+
+With `DB_AUTO_MIGRATE=false`, nothing is migrated at startup and the app
+refuses to start until `python manage.py db upgrade` has been run.
+"""
+import os
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Engine
+from app.database.database import _env_flag, engine
+from app.users import ensure_default_users
+
+SCHEMA_READY_ENV = "APP_SCHEMA_READY"
+
+DB_AUTO_MIGRATE = _env_flag("DB_AUTO_MIGRATE", "true")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def migrate(revision: str = "head", bind: Engine | None = None) -> None:
+    config = alembic_config()
+    with (bind or engine).connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def schema_revisions(bind: Engine | None = None) -> tuple[str | None, str]:
+    """Return (revision the database is at, newest revision in migrations/)."""
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with (bind or engine).connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    return current, head
+
+
+def check_schema_current(bind: Engine | None = None) -> None:
+    current, head = schema_revisions(bind)
+    if current != head:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current or '(none)'} but the code expects {head}; "
+            "run `python manage.py db upgrade`"
+        )
+
+
+def prepare_database() -> None:
+    """Bring the schema to head (or verify it) and create the default users. Safe to run repeatedly."""
+    if DB_AUTO_MIGRATE:
+        migrate()
+    else:
+        check_schema_current()
+    ensure_default_users()
+
+
+def run_leader_step() -> None:
+    """Prepare the database in the parent, then hand a clean engine to the workers."""
+    prepare_database()
+    engine.dispose()
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+
+def schema_ready() -> bool:
+    return os.getenv(SCHEMA_READY_ENV) == "1"
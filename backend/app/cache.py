@@ -0,0 +1,219 @@
+"""Read-through response cache for hot GET endpoints.
+
+Entries are the serialized JSON body plus its ETag, stored under the route
+path and query string and tagged with the resources they were built from.
+Write handlers call `response_cache.invalidate(...)` with the same tags
+after committing.
+
+The default backend is an in-process LRU with a TTL. Set
+`CACHE_BACKEND=redis` (and `CACHE_URL`) to share entries and invalidations
+between worker processes, or `CACHE_BACKEND=none` to disable caching.
+With more than one worker (`WEB_CONCURRENCY`) the in-process backend is
+turned off, since a write would only invalidate the worker that made it.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+from fastapi import Request, Response
+from app.database.database import run_blocking
+from app.lean import dumps
+from app.pagination import NEXT_CURSOR_HEADER
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_URL = os.getenv("CACHE_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+# Set by gunicorn.conf.py / serve.py before the app is imported
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+logger = logging.getLogger(__name__)
+
+# Response headers replayed from the cache along with the body
+CACHED_HEADERS = (NEXT_CURSOR_HEADER,)
+
+
+class MemoryCache:
+    """Thread-safe LRU with per-entry expiry and a tag -> keys index."""
+
+    # calls never wait on I/O
+    blocking = False
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, bytes, tuple]] = OrderedDict()
+        self._tags: dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, _ = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, tags: Iterable[str]) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def invalidate(self, *tags: str) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCache:
+    """Same interface as `MemoryCache`, backed by any Redis-compatible server."""
+
+    # every call is a network round trip
+    blocking = True
+
+    def __init__(self, url: str = CACHE_URL, ttl: int = CACHE_TTL_SECONDS, prefix: str = "respcache:"):
+        import redis  # optional dependency, only needed for CACHE_BACKEND=redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, tags: Iterable[str]) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=self.ttl)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe.sadd(tag_key, self.prefix + key)
+            pipe.expire(tag_key, self.ttl)
+        pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            keys = self.client.smembers(tag_key)
+            self.client.delete(tag_key, *keys)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self) -> int:
+        return sum(1 for k in self.client.scan_iter(f"{self.prefix}*") if b":tag:" not in k)
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(request: Request) -> str:
+        return request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+
+    def serve(self, request: Request, response: Response, tags: Iterable[str], build: Callable) -> Response:
+        """Return the cached body for `request`, or call `build()` and cache its result.
+
+        Headers that `build` sets on `response` (e.g. the next-page cursor)
+        are stored with the body. Answers 304 when the client's
+        `If-None-Match` matches.
+        """
+        if self.backend is None:
+            return build()
+        key = self.key_for(request)
+        packed = self._call(self.backend.get, key)
+        if packed is not None:
+            self.hits += 1
+            meta, body = packed.split(b"\n", 1)
+            meta = json.loads(meta)
+        else:
+            self.misses += 1
+            body = dumps(build())
+            meta = {
+                "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+                "headers": {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers},
+            }
+            self._call(self.backend.set, key, json.dumps(meta).encode() + b"\n" + body, tags)
+
+        headers = {**meta["headers"], "ETag": meta["etag"], "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == meta["etag"]:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *tags: str) -> None:
+        if self.backend is not None:
+            self._call(self.backend.invalidate, *tags)
+
+    def _call(self, method, *args):
+        # keeps Redis round trips off the event loop under DB_ASYNC
+        return run_blocking(method, *args) if self.backend.blocking else method(*args)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "entries": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else None,
+        }
+
+
+def build_backend(name: str = CACHE_BACKEND, workers: int = WEB_CONCURRENCY):
+    if name == "none":
+        return None
+    if name == "redis":
+        return RedisCache()
+    if workers > 1:
+        logger.warning("Response cache disabled: the memory backend can't invalidate across %d workers; "
+                       "set CACHE_BACKEND=redis to cache", workers)
+        return None
+    return MemoryCache()
+
+
+response_cache = ResponseCache(build_backend())
@@ -0,0 +1,273 @@
+"""Change feed behind `GET /events`: franchise, branch, budget and expense writes as deltas.
+
+Handlers call `record_change` before committing. A session hook writes
+the pending changes to the `changes` table inside the same transaction,
+so a change becomes visible together with the write. On PostgreSQL a
+transaction-level advisory lock taken just before the insert keeps `seq`
+in commit order; SQLite has a single writer anyway.
+
+`feed` fans new changes out to this process's streams. One poller task
+reads `changes` after the last sequence number it has seen. A commit in
+this process wakes it at once; otherwise it polls every
+`EVENTS_POLL_SECONDS`, which is how changes made by other workers (or
+by `manage.py`) arrive. Each change is encoded once and queued for every
+stream subscribed to its franchise, so an open dashboard costs no
+queries of its own.
+
+A client that reconnects with `Last-Event-ID` first gets the changes it
+missed, read from the table. Changes older than `EVENTS_RETENTION_HOURS`
+are pruned; a client further behind than that gets a `reset` event and
+should refetch.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+from app.database.database import engine
+from app.expand import BASE_SCHEMAS
+from app.lean import dumps
+from app.models.change import Change
+
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", "1"))
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+EVENTS_MAX_STREAM_SECONDS = float(os.getenv("EVENTS_MAX_STREAM_SECONDS", "300"))
+EVENTS_RETENTION_HOURS = float(os.getenv("EVENTS_RETENTION_HOURS", "24"))
+
+# Changes a stream may have waiting before it is closed; its client resumes from the table
+QUEUE_SIZE = 1000
+# Rows per query when polling or replaying
+READ_BATCH = 1000
+PRUNE_INTERVAL_SECONDS = 600
+# pg_advisory_xact_lock key that orders change writes
+LOCK_KEY = 0x6368616E
+
+CREATED, UPDATED, DELETED = "created", "updated", "deleted"
+
+_PENDING = "pending_changes"
+_WRITTEN = "changes_written"
+
+logger = logging.getLogger(__name__)
+
+
+def record_change(db: Session, entity: str, op: str, target) -> None:
+    """Publish a change to `target` (a model instance or a dict of its response fields) when `db` commits."""
+    if op == DELETED and not isinstance(target, dict):
+        # deleted instances may be expired by the time the hook runs
+        target = {"id": target.id, "franchise_id": target.id if entity == "franchise" else target.franchise_id}
+    db.info.setdefault(_PENDING, []).append((entity, op, target))
+
+
+def _row(entity: str, op: str, target, now: datetime) -> dict:
+    data = target if isinstance(target, dict) else BASE_SCHEMAS[type(target)].model_validate(target).model_dump()
+    return {
+        "franchise_id": data["id"] if entity == "franchise" else data["franchise_id"],
+        "entity": entity,
+        "op": op,
+        "entity_id": data["id"],
+        "data": None if op == DELETED else dumps(data).decode(),
+        "created_at": now,
+    }
+
+
+@event.listens_for(Session, "before_commit")
+def _write_changes(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    # new rows need their ids
+    session.flush()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    rows = [_row(entity, op, target, now) for entity, op, target in pending]
+    conn = session.connection()
+    if conn.dialect.name == "postgresql":
+        # held until commit, so a later sequence number never commits first
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+    conn.execute(insert(Change), rows)
+    session.info[_WRITTEN] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _announce(session: Session) -> None:
+    if session.info.pop(_WRITTEN, False):
+        feed.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+    session.info.pop(_WRITTEN, None)
+
+
+class FeedChange(NamedTuple):
+    seq: int
+    franchise_id: int
+    frame: str  # the encoded SSE event
+
+
+def _frame(seq, franchise_id, entity, op, entity_id, data) -> str:
+    payload = (
+        f'{{"seq":{seq},"franchise_id":{franchise_id},"entity":"{entity}",'
+        f'"op":"{op}","id":{entity_id},"data":{data or "null"}}}'
+    )
+    return f"id: {seq}\nevent: change\ndata: {payload}\n\n"
+
+
+def control_frame(name: str, seq: int) -> str:
+    return f'id: {seq}\nevent: {name}\ndata: {{"seq":{seq}}}\n\n'
+
+
+def read_changes(after: int, franchise_ids: Optional[list[int]] = None, upto: Optional[int] = None) -> list[FeedChange]:
+    """Up to `READ_BATCH` changes after sequence number `after`, oldest first."""
+    stmt = (
+        select(Change.seq, Change.franchise_id, Change.entity, Change.op, Change.entity_id, Change.data)
+        .where(Change.seq > after)
+        .order_by(Change.seq)
+        .limit(READ_BATCH)
+    )
+    if franchise_ids:
+        stmt = stmt.where(Change.franchise_id.in_(franchise_ids))
+    if upto is not None:
+        stmt = stmt.where(Change.seq <= upto)
+    with engine.connect() as conn:
+        return [FeedChange(row[0], row[1], _frame(*row)) for row in conn.execute(stmt)]
+
+
+def seq_bounds() -> tuple[Optional[int], int]:
+    """Oldest retained and newest sequence numbers (0 when nothing was ever recorded)."""
+    with engine.connect() as conn:
+        oldest, newest = conn.execute(select(func.min(Change.seq), func.max(Change.seq))).one()
+    return oldest, newest or 0
+
+
+def prune_changes(retention_hours: float = EVENTS_RETENTION_HOURS) -> int:
+    """Delete changes older than the retention window; the newest one is always kept."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=retention_hours)
+    with engine.begin() as conn:
+        newest = select(func.max(Change.seq)).scalar_subquery()
+        return conn.execute(delete(Change).where(Change.created_at < cutoff, Change.seq < newest)).rowcount
+
+
+class Subscription:
+    __slots__ = ("franchise_ids", "queue", "closed")
+
+    def __init__(self, franchise_ids: Optional[list[int]]):
+        self.franchise_ids = set(franchise_ids) if franchise_ids else None
+        self.queue: asyncio.Queue = asyncio.Queue(QUEUE_SIZE)
+        # set when the stream fell QUEUE_SIZE changes behind
+        self.closed = False
+
+
+class ChangeFeed:
+    """Polls `changes` and queues each new change for the streams that want it."""
+
+    def __init__(self):
+        self.last_seq = 0
+        self._subscribers: set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pruned_at = 0.0
+
+    def notify(self) -> None:
+        """Wake the poller now; safe from any thread."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    async def subscribe(self, franchise_ids: Optional[list[int]]) -> tuple[Subscription, int]:
+        """Register a stream; returns it and the sequence number its live changes start after."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop, self._wake, self._ready = loop, asyncio.Event(), asyncio.Event()
+            self._task = loop.create_task(self._run())
+        await self._ready.wait()
+        subscription = Subscription(franchise_ids)
+        self._subscribers.add(subscription)
+        return subscription, self.last_seq
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _dispatch(self, changes: list[FeedChange]) -> None:
+        for change in changes:
+            for subscription in list(self._subscribers):
+                if subscription.franchise_ids is not None and change.franchise_id not in subscription.franchise_ids:
+                    continue
+                try:
+                    subscription.queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    subscription.closed = True
+                    self._subscribers.discard(subscription)
+            self.last_seq = change.seq
+
+    async def _run(self) -> None:
+        _, self.last_seq = await run_in_threadpool(seq_bounds)
+        self._ready.set()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), EVENTS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._subscribers:
+                return
+            try:
+                while True:
+                    changes = await run_in_threadpool(read_changes, self.last_seq)
+                    self._dispatch(changes)
+                    if len(changes) < READ_BATCH:
+                        break
+                if time.monotonic() - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+                    self._pruned_at = time.monotonic()
+                    await run_in_threadpool(prune_changes)
+            except Exception:
+                # a database hiccup must not end every stream; the next poll retries
+                logger.exception("Reading the change feed failed")
+
+
+feed = ChangeFeed()
+
+
+async def event_stream(franchise_ids: Optional[list[int]], last_event_id: Optional[int]):
+    """SSE frames for one `GET /events` connection: missed changes, `ready` (or `reset`), then live ones."""
+    subscription, upto = await feed.subscribe(franchise_ids)
+    try:
+        sent = upto
+        if last_event_id is None:
+            yield control_frame("ready", sent)
+        else:
+            oldest, newest = await run_in_threadpool(seq_bounds)
+            if last_event_id > max(newest, upto) or (oldest is not None and last_event_id < oldest - 1):
+                yield control_frame("reset", sent)
+            else:
+                after = last_event_id
+                while after < upto:
+                    changes = await run_in_threadpool(read_changes, after, franchise_ids, upto)
+                    for change in changes:
+                        yield change.frame
+                    after = changes[-1].seq if len(changes) == READ_BATCH else upto
+                sent = max(last_event_id, upto)
+                yield control_frame("ready", sent)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENTS_MAX_STREAM_SECONDS
+        while not subscription.closed:
+            timeout = min(EVENTS_KEEPALIVE_SECONDS, deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if change.seq > sent:
+                sent = change.seq
+                yield change.frame
+    finally:
+        feed.unsubscribe(subscription)
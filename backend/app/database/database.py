@@ -1,17 +1,77 @@
+import asyncio
 import os
-from sqlalchemy import create_engine
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.util import await_only
+from app.database.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
 
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "sqlite:///./franchise_db.db"
-)
 
-# Use check_same_thread=False for SQLite (development only)
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+# The development database, checked into git
+DEFAULT_DATABASE_URL = "sqlite:///./franchise_db.db"
+DATABASE_URL = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+# Serve routes through AsyncSession instead of the threadpool (see app.routes.async_support)
+DB_ASYNC = _env_flag("DB_ASYNC", "false")
+
+# Async drivers used when DB_ASYNC is enabled
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+# Connection pool sizing; size workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) against the server's connection limit
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "true")
+
+# SQLite tuning applied to every new connection. WAL is off by default for the
+# git-tracked dev database: its recent writes would sit in an untracked -wal file
+SQLITE_WAL = _env_flag("SQLITE_WAL", "false" if DATABASE_URL == DEFAULT_DATABASE_URL else "true")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def _apply_sqlite_pragmas(dbapi_connection, wal: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    # journal_mode is stored in the file, so a database that was once in WAL mode is switched back explicitly
+    cursor.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _pool_options(poolclass) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def build_engine(url: str = DATABASE_URL, sqlite_wal: bool = SQLITE_WAL):
+    # Use check_same_thread=False for SQLite (development only)
+    if url.startswith("sqlite"):
+        new_engine = create_engine(url, connect_args={"check_same_thread": False}, **_pool_options(InstrumentedQueuePool))
+        event.listen(new_engine, "connect", lambda conn, _: _apply_sqlite_pragmas(conn, sqlite_wal))
+    else:
+        new_engine = create_engine(url, **_pool_options(InstrumentedQueuePool))
+    return new_engine
+
+
+engine = build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -23,3 +83,80 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(hide_password=False)
+
+
+_async_sessionmaker = None
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Create the async engine on first use so sync-only deployments never need the async drivers."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        if DATABASE_URL.startswith("sqlite"):
+            # aiosqlite runs each connection on its own non-daemon thread; the
+            # dialect's default pool closes them instead of keeping them alive
+            async_engine = create_async_engine(async_database_url())
+            event.listen(async_engine.sync_engine, "connect", lambda conn, _: _apply_sqlite_pragmas(conn, SQLITE_WAL))
+        else:
+            async_engine = create_async_engine(async_database_url(), **_pool_options(InstrumentedAsyncQueuePool))
+        from app.metrics import METRICS_ENABLED, instrument_engine
+        if METRICS_ENABLED:
+            instrument_engine(async_engine.sync_engine)
+        _async_sessionmaker = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False)
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def run_blocking(fn, *args, **kwargs):
+    """Call `fn`, a blocking function that doesn't use the session, from a sync handler.
+
+    With `DB_ASYNC` the handler runs inside `AsyncSession.run_sync` on the
+    event loop, so `fn` is sent to the threadpool and the loop keeps
+    serving other requests meanwhile. Elsewhere the handler is already on
+    a worker thread and `fn` is simply called.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return fn(*args, **kwargs)
+    return await_only(run_in_threadpool(fn, *args, **kwargs))
+
+
+def pool_status() -> dict:
+    status = {"sync": engine.pool.snapshot()}
+    if _async_sessionmaker is not None:
+        async_pool = _async_sessionmaker.kw["bind"].sync_engine.pool
+        if hasattr(async_pool, "snapshot"):
+            status["async"] = async_pool.snapshot()
+    return status
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection; for SQLite in WAL mode this checkpoints the WAL into the database file."""
+    engine.dispose()
+    if _async_sessionmaker is not None:
+        await _async_sessionmaker.kw["bind"].dispose()
+
+
+def dispose_engines_after_fork() -> None:
+    """Forget pooled connections inherited from a parent process.
+
+    `close=False` leaves the sockets to the parent; the child opens its own
+    on first checkout.
+    """
+    engine.dispose(close=False)
+    if _async_sessionmaker is not None:
+        _async_sessionmaker.kw["bind"].sync_engine.dispose(close=False)
+
+
+# Covers gunicorn's preloaded workers and any other fork of a process that already used the engine
+os.register_at_fork(after_in_child=dispose_engines_after_fork)
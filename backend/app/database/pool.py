@@ -0,0 +1,65 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolStats:
+    """Counters for connection checkouts, including time spent waiting for a free slot."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.overflow_high_water = 0
+
+    def record(self, waited: float, overflow: int, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.overflow_high_water = max(self.overflow_high_water, overflow)
+
+
+class _InstrumentedPoolMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, max(self.overflow(), 0), timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start, max(self.overflow(), 0))
+        return conn
+
+    def snapshot(self) -> dict:
+        s = self.stats
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow_in_use": max(self.overflow(), 0),
+            "overflow_high_water": s.overflow_high_water,
+            "checkouts_total": s.checkouts,
+            "checkout_timeouts_total": s.timeouts,
+            "checkout_wait_seconds_total": round(s.wait_seconds_total, 6),
+            "checkout_wait_seconds_max": round(s.wait_seconds_max, 6),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
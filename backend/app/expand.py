@@ -0,0 +1,70 @@
+"""`expand=` support: eager-load requested relationships and nest them in the response.
+
+Collections are loaded with `selectinload` (one extra query per relationship)
+and many-to-one references with `joinedload` (no extra query), so a page
+costs a fixed number of queries whatever its size. Relationships that were
+not requested are never touched, so they are not lazy-loaded row by row.
+"""
+from fastapi import HTTPException
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import Branch, Budget, Expense, Franchise
+from app.schemas.branch import BranchResponse
+from app.schemas.budget import BudgetResponse, ExpenseResponse
+from app.schemas.franchise import FranchiseResponse
+
+# relationship name -> (loader, schema of the nested object)
+EXPANSIONS = {
+    Franchise: {
+        "branches": (selectinload, BranchResponse),
+    },
+    Branch: {
+        "franchise": (joinedload, FranchiseResponse),
+    },
+    Budget: {
+        "franchise": (joinedload, FranchiseResponse),
+        "branch": (joinedload, BranchResponse),
+    },
+    Expense: {
+        "budget": (joinedload, BudgetResponse),
+        "franchise": (joinedload, FranchiseResponse),
+        "branch": (joinedload, BranchResponse),
+    },
+}
+
+BASE_SCHEMAS = {
+    Franchise: FranchiseResponse,
+    Branch: BranchResponse,
+    Budget: BudgetResponse,
+    Expense: ExpenseResponse,
+}
+
+
+def parse_expand(model, expand: str | None) -> list[str]:
+    if not expand:
+        return []
+    fields = [f.strip() for f in expand.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in EXPANSIONS[model]]
+    if unknown:
+        allowed = ", ".join(EXPANSIONS[model])
+        raise HTTPException(status_code=400, detail=f"Cannot expand {', '.join(unknown)}; allowed: {allowed}")
+    return fields
+
+
+def expand_options(model, fields: list[str], entity=None) -> list:
+    """Loader options for `fields`; pass `entity` when querying an alias of `model`."""
+    entity = entity if entity is not None else model
+    return [EXPANSIONS[model][f][0](getattr(entity, f)) for f in fields]
+
+
+def serialize(obj, fields: list[str]) -> dict:
+    """Dump `obj` with its base response schema plus the expanded relationships."""
+    model = type(obj)
+    data = BASE_SCHEMAS[model].model_validate(obj).model_dump()
+    for field in fields:
+        schema = EXPANSIONS[model][field][1]
+        value = getattr(obj, field)
+        if isinstance(value, list):
+            data[field] = [schema.model_validate(v).model_dump() for v in value]
+        else:
+            data[field] = schema.model_validate(value).model_dump() if value is not None else None
+    return data
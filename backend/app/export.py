@@ -0,0 +1,66 @@
+import csv
+import enum
+import io
+import json
+from decimal import Decimal
+from datetime import date, datetime
+from typing import Iterator
+from fastapi.responses import StreamingResponse
+from app.database.database import SessionLocal
+
+# Rows fetched per round trip; bounds memory regardless of export size
+EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def stream_rows(statement, columns: list[str], fmt: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield `statement` rows encoded as NDJSON lines or CSV, one chunk at a time.
+
+    The statement runs on its own session with `yield_per`, which uses a
+    server-side cursor where the driver supports one, so only `chunk_size`
+    rows are ever held in memory.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=chunk_size))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for chunk in result.partitions():
+                writer.writerows([[_plain(v) for v in row] for row in chunk])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            for chunk in result.partitions():
+                yield "".join(
+                    json.dumps({c: _plain(v) for c, v in zip(columns, row)}) + "\n"
+                    for row in chunk
+                )
+    finally:
+        db.close()
+
+
+def export_response(statement, columns: list[str], fmt: str, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        stream_rows(statement, columns, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,135 @@
+"""`Idempotency-Key` support for the create endpoints.
+
+Clients that retry a create after a timeout send the same key again. The
+retry gets back the response the first attempt committed, with
+`Idempotent-Replayed: true`. It is answered before the handler does
+anything else, so no second expense is created and the budget row is
+never touched. Reusing a key with a different body is a 422.
+
+The response is stored in `idempotency_keys` in the same transaction as
+the create, so it exists exactly when the create does. A concurrent
+request with the same key fails on the primary key at commit, rolls back,
+and replays the winner's response. Recent keys are also kept in an
+in-process LRU, so a retry to the same worker costs no query. Keys
+expire after `IDEMPOTENCY_TTL_HOURS`, and expired rows are pruned as new
+ones are written.
+"""
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Request, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.cache import MemoryCache
+from app.models.idempotency import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+PRUNE_INTERVAL_SECONDS = 600
+
+# key id -> (fingerprint, status code, body, created_at)
+_recent = MemoryCache(max_entries=IDEMPOTENCY_CACHE_SIZE, ttl=int(IDEMPOTENCY_TTL_HOURS * 3600))
+_pruned_at = 0.0
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class IdempotentRequest:
+    """One create request's key and body fingerprint; without a key, `replay` and `commit` change nothing."""
+
+    def __init__(self, key_id: Optional[str], fingerprint: str = ""):
+        self.key_id = key_id
+        self.fingerprint = fingerprint
+        self._expired = False
+
+    def replay(self, db: Session) -> Optional[Response]:
+        """The stored response for this key, or None if the request is new."""
+        if self.key_id is None:
+            return None
+        stored = _recent.get(self.key_id)
+        if stored is None:
+            row = db.execute(
+                select(IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response, IdempotencyKey.created_at)
+                .where(IdempotencyKey.id == self.key_id)
+            ).first()
+            if row is None:
+                return None
+            stored = (row[0], row[1], row[2].encode(), row[3])
+            _recent.set(self.key_id, stored, ())
+        fingerprint, status_code, body, created_at = stored
+        if created_at < _now() - timedelta(hours=IDEMPOTENCY_TTL_HOURS):
+            # the row is replaced when this request commits
+            self._expired = True
+            _recent.delete(self.key_id)
+            return None
+        if fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        return Response(body, status_code=status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+    def commit(self, db: Session, schema: type[BaseModel], result, status_code: int = 200) -> Optional[Response]:
+        """Commit `db`, storing `result` as `schema` returns it under the key.
+
+        If a concurrent request with the same key committed first, this
+        transaction is rolled back and that request's response returned.
+        """
+        if self.key_id is None:
+            db.commit()
+            return None
+        # new rows need their ids
+        db.flush()
+        body = schema.model_validate(result).model_dump_json().encode()
+        now = _now()
+        if self._expired:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.id == self.key_id))
+        try:
+            db.execute(insert(IdempotencyKey).values(
+                id=self.key_id, fingerprint=self.fingerprint, status_code=status_code, response=body.decode(), created_at=now,
+            ))
+            _prune(db, now)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            replayed = self.replay(db)
+            if replayed is None:
+                raise
+            return replayed
+        _recent.set(self.key_id, (self.fingerprint, status_code, body, now), ())
+        return None
+
+
+NO_KEY = IdempotentRequest(None)
+
+
+def _prune(db: Session, now: datetime) -> None:
+    global _pruned_at
+    if time.monotonic() - _pruned_at < PRUNE_INTERVAL_SECONDS:
+        return
+    _pruned_at = time.monotonic()
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < now - timedelta(hours=IDEMPOTENCY_TTL_HOURS)))
+
+
+def idempotent(route: str):
+    """Dependency giving a create handler its `IdempotentRequest`; keys are scoped to the user and `route`."""
+    # imported here because the route modules import this one
+    from app.routes.auth import verify_token
+
+    async def dependency(
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, min_length=1, max_length=MAX_KEY_LENGTH),
+        token: dict = Depends(verify_token),
+    ) -> IdempotentRequest:
+        if idempotency_key is None:
+            return NO_KEY
+        key_id = hashlib.sha256(f"{token['username']}\n{route}\n{idempotency_key}".encode()).hexdigest()
+        return IdempotentRequest(key_id, hashlib.sha256(await request.body()).hexdigest())
+
+    return dependency
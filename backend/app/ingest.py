@@ -0,0 +1,99 @@
+import json
+from collections import defaultdict
+from decimal import Decimal
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.cache import response_cache
+from app.changes import CREATED, record_change
+from app.idempotency import NO_KEY, IdempotentRequest
+from app.models.budget import Budget, Expense
+from app.periods import last_closed_period, period_of
+from app.rollups import post_actual, track_expenses
+from app.schemas.budget import ExpenseBulkResponse, ExpenseCreate, ExpenseResponse
+
+# Rows per executemany round trip
+BULK_BATCH_SIZE = 1000
+
+
+def parse_bulk_body(body: bytes, content_type: str) -> list:
+    """Split a request body into raw rows.
+
+    NDJSON bodies are parsed line by line so one malformed line only fails
+    that row; anything else must be a JSON array.
+    """
+    if "ndjson" in content_type:
+        rows = []
+        for line in body.decode().splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as exc:
+                rows.append(exc)
+        return rows
+    rows = json.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of expenses")
+    return rows
+
+
+def ingest_expenses(db: Session, rows: list, idempotency: IdempotentRequest = NO_KEY):
+    """Validate and insert expenses in batches, then bump each budget once.
+
+    Invalid rows are reported by index and skipped; the rest are committed
+    together. Returns the result, or the stored response when a concurrent
+    request with the same idempotency key committed first.
+    """
+    errors = []
+    valid = []
+    for index, row in enumerate(rows):
+        if isinstance(row, Exception):
+            errors.append({"index": index, "detail": f"Invalid JSON: {row}"})
+            continue
+        try:
+            valid.append((index, ExpenseCreate(**row)))
+        except (ValidationError, TypeError) as exc:
+            errors.append({"index": index, "detail": str(exc)})
+
+    budget_ids = {e.budget_id for _, e in valid if e.budget_id}
+    known_budgets = {}
+    if budget_ids:
+        known_budgets = {b.id: b for b in db.scalars(select(Budget).where(Budget.id.in_(budget_ids)))}
+
+    last_closed = last_closed_period(db)
+    inserted = []
+    actuals = defaultdict(Decimal)
+    for index, expense in valid:
+        if expense.budget_id and expense.budget_id not in known_budgets:
+            errors.append({"index": index, "detail": "Budget not found"})
+            continue
+        if last_closed:
+            budget = known_budgets.get(expense.budget_id)
+            closed = [p for p in (period_of(expense.date), budget and budget.period) if p and p <= last_closed]
+            if closed:
+                errors.append({"index": index, "detail": f"Period {min(closed)} is closed"})
+                continue
+        inserted.append(expense)
+        if expense.budget_id:
+            actuals[expense.budget_id] += Decimal(str(expense.amount))
+
+    values = [expense.dict() for expense in inserted]
+    returned = [getattr(Expense, name) for name in ExpenseResponse.model_fields]
+    for start in range(0, len(values), BULK_BATCH_SIZE):
+        # the rows come back whole, so their order doesn't matter
+        created = db.execute(insert(Expense).returning(*returned), values[start:start + BULK_BATCH_SIZE])
+        keys = list(created.keys())
+        for row in created:
+            record_change(db, "expense", CREATED, dict(zip(keys, row)))
+    # a fixed lock order keeps concurrent bulk posts from deadlocking on shared budgets
+    for budget_id in sorted(actuals):
+        post_actual(db, budget_id, actuals[budget_id])
+    track_expenses(db, inserted)
+    errors.sort(key=lambda e: e["index"])
+    result = {"inserted": len(values), "errors": errors}
+    replayed = idempotency.commit(db, ExpenseBulkResponse, result)
+    if replayed:
+        return replayed
+    response_cache.invalidate(*(f"budget:{budget_id}" for budget_id in actuals))
+    return result
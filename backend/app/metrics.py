@@ -0,0 +1,257 @@
+"""Per-request timing, SQL counters, Prometheus metrics and a slow-query log.
+
+`MetricsMiddleware` starts a `RequestStats` for every HTTP request and keeps
+it in a context variable. SQLAlchemy event hooks on the engines
+(`instrument_engine`) add each statement's count and duration to it, and
+an instrumented cursor counts the rows fetched. When the response starts,
+the middleware:
+
+- adds a `Server-Timing` header (`app`, `db` and the statement count), and
+- folds the request into the `/metrics` counters, labelled by method, route
+  template (`/budgets/{budget_id}`, never the raw path) and status.
+
+Statements slower than `SLOW_QUERY_MS` are logged to the `app.slow_query`
+logger with the route and the types of their bound parameters, never the
+values.
+
+Counters live in the process; with several workers each one reports its
+own totals, so scrape every worker or sum them in Prometheus.
+`METRICS_ENABLED=false` removes the middleware and the hooks entirely.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from app.database.database import _env_flag
+
+METRICS_ENABLED = _env_flag("METRICS_ENABLED", "true")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Longest statement text written to the slow-query log
+SLOW_QUERY_MAX_CHARS = 2000
+
+slow_query_log = logging.getLogger("app.slow_query")
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "db_seconds", "rows")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+
+    @property
+    def route(self) -> Optional[str]:
+        """Template of the matched route; the router stores the route in the scope once it matches."""
+        route = self.scope.get("route")
+        return route.path if route is not None else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def _shape(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def parameter_shapes(parameters) -> str:
+    """Describe bound parameters by type only, e.g. `(int, str)` or `500 x (int, str)`."""
+    if isinstance(parameters, list):
+        first = parameter_shapes(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {_shape(v)}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(_shape(v) for v in parameters or ()) + ")"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # on the execution context, so a statement that fails leaves nothing behind
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start
+    stats = _current.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_query_log.warning(
+            "slow query %.1f ms route=%s params=%s: %s",
+            elapsed * 1000,
+            stats.route if stats is not None else None,
+            parameter_shapes(parameters),
+            statement[:SLOW_QUERY_MAX_CHARS],
+        )
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy adding the rows it fetches to the request's stats."""
+    __slots__ = ("_cursor", "_stats")
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _counting_context(base):
+    class CountingExecutionContext(base):
+        def create_default_cursor(self):
+            cursor = super().create_default_cursor()
+            stats = _current.get()
+            return cursor if stats is None else _CountingCursor(cursor, stats)
+
+    return CountingExecutionContext
+
+
+def instrument_engine(sync_engine) -> None:
+    """Hook timing, statement and row counting into an engine (the `.sync_engine` of an async one)."""
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    dialect = sync_engine.dialect
+    dialect.execution_ctx_cls = _counting_context(dialect.execution_ctx_cls)
+
+
+class Metrics:
+    """Prometheus counters and a duration histogram keyed by (method, route, status)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, str(status))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # requests, seconds, statements, db seconds, rows, bucket counts
+                series = self._series[key] = [0, 0.0, 0, 0.0, 0, [0] * len(DURATION_BUCKETS)]
+            series[0] += 1
+            series[1] += seconds
+            series[2] += stats.statements
+            series[3] += stats.db_seconds
+            series[4] += stats.rows
+            buckets = series[5]
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> str:
+        """The counters in the Prometheus text exposition format."""
+        with self._lock:
+            series = {k: [*v[:5], list(v[5])] for k, v in sorted(self._series.items())}
+        lines = []
+
+        def family(name, kind, help_text, index):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, values in series.items():
+                lines.append(f"{name}{{{_labels(key)}}} {values[index]}")
+
+        lines.append("# HELP http_request_duration_seconds Time until the response started.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for key, (count, seconds, *_, buckets) in series.items():
+            labels = _labels(key)
+            for bound, n in zip(DURATION_BUCKETS, buckets):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {n}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {seconds}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+        family("http_requests_total", "counter", "Requests handled.", 0)
+        family("db_statements_total", "counter", "SQL statements executed while handling requests.", 2)
+        family("db_seconds_total", "counter", "Time spent executing SQL while handling requests.", 3)
+        family("db_rows_total", "counter", "Rows fetched from the database while handling requests.", 4)
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: tuple) -> str:
+    method, route, status = key
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}",status="{status}"'
+
+
+metrics = Metrics()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each request and reports it (see module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats(scope)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        started = False
+
+        def observe(status: int) -> float:
+            # unmatched paths share one label so scanners can't grow the series without bound
+            elapsed = time.perf_counter() - start
+            metrics.observe(scope["method"], stats.route or "unmatched", status, elapsed, stats)
+            return elapsed
+
+        async def send_with_timing(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+                elapsed = observe(message["status"])
+                timing = (
+                    f"app;dur={elapsed * 1000:.1f}, db;dur={stats.db_seconds * 1000:.1f}, "
+                    f"sql;desc=\"{stats.statements} statements, {stats.rows} rows\""
+                )
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception:
+            if not started:
+                observe(500)
+            raise
+        finally:
+            _current.reset(token)
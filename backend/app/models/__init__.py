@@ -1,5 +1,11 @@
 from .franchise import Franchise
 from .branch import Branch
 from .budget import Budget, Expense, BudgetStatus
+from .rollup import BudgetRollup, ExpenseDaily
+from .user import User
+from .search import SearchEntry
+from .archive import ClosedPeriod, ExpenseArchive
+from .change import Change
+from .idempotency import IdempotencyKey
 
-__all__ = ["Franchise", "Branch", "Budget", "Expense", "BudgetStatus"]
+__all__ = ["Franchise", "Branch", "Budget", "Expense", "BudgetStatus", "BudgetRollup", "ExpenseDaily", "User", "SearchEntry", "ClosedPeriod", "ExpenseArchive", "Change", "IdempotencyKey"]
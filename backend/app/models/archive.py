@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Index, Integer, Numeric, String
+from app.database.database import Base
+
+
+class ClosedPeriod(Base):
+    """A month closed by `app.periods.close_periods`; its budgets and expenses are frozen.
+
+    Months are closed oldest first, so every month up to the latest row is
+    closed.
+    """
+    __tablename__ = "closed_periods"
+
+    period = Column(String(7), primary_key=True)  # YYYY-MM
+    closed_at = Column(DateTime, nullable=False)
+    budgets_closed = Column(Integer, nullable=False, default=0)
+
+
+class ExpenseArchive(Base):
+    """Expenses of closed periods, moved out of `expenses` with their ids unchanged.
+
+    On PostgreSQL the table is partitioned by year of `date`, which is why
+    `date` is part of the primary key; `app.periods` creates the yearly
+    partitions as it archives.
+    """
+    __tablename__ = "expenses_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    budget_id = Column(Integer, ForeignKey("budgets.id"), nullable=True, index=True)
+    franchise_id = Column(Integer, ForeignKey("franchises.id"), nullable=False)
+    branch_id = Column(Integer, ForeignKey("branches.id"), nullable=True)
+    date = Column(Date, primary_key=True)
+    category = Column(String(100), nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    note = Column(String(255), nullable=True)
+
+    __table_args__ = (
+        # same order as the live expense list
+        Index("ix_expenses_archive_franchise_date_id", franchise_id, date.desc(), id.desc()),
+        # covers GET /expenses/aggregate by budget, the archive's main reader
+        Index("ix_expenses_archive_aggregate", franchise_id, date, category, amount, budget_id, branch_id),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 
@@ -12,3 +12,7 @@ class Branch(Base):
     franchise_id = Column(Integer, ForeignKey("franchises.id"), nullable=False)
 
     franchise = relationship("Franchise", back_populates="branches")
+
+    __table_args__ = (
+        Index("ix_branches_franchise_id_id", "franchise_id", "id"),
+    )
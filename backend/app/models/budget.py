@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Numeric, Date, UniqueConstraint, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, Numeric, Date, UniqueConstraint, Enum, Index
 from sqlalchemy.orm import relationship
 import enum
 from app.database.database import Base
@@ -30,6 +30,7 @@ class Budget(Base):
 
     __table_args__ = (
         UniqueConstraint("franchise_id", "branch_id", "period", name="uq_budget_scope_period"),
+        Index("ix_budgets_franchise_period", "franchise_id", "period"),
     )
 
 
@@ -48,3 +49,10 @@ class Expense(Base):
     budget = relationship("Budget", back_populates="expenses")
     franchise = relationship("Franchise")
     branch = relationship("Branch")
+
+    # Matches the expense list order (newest first) within a franchise
+    __table_args__ = (
+        Index("ix_expenses_franchise_date_id", franchise_id, date.desc(), id.desc()),
+        # Covers GET /expenses/aggregate, which only reads these columns
+        Index("ix_expenses_franchise_date_category_amount", franchise_id, date, category, amount),
+    )
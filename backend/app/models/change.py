@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from app.database.database import Base
+
+
+class Change(Base):
+    """One create, update or delete of a franchise, branch, budget or expense, for `GET /events`.
+
+    Written by `app.changes` in the transaction that made the change, so
+    `seq` order is commit order. `data` is the record as the API returns
+    it (JSON), or null for deletes.
+    """
+    __tablename__ = "changes"
+
+    seq = Column(Integer, primary_key=True)
+    franchise_id = Column(Integer, nullable=False)
+    entity = Column(String(20), nullable=False)  # franchise | branch | budget | expense
+    op = Column(String(10), nullable=False)  # created | updated | deleted
+    entity_id = Column(Integer, nullable=False)
+    data = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        # resuming one franchise's stream
+        Index("ix_changes_franchise_seq", franchise_id, seq),
+        # SQLite would reuse the sequence numbers of pruned rows otherwise
+        {"sqlite_autoincrement": True},
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+from app.database.database import Base
+
+
+class IdempotencyKey(Base):
+    """The response a create request got, kept under its `Idempotency-Key` so retries can be replayed.
+
+    `id` is the SHA-256 of the user, the route and the client's key, so
+    rows are the same size whatever keys clients send. Rows older than
+    `IDEMPOTENCY_TTL_HOURS` are ignored and pruned by `app.idempotency`.
+    """
+    __tablename__ = "idempotency_keys"
+
+    id = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
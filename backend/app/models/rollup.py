@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Date, Integer, String, ForeignKey, Numeric
+from app.database.database import Base
+
+
+class BudgetRollup(Base):
+    """Per-period budget totals, kept in step with `budgets` by `app.rollups`.
+
+    `branch_id` 0 holds the franchise-wide total across all budgets,
+    including those not tied to a branch.
+    """
+    __tablename__ = "budget_rollups"
+
+    franchise_id = Column(Integer, ForeignKey("franchises.id"), primary_key=True)
+    branch_id = Column(Integer, primary_key=True, default=0)
+    period = Column(String(7), primary_key=True)  # YYYY-MM
+    planned_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    approved_amount = Column(Numeric(14, 2), nullable=False, default=0)
+    actual_amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+
+class ExpenseDaily(Base):
+    """Expense count and total per franchise, branch, day and category.
+
+    Kept in step with `expenses` by `app.rollups` and read by
+    `GET /expenses/aggregate`. `branch_id` 0 holds expenses without a branch.
+    """
+    __tablename__ = "expense_daily"
+
+    franchise_id = Column(Integer, ForeignKey("franchises.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    branch_id = Column(Integer, primary_key=True, default=0)
+    expense_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Numeric(14, 2), nullable=False, default=0)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Index, Integer, String, UniqueConstraint
+from app.database.database import Base
+
+
+class SearchEntry(Base):
+    """Normalized search text for one franchise or branch, kept in step by `app.search`.
+
+    `terms` holds the folded text the trigram index is built on; `title`
+    and `subtitle` are returned as they were entered.
+    """
+    __tablename__ = "search_entries"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)  # franchise | branch
+    ref_id = Column(Integer, nullable=False)
+    franchise_id = Column(Integer, nullable=False)
+    title = Column(String(255), nullable=False)
+    subtitle = Column(String(255), nullable=False)
+    terms = Column(String(600), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("ref_id", "kind", name="uq_search_entries_ref_kind"),
+        # prefix lookups for queries too short for trigrams
+        Index("ix_search_entries_terms", "terms"),
+    )
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import date
+from fastapi import HTTPException, Response
+
+# Header carrying the cursor for the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Range of an int cursor value: the database's signed 64-bit integers
+CURSOR_INT_MIN, CURSOR_INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last row of a page into an opaque token."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _cursor_value(value, kind: type):
+    if kind is date:
+        # encoded as an ISO string
+        return date.fromisoformat(value)
+    # exact match, so `true` is not taken for an int id
+    if type(value) is not kind:
+        raise TypeError(f"expected {kind.__name__}")
+    # larger ids would overflow the driver's integer binding
+    if kind is int and not CURSOR_INT_MIN <= value <= CURSOR_INT_MAX:
+        raise ValueError("out of range")
+    return value
+
+
+def decode_cursor(token: str, types: tuple[type, ...]) -> list:
+    """Decode a token produced by `encode_cursor`, rejecting tampered input.
+
+    `types` gives the type of each sort key value, e.g. `(date, int)`;
+    dates come back parsed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return [_cursor_value(value, kind) for value, kind in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key) -> None:
+    """Expose the next-page cursor when the page came back full.
+
+    `key` maps the last row of the page to its sort key values.
+    """
+    if rows and len(rows) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
@@ -0,0 +1,173 @@
+"""Closing past months and moving their expenses out of the live table.
+
+A month closes `PERIOD_CLOSE_GRACE_DAYS` days after it ends.
+`close_periods` records it in `closed_periods` and moves its approved
+budgets to `closed`. It then moves every expense dated before the first
+open month from `expenses` to `expenses_archive`, one batch per
+transaction, so the live table only holds open months. Run it daily with
+`python manage.py periods close`; a run that stops half way is finished
+by the next one.
+
+Closed months are frozen. The routes refuse to create, change or delete
+their budgets and expenses (`ensure_open`), so their rollups stop
+changing. Expense reads run the same query on both tables through
+`with_archive`, so archived expenses keep showing up where they did.
+"""
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Optional
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select, text, union_all, update
+from sqlalchemy.orm import Session
+from app.cache import response_cache
+from app.changes import UPDATED, record_change
+from app.models.archive import ClosedPeriod, ExpenseArchive
+from app.models.budget import Budget, BudgetStatus, Expense
+from app.schemas.budget import BudgetResponse
+
+PERIOD_CLOSE_GRACE_DAYS = int(os.getenv("PERIOD_CLOSE_GRACE_DAYS", "15"))
+# Expenses moved per transaction
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "10000"))
+
+EXPENSE_COLUMNS = [column.key for column in Expense.__table__.columns]
+
+
+def period_of(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def next_period(period: str) -> str:
+    year, month = map(int, period.split("-"))
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def last_closed_period(db: Session) -> Optional[str]:
+    return db.scalar(select(func.max(ClosedPeriod.period)))
+
+
+def archive_cutoff(db: Session) -> Optional[date]:
+    """First day of the oldest open month; None while no month is closed."""
+    last = last_closed_period(db)
+    return date.fromisoformat(next_period(last) + "-01") if last else None
+
+
+def ensure_open(db: Session, *periods: Optional[str]) -> None:
+    """Raise a 409 if any of `periods` (YYYY-MM; None is ignored) is closed."""
+    last = last_closed_period(db)
+    closed = sorted(p for p in periods if p is not None and last is not None and p <= last)
+    if closed:
+        raise HTTPException(status_code=409, detail=f"Period {closed[0]} is closed")
+
+
+def with_archive(build: Callable):
+    """`build(model)` for `Expense` and `ExpenseArchive`, combined with UNION ALL, as a subquery.
+
+    Each side is its own subquery so it can keep an ORDER BY and LIMIT,
+    which SQLite doesn't allow directly on the members of a UNION.
+    """
+    sides = (select(build(model).subquery()) for model in (Expense, ExpenseArchive))
+    return union_all(*sides).subquery("expenses")
+
+
+def due_periods(db: Session, today: date, grace_days: int = PERIOD_CLOSE_GRACE_DAYS) -> list[str]:
+    """Months that ended more than `grace_days` days before `today` and aren't closed yet, oldest first."""
+    end = period_of(today - timedelta(days=grace_days))
+    last = last_closed_period(db)
+    if last:
+        first = next_period(last)
+    else:
+        oldest_budget = db.scalar(select(func.min(Budget.period)))
+        oldest_expense = db.scalar(select(func.min(Expense.date)))
+        starts = [oldest_budget] if oldest_budget else []
+        if oldest_expense:
+            starts.append(period_of(oldest_expense))
+        if not starts:
+            return []
+        first = min(starts)
+    periods = []
+    while first < end:
+        periods.append(first)
+        first = next_period(first)
+    return periods
+
+
+def close_periods(
+    db: Session,
+    today: Optional[date] = None,
+    grace_days: int = PERIOD_CLOSE_GRACE_DAYS,
+    dry_run: bool = False,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> dict:
+    """Close every due month, then archive the expenses of all closed months.
+
+    Returns the months closed and how many budgets were closed and
+    expenses archived; with `dry_run` nothing is written and the counts
+    say what would be.
+    """
+    periods = due_periods(db, today or date.today(), grace_days)
+    cutoff = date.fromisoformat(next_period(periods[-1]) + "-01") if periods else archive_cutoff(db)
+    approved = (Budget.period.in_(periods), Budget.status == BudgetStatus.approved)
+    if dry_run:
+        return {
+            "periods": periods,
+            "budgets_closed": db.scalar(select(func.count()).select_from(Budget).where(*approved)) if periods else 0,
+            "expenses_archived": db.scalar(select(func.count()).select_from(Expense).where(Expense.date < cutoff)) if cutoff else 0,
+        }
+
+    closed = []
+    if periods:
+        closed = db.execute(
+            update(Budget)
+            .where(*approved)
+            .values(status=BudgetStatus.closed)
+            .returning(*(getattr(Budget, name) for name in BudgetResponse.model_fields))
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in closed:
+            record_change(db, "budget", UPDATED, row._asdict())
+        per_period = Counter(row.period for row in closed)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        db.add_all(ClosedPeriod(period=p, closed_at=now, budgets_closed=per_period[p]) for p in periods)
+        db.commit()
+        response_cache.invalidate(*(f"budget:{row.id}" for row in closed))
+    archived = archive_expenses(db, cutoff, batch_size) if cutoff else 0
+    return {"periods": periods, "budgets_closed": len(closed), "expenses_archived": archived}
+
+
+def _create_partitions(db: Session, first_year: int, last_year: int) -> None:
+    for year in range(first_year, last_year + 1):
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS expenses_archive_{year} PARTITION OF expenses_archive "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+    db.commit()
+
+
+def archive_expenses(db: Session, cutoff: date, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move expenses dated before `cutoff` to `expenses_archive` in id order; returns how many moved."""
+    old = [Expense.date < cutoff]
+    if db.get_bind().dialect.name == "postgresql":
+        oldest = db.scalar(select(func.min(Expense.date)).where(*old))
+        if oldest is None:
+            return 0
+        _create_partitions(db, oldest.year, (cutoff - timedelta(days=1)).year)
+    else:
+        # SQLite gives new rows max(id) + 1, so moving the newest expense would let its id be reused
+        old.append(Expense.id < select(func.max(Expense.id)).scalar_subquery())
+
+    columns = [getattr(Expense, name) for name in EXPENSE_COLUMNS]
+    moved, after = 0, 0
+    while True:
+        ids = db.scalars(
+            select(Expense.id).where(*old, Expense.id > after).order_by(Expense.id).limit(batch_size).with_for_update()
+        ).all()
+        if not ids:
+            return moved
+        window = (Expense.id >= ids[0], Expense.id <= ids[-1])
+        db.execute(insert(ExpenseArchive).from_select(EXPENSE_COLUMNS, select(*columns).where(*old, *window)))
+        # delete exactly what was copied; an old expense committed in between waits for the next run
+        copied = select(ExpenseArchive.id).where(ExpenseArchive.id >= ids[0], ExpenseArchive.id <= ids[-1])
+        moved += db.execute(delete(Expense).where(*window, Expense.id.in_(copied))).rowcount
+        db.commit()
+        after = ids[-1]
@@ -0,0 +1,259 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.budget import Budget
+from app.models.rollup import BudgetRollup, ExpenseDaily
+from app.periods import with_archive
+
+# Rollup row holding the franchise-wide total for a period
+ALL_BRANCHES = 0
+
+# expense_daily.branch_id for expenses without a branch
+NO_BRANCH = 0
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+class BudgetAmounts(NamedTuple):
+    franchise_id: int
+    branch_id: Optional[int]
+    period: str
+    planned: Decimal
+    approved: Decimal
+    actual: Decimal
+
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value)) if value is not None else ZERO
+
+
+def budget_amounts(b: Budget) -> BudgetAmounts:
+    """Capture the rollup-relevant state of a budget before or after a change."""
+    return BudgetAmounts(
+        b.franchise_id, b.branch_id, b.period,
+        _dec(b.planned_amount), _dec(b.approved_amount), _dec(b.actual_amount),
+    )
+
+
+def _rollup_keys(franchise_id: int, branch_id: Optional[int], period: str):
+    yield franchise_id, ALL_BRANCHES, period
+    if branch_id:
+        yield franchise_id, branch_id, period
+
+
+def _add_to_rows(db: Session, model, key_columns: tuple, rows: list[dict]) -> None:
+    """Add each row's amount columns to the matching row of `model`, creating it if missing.
+
+    Uses one INSERT ... ON CONFLICT DO UPDATE (run as an executemany) where
+    the dialect has it, so two transactions creating the same row can't
+    both insert it.
+    """
+    if not rows:
+        return
+    amount_columns = [c for c in rows[0] if c not in key_columns]
+    dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(model)
+        # on the session's connection: the ORM's bulk insert path would process every row first
+        db.connection().execute(stmt.on_conflict_do_update(
+            index_elements=[getattr(model, c) for c in key_columns],
+            set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in amount_columns},
+        ), rows)
+        return
+    for row in rows:
+        result = db.execute(
+            update(model)
+            .where(*(getattr(model, c) == row[c] for c in key_columns))
+            .values({c: getattr(model, c) + row[c] for c in amount_columns})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(model).values(row))
+
+
+def apply_delta(db: Session, franchise_id: int, branch_id: Optional[int], period: str,
+                planned=ZERO, approved=ZERO, actual=ZERO) -> None:
+    """Add the given amounts to the franchise total and branch rollup rows."""
+    if not (planned or approved or actual):
+        return
+    _add_to_rows(db, BudgetRollup, ("franchise_id", "branch_id", "period"), [
+        {"franchise_id": f_id, "branch_id": br_id, "period": per,
+         "planned_amount": planned, "approved_amount": approved, "actual_amount": actual}
+        for f_id, br_id, per in _rollup_keys(franchise_id, branch_id, period)
+    ])
+
+
+def apply_deltas(db: Session, deltas: dict) -> None:
+    """`apply_delta` for many budgets' scopes in one upsert.
+
+    `deltas` maps (franchise_id, branch_id, period) to (planned, approved,
+    actual) `Decimal` amounts to add.
+    """
+    totals = defaultdict(lambda: (ZERO, ZERO, ZERO))
+    for (franchise_id, branch_id, period), (planned, approved, actual) in deltas.items():
+        for key in _rollup_keys(franchise_id, branch_id, period):
+            p, a, c = totals[key]
+            totals[key] = (p + planned, a + approved, c + actual)
+    _add_to_rows(db, BudgetRollup, ("franchise_id", "branch_id", "period"), [
+        {"franchise_id": f_id, "branch_id": br_id, "period": per,
+         "planned_amount": planned, "approved_amount": approved, "actual_amount": actual}
+        for (f_id, br_id, per), (planned, approved, actual) in sorted(totals.items(), key=str)
+        if planned or approved or actual
+    ])
+
+
+def track_budget_change(db: Session, before: Optional[BudgetAmounts], after: Optional[BudgetAmounts]) -> None:
+    """Move a budget's contribution from its old state to its new one.
+
+    Pass `before=None` for a new budget and `after=None` for a deleted one.
+    """
+    if before and after and before[:3] == after[:3]:
+        apply_delta(db, *after[:3],
+                    planned=after.planned - before.planned,
+                    approved=after.approved - before.approved,
+                    actual=after.actual - before.actual)
+        return
+    if before:
+        apply_delta(db, *before[:3], planned=-before.planned, approved=-before.approved, actual=-before.actual)
+    if after:
+        apply_delta(db, *after[:3], planned=after.planned, approved=after.approved, actual=after.actual)
+
+
+def post_actual(db: Session, budget_id: int, amount) -> bool:
+    """Add `amount` (negative to remove) to a budget's actuals and its rollups.
+
+    The budget row is changed with one `UPDATE ... SET actual_amount =
+    actual_amount + :amount` and never read first, so concurrent posts to
+    the same budget queue on its row lock instead of overwriting each
+    other. Returns False if the budget doesn't exist.
+    """
+    amount = _dec(amount)
+    scope = db.execute(
+        update(Budget)
+        .where(Budget.id == budget_id)
+        .values(actual_amount=func.coalesce(Budget.actual_amount, 0) + amount)
+        .returning(Budget.franchise_id, Budget.branch_id, Budget.period)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if scope is None:
+        return False
+    apply_delta(db, *scope, actual=amount)
+    return True
+
+
+def track_expenses(db: Session, expenses: Iterable, sign: int = 1) -> None:
+    """Add expenses (or remove them, with `sign=-1`) to the `expense_daily` totals.
+
+    Accepts `Expense` objects or anything with the same attributes.
+    """
+    totals = defaultdict(lambda: [0, ZERO])
+    for e in expenses:
+        entry = totals[(e.franchise_id, e.date, e.category, e.branch_id or NO_BRANCH)]
+        entry[0] += sign
+        entry[1] += sign * _dec(e.amount)
+    _add_to_rows(db, ExpenseDaily, ("franchise_id", "day", "category", "branch_id"), [
+        {"franchise_id": f_id, "day": day, "category": category, "branch_id": br_id,
+         "expense_count": count, "total_amount": total}
+        for (f_id, day, category, br_id), (count, total) in sorted(totals.items(), key=str)
+    ])
+
+
+def get_rollup(db: Session, franchise_id: int, period: str, branch_id: Optional[int] = None) -> Optional[BudgetRollup]:
+    return db.get(BudgetRollup, (franchise_id, branch_id or ALL_BRANCHES, period))
+
+
+def compute_rollups(db: Session) -> dict:
+    """Recompute every rollup row from `budgets`, keyed like the table."""
+    sums = (
+        func.coalesce(func.sum(Budget.planned_amount), 0),
+        func.coalesce(func.sum(Budget.approved_amount), 0),
+        func.coalesce(func.sum(Budget.actual_amount), 0),
+    )
+    totals = {}
+    franchise_wide = db.execute(
+        select(Budget.franchise_id, Budget.period, *sums).group_by(Budget.franchise_id, Budget.period)
+    )
+    for f_id, period, planned, approved, actual in franchise_wide:
+        totals[(f_id, ALL_BRANCHES, period)] = (_dec(planned), _dec(approved), _dec(actual))
+    per_branch = db.execute(
+        select(Budget.franchise_id, Budget.branch_id, Budget.period, *sums)
+        .where(Budget.branch_id.isnot(None))
+        .group_by(Budget.franchise_id, Budget.branch_id, Budget.period)
+    )
+    for f_id, br_id, period, planned, approved, actual in per_branch:
+        totals[(f_id, br_id, period)] = (_dec(planned), _dec(approved), _dec(actual))
+    return totals
+
+
+def _expense_daily_source():
+    # archived expenses keep their expense_daily rows through a rebuild
+    expenses = with_archive(lambda model: select(
+        model.franchise_id, model.date, model.category, func.coalesce(model.branch_id, NO_BRANCH).label("branch_id"), model.amount,
+    ))
+    c = expenses.c
+    return (
+        select(c.franchise_id, c.date, c.category, c.branch_id, func.count(), func.coalesce(func.sum(c.amount), 0))
+        .group_by(c.franchise_id, c.date, c.category, c.branch_id)
+    )
+
+
+def compute_expense_daily(db: Session) -> dict:
+    """Recompute every `expense_daily` row from `expenses` and its archive, keyed like the table."""
+    return {
+        (f_id, day, category, br_id): (count, _dec(total).quantize(CENT))
+        for f_id, day, category, br_id, count, total in db.execute(_expense_daily_source())
+    }
+
+
+def find_drift(db: Session) -> list[dict]:
+    """Compare stored rollups with a fresh recomputation and list the mismatches."""
+    drift = []
+    expected = compute_rollups(db)
+    stored = {
+        (r.franchise_id, r.branch_id, r.period): (_dec(r.planned_amount), _dec(r.approved_amount), _dec(r.actual_amount))
+        for r in db.scalars(select(BudgetRollup))
+    }
+    for key in sorted(expected.keys() | stored.keys(), key=str):
+        want = expected.get(key, (ZERO, ZERO, ZERO))
+        have = stored.get(key, (ZERO, ZERO, ZERO))
+        if want != have:
+            drift.append({"table": "budget_rollups", "key": key, "expected": want, "stored": have})
+
+    expected = compute_expense_daily(db)
+    stored = {
+        (r.franchise_id, r.day, r.category, r.branch_id): (r.expense_count, _dec(r.total_amount).quantize(CENT))
+        for r in db.scalars(select(ExpenseDaily))
+    }
+    for key in sorted(expected.keys() | stored.keys(), key=str):
+        want = expected.get(key, (0, ZERO))
+        have = stored.get(key, (0, ZERO))
+        if want != have:
+            drift.append({"table": "expense_daily", "key": key, "expected": want, "stored": have})
+    return drift
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Replace both rollup tables with a fresh recomputation; returns the row count."""
+    totals = compute_rollups(db)
+    db.execute(delete(BudgetRollup))
+    if totals:
+        db.execute(insert(BudgetRollup), [
+            {"franchise_id": f_id, "branch_id": br_id, "period": period,
+             "planned_amount": planned, "approved_amount": approved, "actual_amount": actual}
+            for (f_id, br_id, period), (planned, approved, actual) in totals.items()
+        ])
+    db.execute(delete(ExpenseDaily))
+    # computed in the database; expenses can be far too many to pull into Python
+    daily = db.execute(insert(ExpenseDaily).from_select(
+        ["franchise_id", "day", "category", "branch_id", "expense_count", "total_amount"],
+        _expense_daily_source(),
+    ))
+    db.commit()
+    return len(totals) + daily.rowcount
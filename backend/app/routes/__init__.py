@@ -1,5 +1,7 @@
 from .franchise import router as franchise_router
 from .branch import router as branch_router
 from .budget import router as budget_router, expenses_router
+from .search import router as search_router
+from .events import router as events_router
 
-__all__ = ["franchise_router", "branch_router", "budget_router", "expenses_router"]
+__all__ = ["franchise_router", "branch_router", "budget_router", "expenses_router", "search_router", "events_router"]
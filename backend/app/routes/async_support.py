@@ -0,0 +1,76 @@
+"""Async variants of the CRUD routers, enabled with `DB_ASYNC=true`.
+
+Every route that takes a `db` session is re-registered as an `async def`
+that gets an `AsyncSession` from `get_async_db` and runs the original
+handler through `AsyncSession.run_sync`. The handler body and the route's
+options (response model settings, dependencies, OpenAPI metadata) are
+unchanged, but its queries go through the async driver (aiosqlite /
+asyncpg) on the event loop instead of occupying one of the threadpool's
+worker threads.
+
+The whole handler runs on the event loop, not just its queries. Blocking
+work that doesn't use the session (Redis cache round trips, Parquet
+snapshot reads, the summary batch's numpy pass) goes through
+`app.database.database.run_blocking`, which hands it to the threadpool
+here and calls it directly in sync mode.
+
+Routes that are already coroutines, or that open their own sessions (the
+streaming exports), are registered unchanged.
+"""
+import functools
+import inspect
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+from app.database.database import get_async_db
+
+
+def _asyncify(endpoint):
+    signature = inspect.signature(endpoint)
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        db = kwargs.pop("db")
+        return await db.run_sync(lambda session: endpoint(**kwargs, db=session))
+
+    wrapper.__signature__ = signature.replace(parameters=[
+        p.replace(default=Depends(get_async_db)) if p.name == "db" else p
+        for p in signature.parameters.values()
+    ])
+    return wrapper
+
+
+def to_async_router(router: APIRouter) -> APIRouter:
+    async_router = APIRouter()
+    for route in router.routes:
+        endpoint = route.endpoint
+        if not isinstance(route, APIRoute) or inspect.iscoroutinefunction(endpoint) \
+                or "db" not in inspect.signature(endpoint).parameters:
+            async_router.routes.append(route)
+            continue
+        async_router.add_api_route(
+            route.path,
+            _asyncify(endpoint),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            name=route.name,
+            summary=route.summary,
+            description=route.description,
+            responses=route.responses,
+            dependencies=route.dependencies,
+            response_description=route.response_description,
+            deprecated=route.deprecated,
+            operation_id=route.operation_id,
+            response_model_include=route.response_model_include,
+            response_model_exclude=route.response_model_exclude,
+            response_model_by_alias=route.response_model_by_alias,
+            response_model_exclude_unset=route.response_model_exclude_unset,
+            response_model_exclude_defaults=route.response_model_exclude_defaults,
+            response_model_exclude_none=route.response_model_exclude_none,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            callbacks=route.callbacks,
+            openapi_extra=route.openapi_extra,
+        )
+    return async_router
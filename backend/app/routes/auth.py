@@ -1,15 +1,18 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import JWTError
 from pydantic import BaseModel, EmailStr, Field
 from app.security import (
-    authenticate_user,
+    authenticate_user_async,
     create_access_token,
     Token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    get_password_hash,
+    get_password_hash_async,
+    decode_access_token,
 )
-from app import security as security_module
+from app.users import UsernameTaken, create_user, get_user, set_password_hash
 
 router = APIRouter(tags=["Authentication"])
 security = HTTPBearer()
@@ -24,7 +27,7 @@ async def login(username: str, password: str):
     - Username: `admin`
     - Password: `secret`
     """
-    user = authenticate_user(username, password)
+    user = await authenticate_user_async(username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -43,8 +46,15 @@ async def login(username: str, password: str):
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify if the provided token is valid"""
     token = credentials.credentials
-    # In production, decode and validate token
-    return {"valid": True, "message": "Token is valid"}
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"valid": True, "message": "Token is valid", "username": claims["sub"]}
 
 
 class SignupRequest(BaseModel):
@@ -56,19 +66,46 @@ class SignupRequest(BaseModel):
 
 @router.post("/signup", response_model=Token)
 async def signup(payload: SignupRequest):
-    """Create a new user in the in-memory store and return a token.
-    Note: For a production-grade app, persist users in the database.
-    """
-    if payload.username in security_module.fake_users_db:
+    """Create a new user and return a token."""
+    # the user store is synchronous; keep its queries off the event loop
+    if await run_in_threadpool(get_user, payload.username) is not None:
         raise HTTPException(status_code=400, detail="Username already exists")
 
-    security_module.fake_users_db[payload.username] = {
-        "username": payload.username,
-        "full_name": payload.full_name,
-        "email": str(payload.email) if payload.email else None,
-        "hashed_password": get_password_hash(payload.password),
-        "disabled": False,
-    }
+    hashed_password = await get_password_hash_async(payload.password)
+    try:
+        # the unique index catches a signup that claimed the name while we were hashing
+        await run_in_threadpool(
+            create_user,
+            payload.username,
+            hashed_password,
+            email=str(payload.email) if payload.email else None,
+            full_name=payload.full_name,
+        )
+    except UsernameTaken:
+        raise HTTPException(status_code=400, detail="Username already exists")
 
     access_token = create_access_token(data={"sub": payload.username})
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+class PasswordChangeRequest(BaseModel):
+    current_password: str
+    new_password: str = Field(min_length=6, max_length=128)
+
+
+@router.post("/password")
+async def change_password(payload: PasswordChangeRequest, credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Change the password of the user the bearer token belongs to."""
+    try:
+        username = decode_access_token(credentials.credentials)["sub"]
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not await authenticate_user_async(username, payload.current_password):
+        raise HTTPException(status_code=400, detail="Current password is incorrect")
+    hashed_password = await get_password_hash_async(payload.new_password)
+    await run_in_threadpool(set_password_hash, username, hashed_password)
+    return {"message": "Password updated"}
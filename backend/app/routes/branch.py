@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app.routes.auth import verify_token
 from sqlalchemy.orm import Session
 from app.database.database import get_db
 from app.models.franchise import Franchise
 from app.models.branch import Branch
 from app.schemas.branch import BranchCreate, BranchResponse
+from app.pagination import decode_cursor, set_next_cursor
+from app.cache import response_cache
+from app.changes import CREATED, DELETED, record_change
+from app.expand import expand_options, parse_expand, serialize
+from app.lean import lean_rows, lean_select
+from app.schemas.expand import BranchExpanded
+from app.search import index_branch, unindex_branch
 
 router = APIRouter(prefix="/branches", tags=["branches"])
 
@@ -17,27 +24,54 @@ def create_branch(branch: BranchCreate, db: Session = Depends(get_db), _=Depends
     
     new_branch = Branch(**branch.dict())
     db.add(new_branch)
+    db.flush()
+    index_branch(db, new_branch)
+    record_change(db, "branch", CREATED, new_branch)
     db.commit()
     db.refresh(new_branch)
+    response_cache.invalidate("branches", f"branches:franchise:{new_branch.franchise_id}")
     return new_branch
 
 
-@router.get("", response_model=list[BranchResponse])
-def list_branches(franchise_id: int = None, skip: int = 0, limit: int = 10, db: Session = Depends(get_db), _=Depends(verify_token)):
-    query = db.query(Branch)
-    if franchise_id:
-        query = query.filter(Branch.franchise_id == franchise_id)
-    
-    branches = query.offset(skip).limit(limit).all()
-    return branches
+@router.get("", response_model=list[BranchExpanded], response_model_exclude_unset=True)
+def list_branches(request: Request, response: Response, franchise_id: int = None, skip: int = 0, limit: int = 10, cursor: str = None, expand: str = Query(None), db: Session = Depends(get_db), _=Depends(verify_token)):
+    fields = parse_expand(Branch, expand)
 
+    def build():
+        query = lean_select(Branch) if not fields else db.query(Branch).options(*expand_options(Branch, fields))
+        if franchise_id:
+            query = query.filter(Branch.franchise_id == franchise_id)
 
-@router.get("/{branch_id}", response_model=BranchResponse)
-def get_branch(branch_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
-    branch = db.query(Branch).filter(Branch.id == branch_id).first()
+        query = query.order_by(Branch.id)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, (int,))
+            query = query.filter(Branch.id > last_id)
+        else:
+            query = query.offset(skip)
+
+        query = query.limit(limit)
+        if not fields:
+            branches = lean_rows(db, query)
+            set_next_cursor(response, branches, limit, lambda b: [b["id"]])
+            return branches
+        branches = query.all()
+        set_next_cursor(response, branches, limit, lambda b: [b.id])
+        return [serialize(b, fields) for b in branches]
+
+    tags = [f"branches:franchise:{franchise_id}" if franchise_id else "branches"]
+    if "franchise" in fields:
+        # expanded franchise data goes stale on franchise writes too
+        tags.append("franchises")
+    return response_cache.serve(request, response, tags, build)
+
+
+@router.get("/{branch_id}", response_model=BranchExpanded, response_model_exclude_unset=True)
+def get_branch(branch_id: int, expand: str = Query(None), db: Session = Depends(get_db), _=Depends(verify_token)):
+    fields = parse_expand(Branch, expand)
+    branch = db.query(Branch).options(*expand_options(Branch, fields)).filter(Branch.id == branch_id).first()
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
-    return branch
+    return serialize(branch, fields)
 
 
 @router.delete("/{branch_id}")
@@ -45,7 +79,10 @@ def delete_branch(branch_id: int, db: Session = Depends(get_db), _=Depends(verif
     branch = db.query(Branch).filter(Branch.id == branch_id).first()
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
-    
+
+    unindex_branch(db, branch_id)
+    record_change(db, "branch", DELETED, branch)
     db.delete(branch)
     db.commit()
+    response_cache.invalidate("branches", f"branches:franchise:{branch.franchise_id}")
     return {"message": "Branch deleted successfully"}
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from app.routes.auth import verify_token
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database.database import get_db
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError
+from app.database.database import get_db, run_blocking
+from app.models.archive import ExpenseArchive
 from app.models.budget import Budget, Expense, BudgetStatus
 from app.schemas.budget import (
     BudgetCreate,
@@ -10,13 +14,78 @@ from app.schemas.budget import (
     BudgetResponse,
     ExpenseCreate,
     ExpenseResponse,
+    ExpenseBulkResponse,
+    ExpenseAggregateResponse,
+    BudgetSummaryBatchRequest,
+    BudgetSummaryBatchResponse,
+    BudgetTransitionRequest,
+    BudgetTransitionResponse,
 )
+from app.pagination import decode_cursor, set_next_cursor
+from app.export import export_response
+from app.ingest import ingest_expenses, parse_bulk_body
+from app.analytics import aggregate_expenses, parse_group_by
+from app.snapshots import SnapshotUnavailable, aggregate_snapshot
+from app.summaries import TooManyBudgets, summarize_budgets
+from app.workflow import APPLIED, transition_budgets
+from app.periods import ensure_open, period_of, with_archive
+from app.cache import response_cache
+from app.changes import CREATED, DELETED, UPDATED, record_change
+from app.expand import expand_options, parse_expand, serialize
+from app.idempotency import IdempotentRequest, idempotent
+from app.lean import lean_response, lean_rows, lean_select
+from app.schemas.expand import BudgetExpanded, ExpenseExpanded
+from app.rollups import budget_amounts, get_rollup, post_actual, track_budget_change, track_expenses
+
+BUDGET_EXPORT_COLUMNS = [
+    "id", "franchise_id", "branch_id", "period", "currency",
+    "planned_amount", "approved_amount", "actual_amount", "status",
+]
+EXPENSE_EXPORT_COLUMNS = [
+    "id", "franchise_id", "branch_id", "budget_id", "date", "category", "amount", "note",
+]
+
+
+def _filter_budgets(q, franchise_id, branch_id, period):
+    if franchise_id is not None:
+        q = q.filter(Budget.franchise_id == franchise_id)
+    if branch_id is not None:
+        q = q.filter(Budget.branch_id == branch_id)
+    if period is not None:
+        q = q.filter(Budget.period == period)
+    return q
+
+
+def _filter_expenses(q, franchise_id, branch_id, budget_id, model=Expense):
+    if franchise_id is not None:
+        q = q.filter(model.franchise_id == franchise_id)
+    if branch_id is not None:
+        q = q.filter(model.branch_id == branch_id)
+    if budget_id is not None:
+        q = q.filter(model.budget_id == budget_id)
+    return q
+
+
+def _archived_expense(db: Session, expense_id: int, fields: list[str] = ()):
+    # through with_archive, so the alias lines up with Expense and its relationships
+    archived = aliased(Expense, with_archive(lambda model: select(model).where(model.id == expense_id)))
+    return db.query(archived).options(*expand_options(Expense, fields, archived)).first()
 
 router = APIRouter(prefix="/budgets", tags=["budgets"])
 
 
 @router.post("", response_model=BudgetResponse)
-def create_budget(payload: BudgetCreate, db: Session = Depends(get_db), _=Depends(verify_token)):
+def create_budget(
+    payload: BudgetCreate,
+    db: Session = Depends(get_db),
+    _=Depends(verify_token),
+    idempotency: IdempotentRequest = Depends(idempotent("POST /budgets")),
+):
+    """Create a draft budget. Send an `Idempotency-Key` header to make retries safe."""
+    replayed = idempotency.replay(db)
+    if replayed:
+        return replayed
+    ensure_open(db, payload.period)
     # period uniqueness per franchise/branch
     exists = (
         db.query(Budget)
@@ -28,6 +97,10 @@ def create_budget(payload: BudgetCreate, db: Session = Depends(get_db), _=Depend
         .first()
     )
     if exists:
+        # a concurrent request with the same key may have just created it
+        replayed = idempotency.replay(db)
+        if replayed:
+            return replayed
         raise HTTPException(status_code=400, detail="Budget for this period already exists")
 
     budget = Budget(
@@ -39,37 +112,132 @@ def create_budget(payload: BudgetCreate, db: Session = Depends(get_db), _=Depend
         status=BudgetStatus.draft,
     )
     db.add(budget)
-    db.commit()
+    try:
+        db.flush()
+    except IntegrityError:
+        # created concurrently after the check above
+        db.rollback()
+        replayed = idempotency.replay(db)
+        if replayed:
+            return replayed
+        raise HTTPException(status_code=400, detail="Budget for this period already exists")
+    track_budget_change(db, None, budget_amounts(budget))
+    record_change(db, "budget", CREATED, budget)
+    replayed = idempotency.commit(db, BudgetResponse, budget)
+    if replayed:
+        return replayed
     db.refresh(budget)
     return budget
 
 
-@router.get("", response_model=list[BudgetResponse])
+@router.get("", response_model=list[BudgetExpanded], response_model_exclude_unset=True)
 def list_budgets(
+    response: Response,
     franchise_id: int | None = None,
     branch_id: int | None = None,
     period: str | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = None,
+    expand: str | None = None,
     db: Session = Depends(get_db),
     _=Depends(verify_token)
 ):
-    q = db.query(Budget)
-    if franchise_id is not None:
-        q = q.filter(Budget.franchise_id == franchise_id)
-    if branch_id is not None:
-        q = q.filter(Budget.branch_id == branch_id)
-    if period is not None:
-        q = q.filter(Budget.period == period)
-    return q.offset(skip).limit(limit).all()
+    fields = parse_expand(Budget, expand)
+    q = lean_select(Budget) if not fields else db.query(Budget).options(*expand_options(Budget, fields))
+    q = _filter_budgets(q, franchise_id, branch_id, period).order_by(Budget.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, (int,))
+        q = q.filter(Budget.id > last_id)
+    else:
+        q = q.offset(skip)
+    q = q.limit(limit)
+    if not fields:
+        budgets = lean_rows(db, q)
+        set_next_cursor(response, budgets, limit, lambda b: [b["id"]])
+        return lean_response(budgets, response)
+    budgets = q.all()
+    set_next_cursor(response, budgets, limit, lambda b: [b.id])
+    return [serialize(b, fields) for b in budgets]
 
 
-@router.get("/{budget_id}", response_model=BudgetResponse)
-def get_budget(budget_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
-    b = db.query(Budget).get(budget_id)
+@router.get("/export")
+def export_budgets(
+    franchise_id: int | None = None,
+    branch_id: int | None = None,
+    period: str | None = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    _=Depends(verify_token)
+):
+    """Stream every matching budget as NDJSON or CSV, without paging."""
+    stmt = select(*(getattr(Budget, c) for c in BUDGET_EXPORT_COLUMNS))
+    stmt = _filter_budgets(stmt, franchise_id, branch_id, period).order_by(Budget.id)
+    return export_response(stmt, BUDGET_EXPORT_COLUMNS, format, "budgets")
+
+
+@router.get("/rollup")
+def rollup(
+    franchise_id: int,
+    period: str,
+    branch_id: int | None = None,
+    db: Session = Depends(get_db),
+    _=Depends(verify_token)
+):
+    r = get_rollup(db, franchise_id, period, branch_id)
+    planned = float(r.planned_amount) if r else 0.0
+    approved = float(r.approved_amount) if r else 0.0
+    actual = float(r.actual_amount) if r else 0.0
+    return {
+        "planned": planned,
+        "approved": approved,
+        "actual": actual,
+        "variance": actual - planned,
+        "burn_rate": (actual / planned) if planned > 0 else None,
+    }
+
+
+@router.post("/summary:batch", response_model=BudgetSummaryBatchResponse)
+def budget_summary_batch(payload: BudgetSummaryBatchRequest, db: Session = Depends(get_db), _=Depends(verify_token)):
+    """Summaries of many budgets in one call, by `ids` or by `franchise_id` plus a period range.
+
+    The response is columnar: `columns[name][i]` describes budget `i`, in
+    id order. Besides the `/{budget_id}/summary` fields it has
+    `over_budget` (actuals above the approved amount, or the planned one
+    before approval) and `projected`, the actuals extrapolated to the end
+    of the period (null when the stored period isn't a valid month).
+    """
+    try:
+        return summarize_budgets(db, payload.ids, payload.franchise_id, payload.period_from, payload.period_to)
+    except TooManyBudgets as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.post(":transition", response_model=BudgetTransitionResponse)
+def transition_budgets_batch(payload: BudgetTransitionRequest, db: Session = Depends(get_db), _=Depends(verify_token)):
+    """Move many budgets to `target` at once, by `ids` or by `franchise_id` / `period` / `status`.
+
+    Allowed moves are draft -> approved or rejected, rejected -> draft and
+    approved -> closed; approving fills a missing approved amount with the
+    planned one. Budgets already at `target` are `unchanged` and any other
+    move is `not_allowed`; neither fails the call.
+    """
+    try:
+        result = transition_budgets(db, payload.target, payload.ids, payload.franchise_id, payload.period, payload.status)
+    except TooManyBudgets as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    db.commit()
+    changed = [i for i, outcome in zip(result["columns"]["id"], result["columns"]["outcome"]) if outcome == APPLIED]
+    response_cache.invalidate(*(f"budget:{i}" for i in changed))
+    return result
+
+
+@router.get("/{budget_id}", response_model=BudgetExpanded, response_model_exclude_unset=True)
+def get_budget(budget_id: int, expand: str | None = None, db: Session = Depends(get_db), _=Depends(verify_token)):
+    fields = parse_expand(Budget, expand)
+    b = db.query(Budget).options(*expand_options(Budget, fields)).get(budget_id)
     if not b:
         raise HTTPException(status_code=404, detail="Budget not found")
-    return b
+    return serialize(b, fields)
 
 
 @router.put("/{budget_id}", response_model=BudgetResponse)
@@ -77,11 +245,16 @@ def update_budget(budget_id: int, payload: BudgetUpdate, db: Session = Depends(g
     b = db.query(Budget).get(budget_id)
     if not b:
         raise HTTPException(status_code=404, detail="Budget not found")
+    ensure_open(db, b.period)
+    before = budget_amounts(b)
     data = payload.dict(exclude_unset=True)
     for k, v in data.items():
         setattr(b, k, v)
+    track_budget_change(db, before, budget_amounts(b))
+    record_change(db, "budget", UPDATED, b)
     db.commit()
     db.refresh(b)
+    response_cache.invalidate(f"budget:{budget_id}")
     return b
 
 
@@ -90,8 +263,18 @@ def delete_budget(budget_id: int, db: Session = Depends(get_db), _=Depends(verif
     b = db.query(Budget).get(budget_id)
     if not b:
         raise HTTPException(status_code=404, detail="Budget not found")
+    ensure_open(db, b.period)
+    if db.scalar(select(ExpenseArchive.id).where(ExpenseArchive.budget_id == budget_id).limit(1)) is not None:
+        raise HTTPException(status_code=409, detail="Budget has expenses in a closed period")
+    track_budget_change(db, budget_amounts(b), None)
+    # the budget's expenses go with it (delete-orphan cascade)
+    track_expenses(db, b.expenses, sign=-1)
+    for e in b.expenses:
+        record_change(db, "expense", DELETED, e)
+    record_change(db, "budget", DELETED, b)
     db.delete(b)
     db.commit()
+    response_cache.invalidate(f"budget:{budget_id}")
     return {"message": "Budget deleted"}
 
 
@@ -100,11 +283,16 @@ def approve_budget(budget_id: int, db: Session = Depends(get_db), _=Depends(veri
     b = db.query(Budget).get(budget_id)
     if not b:
         raise HTTPException(status_code=404, detail="Budget not found")
+    ensure_open(db, b.period)
+    before = budget_amounts(b)
     b.status = BudgetStatus.approved
     if b.approved_amount is None:
         b.approved_amount = b.planned_amount
+    track_budget_change(db, before, budget_amounts(b))
+    record_change(db, "budget", UPDATED, b)
     db.commit()
     db.refresh(b)
+    response_cache.invalidate(f"budget:{budget_id}")
     return b
 
 
@@ -113,117 +301,219 @@ def reject_budget(budget_id: int, db: Session = Depends(get_db), _=Depends(verif
     b = db.query(Budget).get(budget_id)
     if not b:
         raise HTTPException(status_code=404, detail="Budget not found")
+    ensure_open(db, b.period)
     b.status = BudgetStatus.rejected
+    record_change(db, "budget", UPDATED, b)
     db.commit()
     db.refresh(b)
+    response_cache.invalidate(f"budget:{budget_id}")
     return b
 
 
 @router.get("/{budget_id}/summary")
-def budget_summary(budget_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
-    b = db.query(Budget).get(budget_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Budget not found")
-    planned = float(b.planned_amount or 0)
-    approved = float(b.approved_amount or 0)
-    actual = float(b.actual_amount or 0)
-    variance = actual - planned
-    burn_rate = (actual / planned) if planned > 0 else None
-    return {
-        "planned": planned,
-        "approved": approved,
-        "actual": actual,
-        "variance": variance,
-        "burn_rate": burn_rate,
-        "currency": b.currency,
-        "status": b.status,
-        "period": b.period,
-    }
+def budget_summary(budget_id: int, request: Request, response: Response, db: Session = Depends(get_db), _=Depends(verify_token)):
+    def build():
+        b = db.query(Budget).get(budget_id)
+        if not b:
+            raise HTTPException(status_code=404, detail="Budget not found")
+        planned = float(b.planned_amount or 0)
+        approved = float(b.approved_amount or 0)
+        actual = float(b.actual_amount or 0)
+        variance = actual - planned
+        burn_rate = (actual / planned) if planned > 0 else None
+        return {
+            "planned": planned,
+            "approved": approved,
+            "actual": actual,
+            "variance": variance,
+            "burn_rate": burn_rate,
+            "currency": b.currency,
+            "status": b.status,
+            "period": b.period,
+        }
 
-
-@router.get("/rollup")
-def rollup(
-    franchise_id: int,
-    period: str,
-    branch_id: int | None = None,
-    db: Session = Depends(get_db),
-    _=Depends(verify_token)
-):
-    q = db.query(
-        func.coalesce(func.sum(Budget.planned_amount), 0),
-        func.coalesce(func.sum(Budget.approved_amount), 0),
-        func.coalesce(func.sum(Budget.actual_amount), 0),
-    ).filter(Budget.franchise_id == franchise_id, Budget.period == period)
-    if branch_id is not None:
-        q = q.filter(Budget.branch_id == branch_id)
-    planned, approved, actual = q.first()
-    planned = float(planned or 0)
-    approved = float(approved or 0)
-    actual = float(actual or 0)
-    return {
-        "planned": planned,
-        "approved": approved,
-        "actual": actual,
-        "variance": actual - planned,
-        "burn_rate": (actual / planned) if planned > 0 else None,
-    }
+    return response_cache.serve(request, response, [f"budget:{budget_id}"], build)
 
 
 expenses_router = APIRouter(prefix="/expenses", tags=["expenses"])
 
 
 @expenses_router.post("", response_model=ExpenseResponse)
-def create_expense(payload: ExpenseCreate, db: Session = Depends(get_db), _=Depends(verify_token)):
+def create_expense(
+    payload: ExpenseCreate,
+    db: Session = Depends(get_db),
+    _=Depends(verify_token),
+    idempotency: IdempotentRequest = Depends(idempotent("POST /expenses")),
+):
+    """Record an expense and add it to its budget's actuals.
+
+    Clients that retry on timeouts should send an `Idempotency-Key` header:
+    a retry with the same key and body gets the first response back
+    (`Idempotent-Replayed: true`) instead of a second expense.
+    """
+    replayed = idempotency.replay(db)
+    if replayed:
+        return replayed
     exp = Expense(**payload.dict())
-    db.add(exp)
-    # update related budget actuals if linked
+    budget_period = db.scalar(select(Budget.period).where(Budget.id == exp.budget_id)) if exp.budget_id else None
+    ensure_open(db, period_of(exp.date), budget_period)
+    # update related budget actuals if linked; the write comes first so the
+    # transaction takes the budget's row lock before reading anything
     if exp.budget_id:
-        b = db.query(Budget).get(exp.budget_id)
-        if b:
-            b.actual_amount = func.coalesce(b.actual_amount, 0) + exp.amount
-    db.commit()
+        post_actual(db, exp.budget_id, exp.amount)
+    track_expenses(db, [exp])
+    db.add(exp)
+    record_change(db, "expense", CREATED, exp)
+    replayed = idempotency.commit(db, ExpenseResponse, exp)
+    if replayed:
+        return replayed
     db.refresh(exp)
+    if exp.budget_id:
+        response_cache.invalidate(f"budget:{exp.budget_id}")
     return exp
 
 
-@expenses_router.get("", response_model=list[ExpenseResponse])
+@expenses_router.post("/bulk", response_model=ExpenseBulkResponse)
+async def create_expenses_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    _=Depends(verify_token),
+    idempotency: IdempotentRequest = Depends(idempotent("POST /expenses/bulk")),
+):
+    """Insert many expenses from a JSON array or an NDJSON body (`application/x-ndjson`).
+
+    Rows that fail validation are reported by index in `errors`; all other
+    rows are inserted and each linked budget's actuals are updated once.
+    `Idempotency-Key` works as for `POST /expenses`.
+    """
+    try:
+        rows = parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await run_in_threadpool(lambda: idempotency.replay(db) or ingest_expenses(db, rows, idempotency))
+
+
+@expenses_router.get("", response_model=list[ExpenseExpanded], response_model_exclude_unset=True)
 def list_expenses(
+    response: Response,
     franchise_id: int | None = None,
     branch_id: int | None = None,
     budget_id: int | None = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = None,
+    expand: str | None = None,
     db: Session = Depends(get_db),
     _=Depends(verify_token)
 ):
-    q = db.query(Expense)
-    if franchise_id is not None:
-        q = q.filter(Expense.franchise_id == franchise_id)
-    if branch_id is not None:
-        q = q.filter(Expense.branch_id == branch_id)
-    if budget_id is not None:
-        q = q.filter(Expense.budget_id == budget_id)
-    return q.order_by(Expense.date.desc()).offset(skip).limit(limit).all()
+    fields = parse_expand(Expense, expand)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, (date, int))
 
+    def page(model):
+        q = select(*(getattr(model, name) for name in ExpenseResponse.model_fields))
+        q = _filter_expenses(q, franchise_id, branch_id, budget_id, model)
+        if cursor:
+            q = q.filter(tuple_(model.date, model.id) < (last_date, last_id))
+        # id breaks ties between same-day expenses so the keyset order is total
+        return q.order_by(model.date.desc(), model.id.desc()).limit(limit if cursor else skip + limit)
 
-@expenses_router.get("/{expense_id}", response_model=ExpenseResponse)
-def get_expense(expense_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
-    e = db.query(Expense).get(expense_id)
+    # each table returns its own first page through its index; the merge only sorts those rows
+    rows = with_archive(page)
+    if not fields:
+        q = select(rows)
+    else:
+        merged = aliased(Expense, rows)
+        q = db.query(merged).options(*expand_options(Expense, fields, merged))
+    q = q.order_by(rows.c.date.desc(), rows.c.id.desc())
+    if not cursor:
+        q = q.offset(skip)
+    q = q.limit(limit)
+    if not fields:
+        expenses = lean_rows(db, q)
+        set_next_cursor(response, expenses, limit, lambda e: [e["date"].isoformat(), e["id"]])
+        return lean_response(expenses, response)
+    expenses = q.all()
+    set_next_cursor(response, expenses, limit, lambda e: [e.date.isoformat(), e.id])
+    return [serialize(e, fields) for e in expenses]
+
+
+@expenses_router.get("/export")
+def export_expenses(
+    franchise_id: int | None = None,
+    branch_id: int | None = None,
+    budget_id: int | None = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    _=Depends(verify_token)
+):
+    """Stream every matching expense as NDJSON or CSV, in `list_expenses` order."""
+    rows = with_archive(lambda model: _filter_expenses(
+        select(*(getattr(model, c) for c in EXPENSE_EXPORT_COLUMNS)), franchise_id, branch_id, budget_id, model
+    ))
+    stmt = select(rows).order_by(rows.c.date.desc(), rows.c.id.desc())
+    return export_response(stmt, EXPENSE_EXPORT_COLUMNS, format, "expenses")
+
+
+@expenses_router.get("/aggregate", response_model=ExpenseAggregateResponse)
+def aggregate(
+    group_by: str | None = Query(None, description="Comma-separated: day, week, month, category, franchise, branch, budget"),
+    franchise_id: list[int] | None = Query(None),
+    branch_id: int | None = None,
+    budget_id: int | None = None,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    source: str = Query("live", pattern="^(live|snapshot)$"),
+    db: Session = Depends(get_db),
+    _=Depends(verify_token)
+):
+    """Expense count and total per group, e.g. `?group_by=category,month&franchise_id=1&franchise_id=2`.
+
+    Repeat `franchise_id` to cover several franchises. The response is
+    columnar: `columns[key][i]` for each group key, `columns["count"][i]`
+    and `columns["total"][i]` describe row `i`.
+
+    `source=snapshot` answers from the Parquet snapshot (see
+    `python manage.py snapshots export`) without querying the database;
+    `as_of` says when it was taken.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    keys = parse_group_by(group_by)
+    if source == "snapshot":
+        try:
+            return run_blocking(aggregate_snapshot, keys, franchise_id, branch_id, budget_id, date_from, date_to)
+        except SnapshotUnavailable as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+    return aggregate_expenses(db, keys, franchise_id, branch_id, budget_id, date_from, date_to)
+
+
+@expenses_router.get("/{expense_id}", response_model=ExpenseExpanded, response_model_exclude_unset=True)
+def get_expense(expense_id: int, expand: str | None = None, db: Session = Depends(get_db), _=Depends(verify_token)):
+    fields = parse_expand(Expense, expand)
+    e = db.query(Expense).options(*expand_options(Expense, fields)).get(expense_id)
+    if not e:
+        e = _archived_expense(db, expense_id, fields)
     if not e:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return e
+    return serialize(e, fields)
 
 
 @expenses_router.delete("/{expense_id}")
 def delete_expense(expense_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
     e = db.query(Expense).get(expense_id)
     if not e:
+        archived = _archived_expense(db, expense_id)
+        if archived:
+            ensure_open(db, period_of(archived.date))
         raise HTTPException(status_code=404, detail="Expense not found")
+    ensure_open(db, period_of(e.date), e.budget.period if e.budget_id else None)
     # adjust budget actual if linked
     if e.budget_id:
-        b = db.query(Budget).get(e.budget_id)
-        if b:
-            b.actual_amount = func.coalesce(b.actual_amount, 0) - e.amount
+        post_actual(db, e.budget_id, -e.amount)
+    track_expenses(db, [e], sign=-1)
+    record_change(db, "expense", DELETED, e)
     db.delete(e)
     db.commit()
+    if e.budget_id:
+        response_cache.invalidate(f"budget:{e.budget_id}")
     return {"message": "Expense deleted"}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+from app.changes import event_stream
+from app.routes.auth import verify_token
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("")
+async def events(
+    franchise_id: list[int] | None = Query(None),
+    last_event_id: int | None = Header(None),
+    _=Depends(verify_token)
+):
+    """Server-sent events for creates, updates and deletes of franchises, branches, budgets and expenses.
+
+    Repeat `franchise_id` to follow several franchises; without it every
+    change is sent. Each `change` event carries `seq`, `franchise_id`,
+    `entity`, `op` (created, updated, deleted), the record's `id` and, unless
+    deleted, its `data` as the API returns it. Expense events don't repeat
+    the budget: its `actual_amount` moves by the expense's amount.
+
+    The stream starts with a `ready` event once any missed changes have
+    been replayed. Reconnect with `Last-Event-ID` set to the last `id`
+    received to resume; a `reset` event instead means the missed changes
+    are no longer kept and the client should refetch. Streams end after
+    `EVENTS_MAX_STREAM_SECONDS`, so clients should always reconnect.
+    """
+    return StreamingResponse(
+        event_stream(franchise_id, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app.routes.auth import verify_token
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -7,6 +7,13 @@ from app.models.franchise import Franchise
 from app.schemas.franchise import FranchiseCreate, FranchiseUpdate, FranchiseResponse
 from app.models.branch import Branch
 from app.schemas.branch import BranchResponse
+from app.pagination import decode_cursor, set_next_cursor
+from app.cache import response_cache
+from app.changes import CREATED, DELETED, UPDATED, record_change
+from app.expand import expand_options, parse_expand, serialize
+from app.lean import lean_response, lean_rows, lean_select
+from app.schemas.expand import FranchiseExpanded
+from app.search import index_franchise, matching_ids, unindex_franchise
 
 router = APIRouter(prefix="/franchises", tags=["franchises"])
 
@@ -19,17 +26,24 @@ def create_franchise(franchise: FranchiseCreate, db: Session = Depends(get_db),
     
     new_franchise = Franchise(**franchise.dict())
     db.add(new_franchise)
+    db.flush()
+    index_franchise(db, new_franchise)
+    record_change(db, "franchise", CREATED, new_franchise)
     db.commit()
     db.refresh(new_franchise)
+    response_cache.invalidate("franchises")
     return new_franchise
 
 
-@router.get("", response_model=list[FranchiseResponse])
+@router.get("", response_model=list[FranchiseExpanded], response_model_exclude_unset=True)
 def list_franchises(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     search: str = Query(None),
     is_active: bool = Query(None),
+    cursor: str = Query(None),
+    expand: str = Query(None),
     db: Session = Depends(get_db),
     _=Depends(verify_token)
 ):
@@ -38,41 +52,73 @@ def list_franchises(
     
     - **skip**: Pagination offset (default: 0)
     - **limit**: Number of items to return (default: 10, max: 100)
-    - **search**: Search by franchise name
+    - **search**: Search by franchise name or tax number, ignoring case and accents
     - **is_active**: Filter by active status
+    - **cursor**: Keyset cursor from the `X-Next-Cursor` header of the previous page (replaces `skip`)
+    - **expand**: Nest related data, e.g. `branches`
     """
-    query = db.query(Franchise)
-    
+    fields = parse_expand(Franchise, expand)
+    query = lean_select(Franchise) if not fields else db.query(Franchise).options(*expand_options(Franchise, fields))
+
     if search:
-        query = query.filter(Franchise.name.ilike(f"%{search}%"))
+        query = query.filter(Franchise.id.in_(matching_ids(db, search, "franchise")))
     
     if is_active is not None:
         query = query.filter(Franchise.is_active == is_active)
     
-    franchises = query.offset(skip).limit(limit).all()
-    return franchises
+    query = query.order_by(Franchise.id)
+    if cursor:
+        (last_id,) = decode_cursor(cursor, (int,))
+        query = query.filter(Franchise.id > last_id)
+    else:
+        query = query.offset(skip)
+
+    query = query.limit(limit)
+    if not fields:
+        franchises = lean_rows(db, query)
+        set_next_cursor(response, franchises, limit, lambda f: [f["id"]])
+        return lean_response(franchises, response)
+    franchises = query.all()
+    set_next_cursor(response, franchises, limit, lambda f: [f.id])
+    return [serialize(f, fields) for f in franchises]
 
 
 @router.get("/stats", response_model=dict)
-def get_franchise_stats(db: Session = Depends(get_db), _=Depends(verify_token)):
+def get_franchise_stats(request: Request, response: Response, db: Session = Depends(get_db), _=Depends(verify_token)):
     """Get franchise statistics"""
-    total = db.query(func.count(Franchise.id)).scalar()
-    active = db.query(func.count(Franchise.id)).filter(Franchise.is_active == True).scalar()
-    inactive = total - active if total else 0
-    
-    return {
-        "total_franchises": total or 0,
-        "active_franchises": active or 0,
-        "inactive_franchises": inactive
-    }
+    def build():
+        total = db.query(func.count(Franchise.id)).scalar()
+        active = db.query(func.count(Franchise.id)).filter(Franchise.is_active == True).scalar()
+        inactive = total - active if total else 0
 
+        return {
+            "total_franchises": total or 0,
+            "active_franchises": active or 0,
+            "inactive_franchises": inactive
+        }
 
-@router.get("/{franchise_id}", response_model=FranchiseResponse)
-def get_franchise(franchise_id: int, db: Session = Depends(get_db), _=Depends(verify_token)):
-    franchise = db.query(Franchise).filter(Franchise.id == franchise_id).first()
-    if not franchise:
-        raise HTTPException(status_code=404, detail="Franchise not found")
-    return franchise
+    return response_cache.serve(request, response, ["franchises"], build)
+
+
+@router.get("/{franchise_id}", response_model=FranchiseExpanded, response_model_exclude_unset=True)
+def get_franchise(franchise_id: int, request: Request, response: Response, expand: str = Query(None), db: Session = Depends(get_db), _=Depends(verify_token)):
+    fields = parse_expand(Franchise, expand)
+
+    def build():
+        franchise = (
+            db.query(Franchise)
+            .options(*expand_options(Franchise, fields))
+            .filter(Franchise.id == franchise_id)
+            .first()
+        )
+        if not franchise:
+            raise HTTPException(status_code=404, detail="Franchise not found")
+        return serialize(franchise, fields)
+
+    tags = [f"franchise:{franchise_id}"]
+    if "branches" in fields:
+        tags.append(f"branches:franchise:{franchise_id}")
+    return response_cache.serve(request, response, tags, build)
 
 
 @router.put("/{franchise_id}", response_model=FranchiseResponse)
@@ -89,9 +135,13 @@ def update_franchise(
     update_data = franchise_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(franchise, key, value)
-    
+    if "name" in update_data:
+        index_franchise(db, franchise)
+    record_change(db, "franchise", UPDATED, franchise)
+
     db.commit()
     db.refresh(franchise)
+    response_cache.invalidate("franchises", f"franchise:{franchise_id}")
     return franchise
 
 
@@ -101,14 +151,22 @@ def delete_franchise(franchise_id: int, db: Session = Depends(get_db), _=Depends
     if not franchise:
         raise HTTPException(status_code=404, detail="Franchise not found")
     
+    unindex_franchise(db, franchise_id)
+    record_change(db, "franchise", DELETED, franchise)
     db.delete(franchise)
     db.commit()
+    # branches go with the franchise through the ORM cascade
+    response_cache.invalidate(
+        "franchises", f"franchise:{franchise_id}", "branches", f"branches:franchise:{franchise_id}"
+    )
     return {"message": "Franchise deleted successfully"}
 
 
 @router.get("/{franchise_id}/branches", response_model=list[BranchResponse])
 def list_branches_for_franchise(
     franchise_id: int,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     db: Session = Depends(get_db),
@@ -117,14 +175,10 @@ def list_branches_for_franchise(
     """Alias route to list branches under a specific franchise.
     Mirrors GET /branches?franchise_id=... but matches the case study path.
     """
-    franchise = db.query(Franchise).filter(Franchise.id == franchise_id).first()
-    if not franchise:
-        raise HTTPException(status_code=404, detail="Franchise not found")
-    branches = (
-        db.query(Branch)
-        .filter(Branch.franchise_id == franchise_id)
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return branches
+    def build():
+        franchise = db.query(Franchise).filter(Franchise.id == franchise_id).first()
+        if not franchise:
+            raise HTTPException(status_code=404, detail="Franchise not found")
+        return lean_rows(db, lean_select(Branch).filter(Branch.franchise_id == franchise_id).offset(skip).limit(limit))
+
+    return response_cache.serve(request, response, [f"branches:franchise:{franchise_id}"], build)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from app.routes.auth import verify_token
+from app.database.database import get_db
+from app.cache import response_cache
+from app.schemas.search import SearchResult
+from app.search import SEARCH_KINDS, search as run_search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=list[SearchResult])
+def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    kind: list[str] | None = Query(None, description="franchise, branch; repeat for both (the default)"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    _=Depends(verify_token)
+):
+    """Typeahead over franchise names and tax numbers and branch names and cities.
+
+    Matching ignores case and accents (`cankaya` finds `Çankaya`) and
+    accepts any substring of three or more characters; shorter queries
+    match from the start of the name. Best matches come first.
+    """
+    kinds = kind or list(SEARCH_KINDS)
+    unknown = [k for k in kinds if k not in SEARCH_KINDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kind {', '.join(unknown)}; choose from {', '.join(SEARCH_KINDS)}")
+    return response_cache.serve(request, response, ["franchises", "branches"], lambda: run_search(db, q, limit, kinds))
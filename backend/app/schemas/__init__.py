@@ -6,7 +6,16 @@ from .budget import (
     BudgetResponse,
     ExpenseCreate,
     ExpenseResponse,
+    ExpenseBulkError,
+    ExpenseBulkResponse,
+    ExpenseAggregateResponse,
+    BudgetSummaryBatchRequest,
+    BudgetSummaryBatchResponse,
+    BudgetTransitionRequest,
+    BudgetTransitionResponse,
 )
+from .search import SearchResult
+from .expand import FranchiseExpanded, BranchExpanded, BudgetExpanded, ExpenseExpanded
 
 __all__ = [
     "FranchiseCreate",
@@ -22,4 +31,20 @@ __all__ += [
     "BudgetResponse",
     "ExpenseCreate",
     "ExpenseResponse",
+    "ExpenseBulkError",
+    "ExpenseBulkResponse",
+    "ExpenseAggregateResponse",
+    "BudgetSummaryBatchRequest",
+    "BudgetSummaryBatchResponse",
+    "BudgetTransitionRequest",
+    "BudgetTransitionResponse",
 ]
+
+__all__ += [
+    "FranchiseExpanded",
+    "BranchExpanded",
+    "BudgetExpanded",
+    "ExpenseExpanded",
+]
+
+__all__ += ["SearchResult"]
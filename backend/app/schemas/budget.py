@@ -1,6 +1,7 @@
 from datetime import date
 from typing import Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+from app.models.budget import BudgetStatus
 
 
 class BudgetCreate(BaseModel):
@@ -57,3 +58,74 @@ class ExpenseResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ExpenseBulkError(BaseModel):
+    index: int
+    detail: str
+
+
+class ExpenseBulkResponse(BaseModel):
+    inserted: int
+    errors: list[ExpenseBulkError]
+
+
+class ExpenseAggregateResponse(BaseModel):
+    group_by: list[str]
+    rows: int
+    # one list per group key, plus "count" and "total"
+    columns: dict[str, list]
+    # export time of the snapshot that answered a source=snapshot query
+    as_of: Optional[str] = None
+
+
+class BudgetSummaryBatchRequest(BaseModel):
+    # either explicit ids or a franchise/period scope
+    ids: Optional[list[int]] = Field(None, min_length=1)
+    franchise_id: Optional[list[int]] = None
+    period_from: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")
+    period_to: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")
+
+    @model_validator(mode="after")
+    def check_scope(self):
+        if self.ids is None and not self.franchise_id:
+            raise ValueError("Give either ids or franchise_id")
+        if self.period_from and self.period_to and self.period_from > self.period_to:
+            raise ValueError("period_from must not be after period_to")
+        return self
+
+
+class BudgetSummaryBatchResponse(BaseModel):
+    rows: int
+    # id, franchise_id, period, currency, status, planned, approved, actual,
+    # variance, burn_rate, over_budget, projected, projected_over_budget
+    columns: dict[str, list]
+    # requested ids that don't exist
+    missing: list[int]
+    # date the projections were computed for
+    as_of: str
+
+
+class BudgetTransitionRequest(BaseModel):
+    target: BudgetStatus
+    # either explicit ids or a filter with at least a franchise or a period
+    ids: Optional[list[int]] = Field(None, min_length=1)
+    franchise_id: Optional[int] = None
+    period: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}$")
+    status: Optional[BudgetStatus] = None
+
+    @model_validator(mode="after")
+    def check_scope(self):
+        if self.ids is None and self.franchise_id is None and self.period is None:
+            raise ValueError("Give either ids or a franchise_id / period filter")
+        return self
+
+
+class BudgetTransitionResponse(BaseModel):
+    target: BudgetStatus
+    # budgets per outcome: applied, unchanged (already at target), not_allowed
+    counts: dict[str, int]
+    # id, previous_status, outcome; one entry per budget in scope, in id order
+    columns: dict[str, list]
+    # requested ids that don't exist
+    missing: list[int]
@@ -0,0 +1,23 @@
+from typing import Optional
+from app.schemas.branch import BranchResponse
+from app.schemas.budget import BudgetResponse, ExpenseResponse
+from app.schemas.franchise import FranchiseResponse
+
+
+class FranchiseExpanded(FranchiseResponse):
+    branches: Optional[list[BranchResponse]] = None
+
+
+class BranchExpanded(BranchResponse):
+    franchise: Optional[FranchiseResponse] = None
+
+
+class BudgetExpanded(BudgetResponse):
+    franchise: Optional[FranchiseResponse] = None
+    branch: Optional[BranchResponse] = None
+
+
+class ExpenseExpanded(ExpenseResponse):
+    budget: Optional[BudgetResponse] = None
+    franchise: Optional[FranchiseResponse] = None
+    branch: Optional[BranchResponse] = None
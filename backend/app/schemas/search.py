@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    kind: str  # franchise | branch
+    id: int
+    franchise_id: int
+    title: str
+    # tax number for a franchise, city for a branch
+    subtitle: str
@@ -0,0 +1,200 @@
+"""Typeahead search over franchise and branch names for `GET /search`.
+
+Every franchise (name, tax number) and branch (name, city) has a row in
+`search_entries` whose `terms` hold its text folded by `normalize`: lower
+case, with the Turkish dotted and dotless i and every other diacritic
+reduced to its base letter, so `istanbul`, `ISTANBUL` and `İstanbul` all
+find `İstanbul`. The franchise and branch write routes call
+`index_franchise` / `index_branch` / `unindex_*` in the same transaction
+as the change; `rebuild_search_index` recreates everything.
+
+Substring matching uses a trigram index: an FTS5 table with the trigram
+tokenizer on SQLite (filled by triggers on `search_entries`) and a pg_trgm
+GIN index on PostgreSQL, both created by migration 0004. Words shorter
+than three characters can't be looked up by trigram; a query made only of
+those is answered as a prefix match on the plain `terms` index.
+
+Results whose text starts with the first word of the query rank first,
+then by how much of the text the query covers: trigram similarity on
+PostgreSQL, the shortest text on SQLite (FTS5's bm25 would have to read
+the full match list of every word first). Only the first
+`SEARCH_CANDIDATES` matches are ranked, so a query matching half the
+table costs about as much as a rare one.
+"""
+import re
+import unicodedata
+from typing import Optional
+from sqlalchemy import case, column, delete, func, insert, literal_column, select, table
+from sqlalchemy.orm import Session
+from app.models.branch import Branch
+from app.models.franchise import Franchise
+from app.models.search import SearchEntry
+
+SEARCH_KINDS = ("franchise", "branch")
+
+# Matches ranked per query; anything beyond is dropped before sorting
+SEARCH_CANDIDATES = 500
+
+# Rows inserted per round trip by `rebuild_search_index`
+REBUILD_BATCH_SIZE = 10_000
+
+# Trigram tokens need at least this many characters
+TRIGRAM = 3
+
+# Turkish i's fold to plain "i" before lowercasing; str.lower() turns İ into "i̇"
+_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+_fts = table("search_fts", column("rowid"))
+
+
+def normalize(text: str) -> str:
+    """Fold `text` for matching: lower case, no diacritics, single spaces between words."""
+    text = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _set_entry(db: Session, kind: str, ref_id: int, franchise_id: int, title: str, subtitle: str) -> None:
+    entry = db.scalar(select(SearchEntry).where(SearchEntry.kind == kind, SearchEntry.ref_id == ref_id))
+    if entry is None:
+        entry = SearchEntry(kind=kind, ref_id=ref_id)
+        db.add(entry)
+    entry.franchise_id = franchise_id
+    entry.title = title
+    entry.subtitle = subtitle
+    entry.terms = normalize(f"{title} {subtitle}")
+
+
+def index_franchise(db: Session, franchise: Franchise) -> None:
+    """Add or refresh a franchise's entry; call after the franchise is flushed."""
+    _set_entry(db, "franchise", franchise.id, franchise.id, franchise.name, franchise.tax_number)
+
+
+def index_branch(db: Session, branch: Branch) -> None:
+    """Add or refresh a branch's entry; call after the branch is flushed."""
+    _set_entry(db, "branch", branch.id, branch.franchise_id, branch.name, branch.city)
+
+
+def unindex_franchise(db: Session, franchise_id: int) -> None:
+    """Remove a franchise's entry along with those of its branches."""
+    db.execute(delete(SearchEntry).where(SearchEntry.franchise_id == franchise_id))
+
+
+def unindex_branch(db: Session, branch_id: int) -> None:
+    db.execute(delete(SearchEntry).where(SearchEntry.kind == "branch", SearchEntry.ref_id == branch_id))
+
+
+def _entry_rows(db):
+    sources = (
+        ("franchise", Franchise.id, (Franchise.id, Franchise.id, Franchise.name, Franchise.tax_number)),
+        ("branch", Branch.id, (Branch.id, Branch.franchise_id, Branch.name, Branch.city)),
+    )
+    for kind, key, columns in sources:
+        # keyset pages rather than one open cursor, so inserts can run between them
+        last_id = 0
+        while True:
+            chunk = db.execute(select(*columns).where(key > last_id).order_by(key).limit(REBUILD_BATCH_SIZE)).all()
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            yield [
+                {"kind": kind, "ref_id": ref_id, "franchise_id": f_id, "title": title,
+                 "subtitle": subtitle, "terms": normalize(f"{title} {subtitle}")}
+                for ref_id, f_id, title, subtitle in chunk
+            ]
+
+
+def rebuild_search_index(db) -> int:
+    """Replace every entry with one built from `franchises` and `branches`; returns the row count.
+
+    Takes a Session or a Connection and leaves committing to the caller.
+    """
+    db.execute(delete(SearchEntry))
+    count = 0
+    for rows in _entry_rows(db):
+        db.execute(insert(SearchEntry), rows)
+        count += len(rows)
+    return count
+
+
+def _split(query: str) -> tuple[list[str], list[str]]:
+    words = normalize(query).split()
+    return [w for w in words if len(w) >= TRIGRAM], [w for w in words if len(w) < TRIGRAM]
+
+
+def _matches(dialect: str, long_words: list[str], short_words: list[str], kinds):
+    """Select (id, score) of entries containing every word; lower scores rank higher."""
+    if dialect == "sqlite":
+        phrase = " ".join(f'"{w}"' for w in long_words)
+        stmt = (
+            select(SearchEntry.id, func.length(SearchEntry.terms).label("score"))
+            .select_from(_fts)
+            .join(SearchEntry, SearchEntry.id == _fts.c.rowid)
+            .where(literal_column("search_fts").op("MATCH", is_comparison=True)(phrase))
+        )
+    else:
+        # the LIKE '%word%' filters are served by pg_trgm's GIN index
+        score = -func.similarity(SearchEntry.terms, " ".join(long_words))
+        stmt = select(SearchEntry.id, score.label("score")).where(
+            *(SearchEntry.terms.contains(w, autoescape=True) for w in long_words)
+        )
+    return stmt.where(
+        *_kind_filter(kinds),
+        *(SearchEntry.terms.contains(w, autoescape=True) for w in short_words),
+    )
+
+
+def _kind_filter(kinds) -> list:
+    # no condition when every kind is wanted, so it can't steer the planner off the terms indexes
+    return [] if set(kinds) >= set(SEARCH_KINDS) else [SearchEntry.kind.in_(kinds)]
+
+
+def _prefix_range(prefix: str):
+    # a range the plain terms index can serve; LIKE 'ab%' can't use it on SQLite
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return (SearchEntry.terms >= prefix, SearchEntry.terms < upper, SearchEntry.terms.startswith(prefix, autoescape=True))
+
+
+def search(db: Session, query: str, limit: int = 10, kinds: Optional[list[str]] = None) -> list[dict]:
+    """Best `limit` franchises and branches for a typeahead `query`."""
+    kinds = kinds or list(SEARCH_KINDS)
+    folded = normalize(query)
+    if not folded:
+        return []
+    long_words, short_words = _split(query)
+    columns = (SearchEntry.kind, SearchEntry.ref_id, SearchEntry.franchise_id, SearchEntry.title, SearchEntry.subtitle)
+
+    if not long_words:
+        stmt = (
+            select(*columns)
+            .where(*_prefix_range(folded), *_kind_filter(kinds))
+            .order_by(SearchEntry.terms, SearchEntry.id)
+            .limit(limit)
+        )
+    else:
+        dialect = db.get_bind().dialect.name
+        candidates = _matches(dialect, long_words, short_words, kinds).limit(SEARCH_CANDIDATES).subquery()
+        starts_with = case((SearchEntry.terms.startswith(folded.split()[0], autoescape=True), 0), else_=1)
+        stmt = (
+            select(*columns)
+            .join(candidates, candidates.c.id == SearchEntry.id)
+            .order_by(starts_with, candidates.c.score, SearchEntry.title, SearchEntry.id)
+            .limit(limit)
+        )
+    return [
+        {"kind": kind, "id": ref_id, "franchise_id": f_id, "title": title, "subtitle": subtitle}
+        for kind, ref_id, f_id, title, subtitle in db.execute(stmt)
+    ]
+
+
+def matching_ids(db: Session, query: str, kind: str):
+    """Select the ids of every `kind` record matching `query`, for filtering list endpoints."""
+    long_words, short_words = _split(query)
+    if long_words:
+        ids = _matches(db.get_bind().dialect.name, long_words, short_words, [kind]).with_only_columns(SearchEntry.ref_id)
+    else:
+        ids = select(SearchEntry.ref_id).where(
+            SearchEntry.kind == kind,
+            *(SearchEntry.terms.contains(w, autoescape=True) for w in short_words),
+        )
+    return ids
@@ -1,16 +1,57 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
+from app.users import get_user, set_password_hash
 
 # Security configuration
-SECRET_KEY = "your-secret-key-change-in-production"  # Change in .env
-ALGORITHM = "HS256"
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")  # Change in .env
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Asymmetric algorithms (RS256/ES256, ...) sign with the private key and verify
+# with the public key, so verifying nodes never need signing material.
+JWT_PRIVATE_KEY_PATH = os.getenv("JWT_PRIVATE_KEY_PATH")
+JWT_PUBLIC_KEY_PATH = os.getenv("JWT_PUBLIC_KEY_PATH")
+
+# Verified tokens kept in memory, so repeat requests skip the signature check
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+def _read_key(path: Optional[str]) -> Optional[str]:
+    if not path:
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+if ALGORITHM.startswith("HS"):
+    SIGNING_KEY = VERIFICATION_KEY = SECRET_KEY
+else:
+    # Loaded once at import; a verify-only node ships just the public key
+    SIGNING_KEY = _read_key(JWT_PRIVATE_KEY_PATH)
+    VERIFICATION_KEY = _read_key(JWT_PUBLIC_KEY_PATH)
+
+# pbkdf2 cost; raising it makes existing hashes "need update" and they are
+# re-hashed on the user's next successful login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+# Threads reserved for hashing; hashlib's pbkdf2 releases the GIL, so these run in parallel
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
 # Use pbkdf2_sha256 to avoid bcrypt backend issues on Windows environments
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__rounds=PASSWORD_HASH_ROUNDS
+)
+
+# Dedicated pool so a burst of logins cannot starve the request threadpool
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 
 class Token(BaseModel):
@@ -33,19 +74,6 @@ class UserInDB(User):
     hashed_password: str
 
 
-# Mock user database (use real DB in production)
-fake_users_db = {
-    "admin": {
-        "username": "admin",
-        "full_name": "Admin User",
-        "email": "admin@franchise.com",
-        # Generate a stable hash for demo password 'secret' using pbkdf2_sha256
-        "hashed_password": CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto").hash("secret"),
-        "disabled": False,
-    }
-}
-
-
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     try:
         return pwd_context.verify(plain_password, hashed_password)
@@ -59,14 +87,35 @@ def get_password_hash(password: str) -> str:
 
 
 def authenticate_user(username: str, password: str):
-    user = fake_users_db.get(username)
+    user = get_user(username)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    try:
+        valid, new_hash = pwd_context.verify_and_update(password, user["hashed_password"])
+    except ValueError:
+        return False
+    if not valid:
         return False
+    if new_hash:
+        # cost policy changed since this hash was made
+        set_password_hash(username, new_hash)
     return user
 
 
+async def _run_in_hash_pool(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+
+
+async def authenticate_user_async(username: str, password: str):
+    """`authenticate_user` without blocking the event loop."""
+    return await _run_in_hash_pool(authenticate_user, username, password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """`get_password_hash` without blocking the event loop."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -74,5 +123,59 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    if SIGNING_KEY is None:
+        raise RuntimeError("JWT_PRIVATE_KEY_PATH must be set to issue tokens")
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+
+class TokenCache:
+    """Bounded LRU of token -> verified claims; entries expire with the token's `exp`."""
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            claims = self._entries.get(token)
+            if claims is None:
+                return None
+            if claims["exp"] <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        with self._lock:
+            self._entries[token] = claims
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_access_token(token: str) -> dict:
+    """Return the claims of a valid token, raising `JWTError` otherwise.
+
+    Signature and expiry are checked once per token; later calls are a
+    cache lookup until the token expires.
+    """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    if VERIFICATION_KEY is None:
+        raise JWTError("No verification key configured")
+    claims = jwt.decode(token, VERIFICATION_KEY, algorithms=[ALGORITHM])
+    if "exp" not in claims or not claims.get("sub"):
+        raise JWTError("Token is missing required claims")
+    token_cache.put(token, claims)
+    return claims
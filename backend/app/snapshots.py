@@ -0,0 +1,254 @@
+"""Parquet snapshots of expenses and budgets for reporting off the primary database.
+
+    SNAPSHOT_DIR/
+        _state.json                                   high-water mark, last export time
+        expenses/franchise_id=3/period=2025-05/part-<after_id>-<n>-0.parquet
+        budgets/franchise_id=3/period=2025-05/part-0.parquet
+
+Each `export_snapshot` run appends only expenses with an id above the
+recorded high-water mark, and rewrites the (small) budgets dataset. Deleted
+expenses stay in the snapshot until the next `full=True` export, so
+schedule one regularly (e.g. nightly) next to the incremental runs.
+
+`aggregate_snapshot` answers the same queries as
+`app.analytics.aggregate_expenses` from these files with Arrow's vectorized
+group-by, pruning partitions by franchise and period.
+
+Needs `pip install pyarrow`.
+"""
+import json
+import os
+import shutil
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import func, select
+from app.database.database import SessionLocal
+from app.models.budget import Budget
+from app.periods import with_archive
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", "./snapshots"))
+
+# Rows fetched from the database and written per Arrow batch
+SNAPSHOT_CHUNK_SIZE = 100_000
+
+EXPENSE_COLUMNS = ["id", "franchise_id", "branch_id", "budget_id", "date", "category", "amount"]
+# aggregate group key -> snapshot column it is computed from
+SOURCE_COLUMNS = {
+    "day": "date", "week": "date", "month": "period", "category": "category",
+    "franchise": "franchise_id", "branch": "branch_id", "budget": "budget_id",
+}
+
+BUDGET_COLUMNS = [
+    "id", "franchise_id", "branch_id", "period", "currency",
+    "planned_amount", "approved_amount", "actual_amount", "status",
+]
+
+
+class SnapshotUnavailable(RuntimeError):
+    pass
+
+
+def _arrow():
+    try:
+        import pyarrow  # optional dependency, only needed for snapshots
+        import pyarrow.compute
+        import pyarrow.dataset
+    except ImportError:
+        raise SnapshotUnavailable("Snapshots need pyarrow: pip install pyarrow")
+    return pyarrow
+
+
+def _schemas(pa):
+    expenses = pa.schema([
+        ("id", pa.int64()), ("franchise_id", pa.int64()), ("branch_id", pa.int64()),
+        ("budget_id", pa.int64()), ("date", pa.date32()), ("category", pa.string()),
+        ("amount", pa.decimal128(12, 2)), ("period", pa.string()),
+    ])
+    budgets = pa.schema([
+        ("id", pa.int64()), ("franchise_id", pa.int64()), ("branch_id", pa.int64()),
+        ("period", pa.string()), ("currency", pa.string()),
+        ("planned_amount", pa.decimal128(12, 2)), ("approved_amount", pa.decimal128(12, 2)),
+        ("actual_amount", pa.decimal128(12, 2)), ("status", pa.string()),
+    ])
+    partitioning = pa.dataset.partitioning(
+        pa.schema([("franchise_id", pa.int64()), ("period", pa.string())]), flavor="hive"
+    )
+    return expenses, budgets, partitioning
+
+
+def read_state(root: Optional[Path] = None) -> dict:
+    root = root or SNAPSHOT_DIR
+    try:
+        return json.loads((root / "_state.json").read_text())
+    except FileNotFoundError:
+        return {"expenses_max_id": 0, "exported_at": None}
+
+
+def _write_state(root: Path, state: dict) -> None:
+    tmp = root / f"_state.json.{uuid.uuid4().hex}"
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, root / "_state.json")
+
+
+def _write(pa, table, base_dir: Path, partitioning, basename: str) -> None:
+    pa.dataset.write_dataset(
+        table, base_dir, format="parquet", partitioning=partitioning,
+        basename_template=basename + "-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def _export_expenses(pa, db, base_dir: Path, schema, partitioning, after_id: int) -> tuple[int, int]:
+    # Leftovers of an interrupted run from the same high-water mark would duplicate rows
+    for stale in base_dir.glob(f"*/*/part-{after_id}-*.parquet"):
+        stale.unlink()
+    # archived expenses are exported like live ones, so a full rebuild keeps closed periods
+    expenses = with_archive(
+        lambda model: select(*(getattr(model, c) for c in EXPENSE_COLUMNS)).where(model.id > after_id)
+    )
+    stmt = (
+        select(expenses)
+        # franchise/date order keeps each batch within a few partitions, so files stay large
+        .order_by(expenses.c.franchise_id, expenses.c.date)
+        .execution_options(yield_per=SNAPSHOT_CHUNK_SIZE)
+    )
+    rows = 0
+    max_id = after_id
+    for n, chunk in enumerate(db.execute(stmt).partitions()):
+        columns = list(zip(*chunk))
+        columns.append([d.strftime("%Y-%m") for d in columns[4]])
+        table = pa.table(columns, schema=schema)
+        _write(pa, table, base_dir, partitioning, f"part-{after_id}-{n}")
+        rows += len(chunk)
+        max_id = max(max_id, max(columns[0]))
+    return rows, max_id
+
+
+def _export_budgets(pa, db, base_dir: Path, schema, partitioning) -> int:
+    rows = db.execute(select(*(getattr(Budget, c) for c in BUDGET_COLUMNS)).order_by(Budget.id)).all()
+    columns = [list(col) for col in zip(*rows)] if rows else [[] for _ in BUDGET_COLUMNS]
+    columns[-1] = [s.value if s is not None else None for s in columns[-1]]
+    _write(pa, pa.table(columns, schema=schema), base_dir, partitioning, "part")
+    return len(rows)
+
+
+def export_snapshot(full: bool = False, root: Optional[Path] = None) -> dict:
+    """Bring the snapshot up to date; `full=True` rebuilds it from scratch.
+
+    Builds go to a sibling directory and are swapped in with a rename, so
+    readers never see a half-written budgets dataset or full rebuild.
+    """
+    root = root or SNAPSHOT_DIR
+    pa = _arrow()
+    expense_schema, budget_schema, partitioning = _schemas(pa)
+    root.mkdir(parents=True, exist_ok=True)
+    state = {"expenses_max_id": 0} if full else read_state(root)
+    work = root.parent / f".{root.name}.{uuid.uuid4().hex}"
+
+    db = SessionLocal()
+    try:
+        expense_dir = (work if full else root) / "expenses"
+        expense_rows, max_id = _export_expenses(
+            pa, db, expense_dir, expense_schema, partitioning, state["expenses_max_id"]
+        )
+        budget_rows = _export_budgets(pa, db, work / "budgets", budget_schema, partitioning)
+    finally:
+        db.close()
+
+    for name in ("expenses", "budgets") if full else ("budgets",):
+        built, live = work / name, root / name
+        if not built.exists():
+            built.mkdir(parents=True)
+        retired = root / f".{name}.old"
+        shutil.rmtree(retired, ignore_errors=True)
+        if live.exists():
+            live.rename(retired)
+        built.rename(live)
+        shutil.rmtree(retired, ignore_errors=True)
+    shutil.rmtree(work, ignore_errors=True)
+
+    state = {"expenses_max_id": max_id, "exported_at": datetime.now(timezone.utc).isoformat()}
+    _write_state(root, state)
+    return {"expenses": expense_rows, "budgets": budget_rows, **state}
+
+
+def snapshot_lag(root: Optional[Path] = None) -> int:
+    """How many expenses have been created since the last export."""
+    root = root or SNAPSHOT_DIR
+    state = read_state(root)
+    db = SessionLocal()
+    try:
+        expenses = with_archive(lambda model: select(model.id).where(model.id > state["expenses_max_id"]))
+        return db.scalar(select(func.count()).select_from(expenses))
+    finally:
+        db.close()
+
+
+def aggregate_snapshot(
+    group_by: list[str],
+    franchise_ids: Optional[list[int]] = None,
+    branch_id: Optional[int] = None,
+    budget_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    root: Optional[Path] = None,
+) -> dict:
+    """`app.analytics.aggregate_expenses` over the Parquet snapshot instead of the database."""
+    root = root or SNAPSHOT_DIR
+    pa = _arrow()
+    pc = pa.compute
+    expense_schema, _, partitioning = _schemas(pa)
+    state = read_state(root)
+    if not (root / "expenses").exists() or state["exported_at"] is None:
+        raise SnapshotUnavailable("No snapshot yet: run `python manage.py snapshots export`")
+
+    dataset = pa.dataset.dataset(root / "expenses", schema=expense_schema, format="parquet", partitioning=partitioning)
+    field = pa.dataset.field
+    conditions = []
+    if franchise_ids:
+        conditions.append(field("franchise_id").isin(franchise_ids))
+    if branch_id is not None:
+        conditions.append(field("branch_id") == branch_id)
+    if budget_id is not None:
+        conditions.append(field("budget_id") == budget_id)
+    if date_from is not None:
+        conditions.append(field("period") >= date_from.strftime("%Y-%m"))
+        conditions.append(field("date") >= pa.scalar(date_from, pa.date32()))
+    if date_to is not None:
+        conditions.append(field("period") <= date_to.strftime("%Y-%m"))
+        conditions.append(field("date") <= pa.scalar(date_to, pa.date32()))
+    predicate = None
+    for condition in conditions:
+        predicate = condition if predicate is None else predicate & condition
+
+    table = dataset.to_table(columns=sorted({"amount", *(SOURCE_COLUMNS[k] for k in group_by)}), filter=predicate)
+
+    if not group_by:
+        count = [len(table)]
+        total = [pc.sum(table["amount"]).as_py()]
+        columns = {}
+    else:
+        keys = {}
+        for k in group_by:
+            # casting a date to string gives ISO format and is far cheaper than strftime
+            if k == "day":
+                keys[k] = pc.cast(table["date"], pa.string())
+            elif k == "week":
+                monday = pc.floor_temporal(table["date"], unit="week", week_starts_monday=True)
+                keys[k] = pc.cast(monday, pa.string())
+            else:
+                keys[k] = table[SOURCE_COLUMNS[k]]
+        grouped = (
+            pa.table({**keys, "amount": table["amount"]})
+            .group_by(group_by)
+            .aggregate([("amount", "count"), ("amount", "sum")])
+            .sort_by([(k, "ascending") for k in group_by])
+        )
+        count = grouped["amount_count"].to_pylist()
+        total = grouped["amount_sum"].to_pylist()
+        columns = {k: grouped[k].to_pylist() for k in group_by}
+    columns["count"] = count
+    columns["total"] = [float(t or 0) for t in total]
+    return {"group_by": group_by, "rows": len(count), "columns": columns, "as_of": state["exported_at"]}
@@ -0,0 +1,126 @@
+"""Budget summaries for many budgets at once, for `POST /budgets/summary:batch`.
+
+One query pulls just the amount, status and period columns of the
+requested budgets; variance, burn rate, the over-budget flag and the
+projected end-of-period spend are then computed over whole numpy arrays
+rather than budget by budget. Results are column-oriented like
+`app.analytics`: `columns[name][i]` describes budget `i`.
+
+Projected spend extrapolates `actual` linearly over the month: a budget
+for the current month that has used 10 of its 30 days projects to three
+times its actuals. Past periods project to their actuals, and so do
+future ones, which have nothing to extrapolate from yet. A stored period
+that isn't a real month (the create schema only checks `YYYY-MM` digits,
+so `2024-13` gets in) projects to null rather than failing the batch.
+"""
+import calendar
+from datetime import date
+from typing import Optional
+import numpy as np
+from sqlalchemy import Float, String, select, type_coerce
+from sqlalchemy.orm import Session
+from app.database.database import run_blocking
+from app.models.budget import Budget
+
+# Largest number of budgets one call may summarize
+SUMMARY_BATCH_MAX = 10_000
+
+
+class TooManyBudgets(ValueError):
+    pass
+
+
+def elapsed_fraction(period: str, today: date) -> Optional[float]:
+    """Share of the `YYYY-MM` period that has passed by the end of `today`, or None if it isn't a month."""
+    try:
+        year, month = int(period[:4]), int(period[5:7])
+        days = calendar.monthrange(year, month)[1]
+    except (TypeError, ValueError):
+        return None
+    if (today.year, today.month) < (year, month):
+        return 0.0
+    if (today.year, today.month) > (year, month):
+        return 1.0
+    return today.day / days
+
+
+def _money(values: np.ndarray) -> list:
+    return [None if v != v else v for v in np.round(values, 2).tolist()]
+
+
+def summarize_budgets(
+    db: Session,
+    ids: Optional[list[int]] = None,
+    franchise_ids: Optional[list[int]] = None,
+    period_from: Optional[str] = None,
+    period_to: Optional[str] = None,
+    today: Optional[date] = None,
+) -> dict:
+    """Summarize the budgets in `ids`, or every budget of `franchise_ids` between two periods.
+
+    Periods are inclusive `YYYY-MM` strings. Raises `TooManyBudgets` when
+    the scope covers more than `SUMMARY_BATCH_MAX` budgets.
+    """
+    if ids is not None and len(ids) > SUMMARY_BATCH_MAX:
+        raise TooManyBudgets(f"At most {SUMMARY_BATCH_MAX} ids per call")
+    today = today or date.today()
+    # Float/String skip Decimal and Enum conversion; the arrays are float64 anyway
+    stmt = select(
+        Budget.id, Budget.franchise_id, Budget.period, Budget.currency,
+        type_coerce(Budget.status, String),
+        type_coerce(Budget.planned_amount, Float),
+        type_coerce(Budget.approved_amount, Float),
+        type_coerce(Budget.actual_amount, Float),
+    )
+    if ids is not None:
+        stmt = stmt.where(Budget.id.in_(ids))
+    if franchise_ids:
+        stmt = stmt.where(Budget.franchise_id.in_(franchise_ids))
+    if period_from is not None:
+        stmt = stmt.where(Budget.period >= period_from)
+    if period_to is not None:
+        stmt = stmt.where(Budget.period <= period_to)
+    # run on the session's connection: plain Core rows skip the ORM's per-row loading
+    rows = db.connection().execute(stmt.order_by(Budget.id).limit(SUMMARY_BATCH_MAX + 1)).all()
+    if len(rows) > SUMMARY_BATCH_MAX:
+        raise TooManyBudgets(f"More than {SUMMARY_BATCH_MAX} budgets match; narrow the scope")
+    # the array pass needs no session, so it can leave the event loop under DB_ASYNC
+    return run_blocking(_summarize_rows, rows, ids, today)
+
+
+def _summarize_rows(rows: list, ids: Optional[list[int]], today: date) -> dict:
+    budget_ids, franchise_col, periods, currencies, statuses, planned, approved, actual = (
+        list(col) for col in (zip(*rows) if rows else [()] * 8)
+    )
+    planned = np.array(planned, dtype=float)
+    approved = np.array(approved, dtype=float)  # NULL -> nan
+    actual = np.array(actual, dtype=float)
+
+    fractions = {p: elapsed_fraction(p, today) for p in set(periods)}
+    elapsed = np.array([fractions[p] for p in periods], dtype=float)  # None -> nan
+    has_plan = planned > 0
+    has_elapsed = elapsed > 0
+    burn_rate = np.divide(actual, planned, out=np.full_like(actual, np.nan), where=has_plan)
+    projected = np.divide(actual, elapsed, out=actual.copy(), where=has_elapsed)
+    projected[np.isnan(elapsed)] = np.nan
+    # an approved amount replaces the planned one as the spending limit
+    limit = np.where(np.isnan(approved), planned, approved)
+
+    columns = {
+        "id": budget_ids,
+        "franchise_id": franchise_col,
+        "period": periods,
+        "currency": currencies,
+        "status": statuses,
+        "planned": _money(planned),
+        # 0 until approved, as `GET /budgets/{id}/summary` reports it
+        "approved": _money(np.nan_to_num(approved)),
+        "actual": _money(actual),
+        "variance": _money(actual - planned),
+        "burn_rate": [None if v != v else v for v in burn_rate.tolist()],
+        "over_budget": (actual > limit).tolist(),
+        "projected": _money(projected),
+        "projected_over_budget": (projected > limit).tolist(),
+    }
+    missing = sorted(set(ids) - set(budget_ids)) if ids is not None else []
+    return {"rows": len(rows), "columns": columns, "missing": missing, "as_of": today.isoformat()}
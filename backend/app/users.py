@@ -0,0 +1,131 @@
+"""Persistent user store with a small in-process lookup cache.
+
+Logins read users through `get_user`, which serves repeat lookups from an
+LRU. Entries are dropped when the password hash changes in this process
+and expire after `USER_CACHE_TTL_SECONDS`, which bounds how long another
+worker can keep an old hash.
+"""
+import os
+from typing import Iterable, Optional
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app.cache import MemoryCache
+from app.database.database import SessionLocal
+from app.models.user import User
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Rows per executemany round trip in `import_users`
+IMPORT_BATCH_SIZE = 1000
+
+USER_FIELDS = ("username", "email", "full_name", "hashed_password", "disabled")
+
+DEFAULT_USERS = [
+    {
+        "username": "admin",
+        "full_name": "Admin User",
+        "email": "admin@franchise.com",
+        # Precomputed pbkdf2_sha256 hash of the demo password 'secret'
+        "hashed_password": "$pbkdf2-sha256$29000$/3.vdQ5h7F3L2Vur1VrLWQ$h80BgQMRyNQ1r4zqvzDZSi3ChSbuoJFuRvn6dWUIn4o",
+        "disabled": False,
+    }
+]
+
+_user_cache = MemoryCache(max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+
+
+class UsernameTaken(Exception):
+    pass
+
+
+def get_user(username: str) -> Optional[dict]:
+    """Return the user as a plain dict, or None; unknown usernames are not cached."""
+    user = _user_cache.get(username)
+    if user is not None:
+        return dict(user)
+    db = SessionLocal()
+    try:
+        row = db.execute(select(*(getattr(User, f) for f in USER_FIELDS)).where(User.username == username)).first()
+    finally:
+        db.close()
+    if row is None:
+        return None
+    user = dict(zip(USER_FIELDS, row))
+    _user_cache.set(username, user, ())
+    return dict(user)
+
+
+def create_user(username: str, hashed_password: str, email: str | None = None, full_name: str | None = None) -> dict:
+    db = SessionLocal()
+    try:
+        db.add(User(username=username, hashed_password=hashed_password, email=email, full_name=full_name))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise UsernameTaken(username)
+    finally:
+        db.close()
+    return get_user(username)
+
+
+def set_password_hash(username: str, hashed_password: str) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.username == username).values(hashed_password=hashed_password))
+        db.commit()
+    finally:
+        db.close()
+    _user_cache.delete(username)
+
+
+def _flag(value) -> bool:
+    # CSV imports give strings, so bool("false") would be True
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes"}
+    return bool(value)
+
+
+def import_users(rows: Iterable[dict]) -> dict:
+    """Insert users in batches, skipping usernames that already exist.
+
+    Each row needs `username` and `hashed_password`; `email`, `full_name`
+    and `disabled` are optional.
+    """
+    inserted = skipped = 0
+    db = SessionLocal()
+    try:
+        batch = []
+
+        def flush():
+            nonlocal inserted, skipped
+            names = [r["username"] for r in batch]
+            existing = set(db.scalars(select(User.username).where(User.username.in_(names))))
+            fresh = {r["username"]: r for r in batch if r["username"] not in existing}
+            skipped += len(batch) - len(fresh)
+            if fresh:
+                db.execute(insert(User), [
+                    {f: r.get(f) for f in USER_FIELDS} | {"disabled": _flag(r.get("disabled"))}
+                    for r in fresh.values()
+                ])
+                inserted += len(fresh)
+            db.commit()
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        db.close()
+    return {"inserted": inserted, "skipped": skipped}
+
+
+def ensure_default_users() -> None:
+    import_users(DEFAULT_USERS)
+
+
+def clear_user_cache() -> None:
+    _user_cache.clear()
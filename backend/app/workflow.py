@@ -0,0 +1,122 @@
+"""Budget status transitions for many budgets at once, for `POST /budgets:transition`.
+
+A budget moves draft -> approved or rejected, rejected -> draft for
+rework, and approved -> closed at the end of its period; `ALLOWED_SOURCES`
+is that table read backwards. Approving fills a missing `approved_amount`
+with the planned amount, as `POST /budgets/{id}/approve` does. Budgets of
+closed periods (see `app.periods`) don't move at all.
+
+`transition_budgets` reads the scope's ids and statuses in one query,
+changes every eligible budget with one `UPDATE` and moves the newly
+approved amounts into the rollups in one upsert. The `UPDATE` returns the
+changed budgets whole, for the change feed. The `UPDATE` repeats the
+status check and reports what it changed, so a budget changed by someone
+else in between is left alone rather than forced through.
+"""
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import String, func, select, type_coerce, update
+from sqlalchemy.orm import Session
+from app.models.budget import Budget, BudgetStatus
+from app.changes import UPDATED, record_change
+from app.periods import last_closed_period
+from app.rollups import ZERO, apply_deltas
+from app.schemas.budget import BudgetResponse
+from app.summaries import TooManyBudgets
+
+# Largest number of budgets one call may transition
+TRANSITION_BATCH_MAX = 10_000
+
+ALLOWED_SOURCES = {
+    BudgetStatus.draft: {BudgetStatus.rejected},
+    BudgetStatus.approved: {BudgetStatus.draft},
+    BudgetStatus.rejected: {BudgetStatus.draft},
+    BudgetStatus.closed: {BudgetStatus.approved},
+}
+
+APPLIED, UNCHANGED, NOT_ALLOWED = "applied", "unchanged", "not_allowed"
+
+
+def transition_budgets(
+    db: Session,
+    target: BudgetStatus,
+    ids: Optional[list[int]] = None,
+    franchise_id: Optional[int] = None,
+    period: Optional[str] = None,
+    status: Optional[BudgetStatus] = None,
+) -> dict:
+    """Move the budgets in `ids`, or those matching the filters, to `target`; returns per-id outcomes.
+
+    Outcomes are `applied`, `unchanged` (already at `target`) or
+    `not_allowed`. Raises `TooManyBudgets` when the scope covers more than
+    `TRANSITION_BATCH_MAX` budgets. Leaves committing to the caller.
+    """
+    if ids is not None and len(ids) > TRANSITION_BATCH_MAX:
+        raise TooManyBudgets(f"At most {TRANSITION_BATCH_MAX} ids per call")
+    scope = []
+    if ids is not None:
+        scope.append(Budget.id.in_(ids))
+    if franchise_id is not None:
+        scope.append(Budget.franchise_id == franchise_id)
+    if period is not None:
+        scope.append(Budget.period == period)
+    if status is not None:
+        scope.append(Budget.status == status)
+
+    sources = ALLOWED_SOURCES[target]
+    stmt = (
+        select(
+            Budget.id, type_coerce(Budget.status, String), Budget.franchise_id, Budget.branch_id, Budget.period,
+            Budget.planned_amount, Budget.approved_amount.is_(None),
+        )
+        .where(*scope)
+        .order_by(Budget.id)
+        .limit(TRANSITION_BATCH_MAX + 1)
+        .with_for_update()
+    )
+    rows = db.connection().execute(stmt).all()
+    if len(rows) > TRANSITION_BATCH_MAX:
+        raise TooManyBudgets(f"More than {TRANSITION_BATCH_MAX} budgets match; narrow the scope")
+
+    source_names = {s.value for s in sources}
+    # budgets of closed periods are frozen
+    last_closed = last_closed_period(db) or ""
+    outcomes = [
+        UNCHANGED if current == target.value
+        else APPLIED if current in source_names and per > last_closed
+        else NOT_ALLOWED
+        for _, current, _, _, per, *_ in rows
+    ]
+    eligible = [row[0] for row, outcome in zip(rows, outcomes) if outcome == APPLIED]
+
+    if eligible:
+        values = {"status": target}
+        if target == BudgetStatus.approved:
+            values["approved_amount"] = func.coalesce(Budget.approved_amount, Budget.planned_amount)
+        changed = db.execute(
+            update(Budget)
+            .where(Budget.id.in_(eligible), Budget.status.in_(sources))
+            .values(values)
+            .returning(*(getattr(Budget, name) for name in BudgetResponse.model_fields))
+            .execution_options(synchronize_session=False)
+        ).all()
+        for row in changed:
+            record_change(db, "budget", UPDATED, row._asdict())
+        applied = {row.id for row in changed}
+        outcomes = [NOT_ALLOWED if o == APPLIED and row[0] not in applied else o for row, o in zip(rows, outcomes)]
+
+        if target == BudgetStatus.approved:
+            approved = defaultdict(lambda: ZERO)
+            for (_, _, f_id, br_id, per, planned, no_approved), outcome in zip(rows, outcomes):
+                if outcome == APPLIED and no_approved:
+                    approved[(f_id, br_id, per)] += planned
+            apply_deltas(db, {key: (ZERO, amount, ZERO) for key, amount in approved.items()})
+
+    budget_ids = [row[0] for row in rows]
+    counts = {outcome: outcomes.count(outcome) for outcome in (APPLIED, UNCHANGED, NOT_ALLOWED)}
+    return {
+        "target": target.value,
+        "counts": counts,
+        "columns": {"id": budget_ids, "previous_status": [row[1] for row in rows], "outcome": outcomes},
+        "missing": sorted(set(ids) - set(budget_ids)) if ids is not None else [],
+    }
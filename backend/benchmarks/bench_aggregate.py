@@ -0,0 +1,85 @@
+"""GET /expenses/aggregate latency over a large expense table.
+
+    python -m benchmarks.bench_aggregate --rows 10000000 --franchises 200
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+CATEGORIES = ["Rent", "Payroll", "Utilities", "Ads", "Supplies", "Travel", "Maintenance", "Software"]
+
+
+def seed(rows: int, franchises: int):
+    from sqlalchemy import insert
+    from app.database.database import engine
+    from app.models import Expense, Franchise
+
+    rng = random.Random(7)
+    start = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [
+            {"name": f"Bench {i}", "tax_number": f"AGG-{i}", "is_active": True} for i in range(1, franchises + 1)
+        ])
+        batch = []
+        for _ in range(rows):
+            batch.append({
+                "franchise_id": rng.randint(1, franchises),
+                "date": start + timedelta(days=rng.randrange(730)),
+                "category": rng.choice(CATEGORIES),
+                "amount": rng.randint(100, 500_000) / 100,
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(Expense), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Expense), batch)
+
+    # rows were inserted behind the API's back, so fill expense_daily from them
+    from app.database.database import SessionLocal
+    from app.rollups import rebuild_rollups
+
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--franchises", type=int, default=200)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_aggregate")
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+    seed(args.rows, args.franchises)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    cases = {
+        "1 franchise, category x month, 1 year": {
+            "group_by": "category,month", "franchise_id": 1, "from": "2024-01-01", "to": "2024-12-31",
+        },
+        "1 franchise, week, 2 years": {"group_by": "week", "franchise_id": 1},
+        "5 franchises, franchise x category": {
+            "group_by": "franchise,category", "franchise_id": [1, 2, 3, 4, 5],
+        },
+        # grouping by budget has to read expenses, not expense_daily
+        "1 franchise, budget, 1 year (raw rows)": {
+            "group_by": "budget", "franchise_id": 1, "from": "2024-01-01", "to": "2024-12-31",
+        },
+    }
+    for name, params in cases.items():
+        stats = time_call(lambda: client.get("/expenses/aggregate", params=params, headers=headers))
+        print(f"{name:<42} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
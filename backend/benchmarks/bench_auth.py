@@ -0,0 +1,53 @@
+"""Per-request token verification cost with a cold vs warm claims cache.
+
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import time
+
+from benchmarks.common import use_scratch_database
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_auth")
+    from fastapi.testclient import TestClient
+    from app.security import create_access_token, decode_access_token, token_cache
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+
+    token = create_access_token({"sub": "admin"})
+
+    def cold():
+        token_cache.clear()
+        decode_access_token(token)
+
+    print(f"decode, cold cache: {per_call_us(cold, args.iterations):8.2f} us/call")
+    print(f"decode, warm cache: {per_call_us(lambda: decode_access_token(token), args.iterations):8.2f} us/call")
+
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    requests = max(args.iterations // 10, 1)
+    baseline = per_call_us(lambda: client.get("/health"), requests)
+    token_cache.clear()
+    warm = per_call_us(lambda: client.get("/auth/verify", headers=headers), requests)
+    cold_req = per_call_us(lambda: (token_cache.clear(), client.get("/auth/verify", headers=headers)), requests)
+    print(f"GET /health (no auth):        {baseline:8.1f} us/request")
+    print(f"GET /auth/verify, warm cache: {warm:8.1f} us/request")
+    print(f"GET /auth/verify, cold cache: {cold_req:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
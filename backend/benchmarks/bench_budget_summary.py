@@ -0,0 +1,65 @@
+"""POST /budgets/summary:batch latency for many budgets in one call.
+
+    python -m benchmarks.bench_budget_summary --budgets 10000
+"""
+import argparse
+import random
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def seed(budgets: int, franchises: int) -> list[int]:
+    from sqlalchemy import insert, select
+    from app.database.database import engine
+    from app.models import Budget, Franchise
+
+    rng = random.Random(7)
+    periods = [f"{year}-{month:02d}" for year in (2025, 2026) for month in range(1, 13)]
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [
+            {"name": f"Bench {i}", "tax_number": f"SUM-{i}", "is_active": True} for i in range(1, franchises + 1)
+        ])
+        # each (franchise, period) pair at most once, as uq_budget_scope_period requires
+        scopes = rng.sample([(f, p) for f in range(1, franchises + 1) for p in periods], budgets)
+        conn.execute(insert(Budget), [
+            {
+                "franchise_id": f, "period": p, "currency": "TRY", "status": "draft",
+                "planned_amount": rng.randint(1_000, 100_000),
+                "approved_amount": rng.choice([None, rng.randint(1_000, 100_000)]),
+                "actual_amount": rng.randint(0, 120_000),
+            }
+            for f, p in scopes
+        ])
+        return list(conn.scalars(select(Budget.id)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budgets", type=int, default=10_000)
+    parser.add_argument("--franchises", type=int, default=500)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_budget_summary")
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+    ids = seed(args.budgets, args.franchises)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    batch = time_call(lambda: client.post("/budgets/summary:batch", json={"ids": ids}, headers=headers))
+    print(f"summary:batch, {len(ids)} ids          p50 {batch['p50_ms']:8.2f} ms  p95 {batch['p95_ms']:8.2f} ms")
+    scope = {"franchise_id": list(range(1, args.franchises + 1)), "period_from": "2025-01", "period_to": "2026-12"}
+    scoped = time_call(lambda: client.post("/budgets/summary:batch", json=scope, headers=headers))
+    print(f"summary:batch, franchise scope     p50 {scoped['p50_ms']:8.2f} ms  p95 {scoped['p95_ms']:8.2f} ms")
+
+    sample = ids[:200]
+    single = time_call(lambda: [client.get(f"/budgets/{i}/summary", headers=headers) for i in sample], repeat=3)
+    per_budget = single["p50_ms"] / len(sample)
+    print(f"one /summary call per budget      ~{per_budget * len(ids):8.2f} ms for {len(ids)} (extrapolated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""POST /budgets:transition for a whole period vs one /approve call per budget.
+
+    python -m benchmarks.bench_budget_transition --budgets 10000
+
+Every round puts the budgets back to draft without an approved amount
+(untimed), then approves the period in one call.
+"""
+import argparse
+import time
+
+from benchmarks.common import auth_headers, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budgets", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_budget_transition")
+    import os
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+    from app.bootstrap import prepare_database
+    from app.database.database import engine
+    from app.models import Budget
+    from main import app
+    import seed
+
+    prepare_database()
+    # one franchise, one branch per budget, all in the same month
+    seed.generate(seed.Scale(1, args.budgets, args.budgets, 0), first_period="2025-06", progress=lambda _: None)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    def reset():
+        with engine.begin() as conn:
+            conn.execute(update(Budget).values(status="draft", approved_amount=None))
+
+    scope = {"target": "approved", "franchise_id": 1, "period": "2025-06"}
+    samples = []
+    for _ in range(args.repeat):
+        reset()
+        start = time.perf_counter()
+        body = client.post("/budgets:transition", json=scope, headers=headers).json()
+        samples.append((time.perf_counter() - start) * 1000)
+        assert body["counts"]["applied"] == args.budgets, body["counts"]
+    samples.sort()
+    print(f"transition, {args.budgets} budgets        p50 {samples[len(samples) // 2]:8.2f} ms  max {samples[-1]:8.2f} ms")
+
+    reset()
+    sample = range(1, 201)
+    start = time.perf_counter()
+    for budget_id in sample:
+        client.post(f"/budgets/{budget_id}/approve", headers=headers)
+    per_budget = (time.perf_counter() - start) * 1000 / len(sample)
+    print(f"one /approve call per budget  ~{per_budget * args.budgets:8.2f} ms for {args.budgets} (extrapolated)")
+
+
+if __name__ == "__main__":
+    main()
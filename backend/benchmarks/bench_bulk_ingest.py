@@ -0,0 +1,58 @@
+"""Expense ingestion throughput: one POST per expense vs POST /expenses/bulk.
+
+    python -m benchmarks.bench_bulk_ingest --rows 20000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import auth_headers, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--budgets", type=int, default=20)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_bulk_ingest")
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+
+    client = TestClient(app)
+    headers = auth_headers(client)
+    franchise_id = client.post("/franchises", json={"name": "Bench", "tax_number": "BENCH-1"}, headers=headers).json()["id"]
+    budget_ids = [
+        client.post(
+            "/budgets",
+            json={"franchise_id": franchise_id, "period": f"20{10 + i // 12:02d}-{i % 12 + 1:02d}", "planned_amount": 1e9},
+            headers=headers,
+        ).json()["id"]
+        for i in range(args.budgets)
+    ]
+    rows = [
+        {"franchise_id": franchise_id, "budget_id": budget_ids[i % len(budget_ids)],
+         "date": "2025-01-15", "category": "POS", "amount": 9.99}
+        for i in range(args.rows)
+    ]
+
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/expenses", json=row, headers=headers)
+    single = time.perf_counter() - start
+
+    body = "\n".join(json.dumps(row) for row in rows)
+    start = time.perf_counter()
+    result = client.post("/expenses/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"}).json()
+    bulk = time.perf_counter() - start
+    assert result["inserted"] == args.rows, result["errors"][:3]
+
+    print(f"single-row: {args.rows / single:>10.0f} rows/s ({single:.2f}s)")
+    print(f"bulk:       {args.rows / bulk:>10.0f} rows/s ({bulk:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
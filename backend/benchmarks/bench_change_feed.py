@@ -0,0 +1,111 @@
+"""Cost of the change feed: on each write, and on delivering changes to many streams.
+
+    python -m benchmarks.bench_change_feed --streams 200 --changes 200
+
+Times `POST /expenses` and `POST /budgets/{id}/approve` with the feed on
+and with its commit hook removed. Then opens `--streams` `GET /events`
+streams on one franchise, makes `--changes` expense writes one at a
+time, and reports how long after each write was sent the last stream had
+it, and how many statements the process ran against `changes`. Clients
+polling `GET /expenses` instead would cost one query per client per poll.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--changes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_change_feed")
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.concurrency import run_in_threadpool
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from app import changes
+    from app.bootstrap import prepare_database
+    from app.database.database import engine
+    from main import app
+
+    prepare_database()
+    client = TestClient(app)
+    headers = auth_headers(client)
+    franchise = client.post(
+        "/franchises", json={"name": "Bench", "tax_number": "bench-feed", "is_active": True}, headers=headers
+    ).json()["id"]
+    periods = iter(f"{2030 + i // 12}-{i % 12 + 1:02d}" for i in range(10_000))
+    budget = client.post("/budgets", json={"franchise_id": franchise, "period": "2029-01", "planned_amount": 1e6}, headers=headers).json()["id"]
+
+    def add_expense():
+        body = {"franchise_id": franchise, "budget_id": budget, "date": "2029-01-15", "category": "Ops", "amount": 1}
+        client.post("/expenses", json=body, headers=headers).raise_for_status()
+
+    def approve():
+        created = client.post("/budgets", json={"franchise_id": franchise, "period": next(periods), "planned_amount": 10}, headers=headers)
+        client.post(f"/budgets/{created.json()['id']}/approve", headers=headers).raise_for_status()
+
+    writes = {"POST /expenses": add_expense, "POST /budgets + approve": approve}
+    # alternate rounds so table growth affects both sides alike
+    samples = {(name, on): [] for name in writes for on in (True, False)}
+    for _ in range(5):
+        for on in (True, False):
+            if not on:
+                event.remove(Session, "before_commit", changes._write_changes)
+            for name, fn in writes.items():
+                samples[name, on].append(time_call(fn, args.repeat // 5)["p50_ms"])
+            if not on:
+                event.listen(Session, "before_commit", changes._write_changes)
+    for name in writes:
+        without, with_ = (statistics.median(samples[name, on]) for on in (False, True))
+        print(f"{name:<26} p50 without feed {without:7.2f} ms  with feed {with_:7.2f} ms")
+
+    statements = 0
+
+    def count(conn, cursor, statement, *_):
+        nonlocal statements
+        if "changes" in statement:
+            statements += 1
+
+    async def fan_out():
+        received_at = [[0.0] * args.changes for _ in range(args.streams)]
+
+        async def stream(times):
+            received = 0
+            async for frame in changes.event_stream([franchise], None):
+                if "event: change" in frame:
+                    times[received] = time.perf_counter()
+                    received += 1
+                    if received == args.changes:
+                        return
+
+        changes.EVENTS_MAX_STREAM_SECONDS = 600
+        streams = [asyncio.create_task(stream(times)) for times in received_at]
+        while len(changes.feed._subscribers) < args.streams:
+            await asyncio.sleep(0.01)
+        event.listen(engine, "before_cursor_execute", count)
+        sent_at = []
+        for _ in range(args.changes):
+            sent_at.append(time.perf_counter())
+            await run_in_threadpool(add_expense)
+        await asyncio.gather(*streams)
+        event.remove(engine, "before_cursor_execute", count)
+        # from sending the write to the last stream having the change
+        return sorted(max(times[i] for times in received_at) - sent_at[i] for i in range(args.changes))
+
+    lags = asyncio.run(fan_out())
+    print(f"{args.changes} writes, {args.streams} streams: delivered to all streams p50 "
+          f"{statistics.median(lags) * 1000:.1f} ms, max {lags[-1] * 1000:.1f} ms after the write was sent; "
+          f"{statements} statements on `changes` ({args.changes} inserts, the rest reads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Cost of `Idempotency-Key` on `POST /expenses`.
+
+    python -m benchmarks.bench_idempotency --repeat 500
+
+Times creating an expense without a key and with a fresh key (one lookup
+plus one insert into `idempotency_keys`), and replaying a retry from the
+in-process cache and from the table. Rounds alternate so the growing
+tables affect every case alike. The response cache is off.
+"""
+import argparse
+import itertools
+import os
+import statistics
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_idempotency")
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from app.idempotency import _recent
+    from main import app
+
+    prepare_database()
+    client = TestClient(app)
+    headers = auth_headers(client)
+    franchise = client.post(
+        "/franchises", json={"name": "Bench", "tax_number": "bench-idem", "is_active": True}, headers=headers
+    ).json()["id"]
+    budget = client.post("/budgets", json={"franchise_id": franchise, "period": "2029-01", "planned_amount": 1e6}, headers=headers).json()["id"]
+    body = {"franchise_id": franchise, "budget_id": budget, "date": "2029-01-15", "category": "Ops", "amount": 1}
+    keys = (f"key-{i}" for i in itertools.count())
+
+    def post(key=None):
+        response = client.post("/expenses", json=body, headers={**headers, "Idempotency-Key": key} if key else headers)
+        response.raise_for_status()
+        return response
+
+    def replay_from_table():
+        _recent.delete(replayed_key)
+        post(replayed_key)
+
+    replayed_key = next(keys)
+    post(replayed_key)
+    cases = {
+        "no key": post,
+        "new key": lambda: post(next(keys)),
+        "replay, cached": lambda: post(replayed_key),
+        "replay, from table": replay_from_table,
+    }
+    samples = {name: [] for name in cases}
+    for _ in range(args.rounds):
+        for name, fn in cases.items():
+            samples[name].append(time_call(fn, args.repeat // args.rounds)["p50_ms"])
+    for name in cases:
+        print(f"{name:<20} p50 {statistics.median(samples[name]):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
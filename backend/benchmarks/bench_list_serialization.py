@@ -0,0 +1,96 @@
+"""CPU per 100-row list page: ORM objects + Pydantic validation vs the lean row path.
+
+    python -m benchmarks.bench_list_serialization --rows 20000
+
+"orm" repeats what the list handlers did before `app.lean`: load ORM
+objects, validate each through its response schema, then validate and
+dump the page again as FastAPI's response_model does. "lean" is what
+they do now. Both are timed in-process with `time.process_time`, then
+the routes themselves are timed end to end.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.database.database import engine
+    from app.models import Branch, Budget, Expense, Franchise
+
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [{"name": "Bench", "tax_number": "LEAN-1", "is_active": True}])
+        conn.execute(insert(Branch), [{"name": f"Şube {i}", "city": "İzmir", "franchise_id": 1} for i in range(rows)])
+        conn.execute(insert(Budget), [
+            {"franchise_id": 1, "branch_id": i + 1, "period": "2025-05", "currency": "TRY",
+             "planned_amount": rng.randint(100, 100_000), "approved_amount": None, "actual_amount": 0, "status": "draft"}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Expense), [
+            {"franchise_id": 1, "branch_id": rng.randint(1, rows), "date": date(2025, 1, 1) + timedelta(days=rng.randrange(365)),
+             "category": "Ops", "amount": rng.randint(100, 100_000) / 100}
+            for _ in range(rows)
+        ])
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    fn()
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_list_serialization")
+    import os
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from pydantic import TypeAdapter
+    from app.bootstrap import prepare_database
+    from app.database.database import SessionLocal
+    from app.expand import serialize
+    from app.lean import dumps, lean_rows, lean_select
+    from app.models import Branch, Budget, Expense
+    from app.schemas.expand import BranchExpanded, BudgetExpanded, ExpenseExpanded
+    from main import app
+
+    prepare_database()
+    seed(args.rows)
+    db = SessionLocal()
+    models = {Branch: BranchExpanded, Budget: BudgetExpanded, Expense: ExpenseExpanded}
+
+    for model, schema in models.items():
+        page = TypeAdapter(list[schema])
+
+        def orm():
+            objects = db.query(model).order_by(model.id).limit(args.limit).all()
+            page.dump_json(page.validate_python([serialize(o, []) for o in objects]))
+            db.expunge_all()
+
+        def lean():
+            dumps(lean_rows(db, lean_select(model).order_by(model.id).limit(args.limit)))
+
+        before, after = cpu_ms(orm, args.repeat), cpu_ms(lean, args.repeat)
+        print(f"{model.__tablename__:<9} orm {before:6.2f} ms  lean {after:6.2f} ms  CPU saved {before - after:5.2f} ms/page ({before / after:4.1f}x)")
+    db.close()
+
+    client = TestClient(app)
+    headers = auth_headers(client)
+    for route in ("/branches", "/budgets", "/expenses"):
+        stats = time_call(lambda: client.get(route, params={"limit": args.limit}, headers=headers), repeat=50)
+        print(f"GET {route:<10} limit={args.limit}  p50 {stats['p50_ms']:6.2f} ms  p95 {stats['p95_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
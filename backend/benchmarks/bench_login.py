@@ -0,0 +1,51 @@
+"""Login and user-lookup latency as the users table grows.
+
+    python -m benchmarks.bench_login --sizes 1000 10000 100000
+"""
+import argparse
+
+from benchmarks.common import time_call, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_login")
+    from fastapi.testclient import TestClient
+    from app.security import get_password_hash
+    from app.users import clear_user_cache, get_user, import_users
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+
+    client = TestClient(app)
+    # one real hash shared by every generated user keeps setup fast
+    shared_hash = get_password_hash("secret")
+    loaded = 0
+    for size in sorted(args.sizes):
+        import_users(
+            {"username": f"bench_{i}", "hashed_password": shared_hash}
+            for i in range(loaded, size)
+        )
+        loaded = size
+        target = f"bench_{size // 2}"
+
+        def cold_lookup():
+            clear_user_cache()
+            get_user(target)
+
+        cold = time_call(cold_lookup, args.repeat)
+        warm = time_call(lambda: get_user(target), args.repeat)
+        login = time_call(lambda: client.post(f"/auth/login?username={target}&password=secret"), max(args.repeat // 10, 5))
+        print(
+            f"{size:>8} users  get_user cold p50 {cold['p50_ms']:7.3f} ms  "
+            f"warm p50 {warm['p50_ms']:7.3f} ms  login p50 {login['p50_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
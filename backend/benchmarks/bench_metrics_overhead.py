@@ -0,0 +1,81 @@
+"""CPU per request with request instrumentation (`app.metrics`) on and off.
+
+    python -m benchmarks.bench_metrics_overhead --batches 200 --batch 30
+
+The app is imported with `METRICS_ENABLED=false`; "on" requests go through
+`MetricsMiddleware` with the engine hooks installed, "off" requests go to
+the bare app with the hooks removed. The two alternate in small batches
+within one process, so drift in the machine's speed hits both equally;
+comparing two separate processes is far noisier than the effect measured.
+Requests run through the full app (routing, SQL, serialization) with the
+response cache off, over a detail page, a 100-row list page and a search.
+"""
+import argparse
+import os
+import time
+
+from benchmarks.common import auth_headers, use_scratch_database
+
+ROUTES = ("/franchises/1", "/branches?limit=100", "/search?q=izmir")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=30)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_metrics_overhead")
+    os.environ["CACHE_BACKEND"] = "none"
+    os.environ["METRICS_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event, insert
+    from app import metrics
+    from app.bootstrap import prepare_database
+    from app.database.database import engine
+    from app.models import Branch, Franchise
+    from app.search import rebuild_search_index
+    from main import app
+
+    prepare_database()
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [{"name": "Bench", "tax_number": "METRICS-1", "is_active": True}])
+        conn.execute(insert(Branch), [{"name": f"Şube {i}", "city": "İzmir", "franchise_id": 1} for i in range(1000)])
+        rebuild_search_index(conn)
+
+    plain_context = engine.dialect.execution_ctx_cls
+
+    def instrument(enabled: bool):
+        if enabled:
+            metrics.instrument_engine(engine)
+        elif event.contains(engine, "before_cursor_execute", metrics._before_cursor_execute):
+            event.remove(engine, "before_cursor_execute", metrics._before_cursor_execute)
+            event.remove(engine, "after_cursor_execute", metrics._after_cursor_execute)
+            engine.dialect.execution_ctx_cls = plain_context
+
+    clients = {False: TestClient(app), True: TestClient(metrics.MetricsMiddleware(app))}
+    headers = auth_headers(clients[False])
+    for enabled, client in clients.items():
+        instrument(enabled)
+        for route in ROUTES:
+            response = client.get(route, headers=headers)
+            assert response.status_code == 200 and ("server-timing" in response.headers) == enabled
+
+    cpu = {False: 0.0, True: 0.0}
+    for i in range(args.batches * 2):
+        enabled = bool(i % 2)
+        client = clients[enabled]
+        instrument(enabled)
+        start = time.process_time()
+        for j in range(args.batch):
+            client.get(ROUTES[j % len(ROUTES)], headers=headers)
+        cpu[enabled] += time.process_time() - start
+
+    count = args.batches * args.batch
+    off, on = cpu[False] / count * 1000, cpu[True] / count * 1000
+    print(f"metrics off {off:6.3f} ms CPU/request")
+    print(f"metrics on  {on:6.3f} ms CPU/request  overhead {(on - off) / off * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Offset vs keyset pagination latency at increasing page depths.
+
+    python -m benchmarks.bench_pagination --rows 500000
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.database.database import engine
+    from app.models import Expense, Franchise
+
+    rng = random.Random(42)
+    start = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [{"name": "Bench", "tax_number": "BENCH-1", "is_active": True}])
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "franchise_id": 1,
+                "date": start + timedelta(days=rng.randrange(730)),
+                "category": "Operations",
+                "amount": 100,
+            })
+            if len(batch) == 10_000:
+                conn.execute(insert(Expense), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Expense), batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_pagination")
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+
+    seed(args.rows)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    print(f"{'depth':>10} {'offset p50':>12} {'cursor p50':>12}")
+    for depth in (0, args.rows // 10, args.rows // 2, args.rows - args.limit):
+        # Walking to the cursor for `depth` is not part of the measurement:
+        # a real client already holds it from the previous page.
+        anchor = client.get("/expenses", params={"skip": max(depth - 1, 0), "limit": 1}, headers=headers).json()
+        cursor = None
+        if depth and anchor:
+            from app.pagination import encode_cursor
+            cursor = encode_cursor([anchor[0]["date"], anchor[0]["id"]])
+
+        offset = time_call(lambda: client.get("/expenses", params={"skip": depth, "limit": args.limit}, headers=headers))
+        params = {"limit": args.limit, **({"cursor": cursor} if cursor else {})}
+        keyset = time_call(lambda: client.get("/expenses", params=params, headers=headers))
+        print(f"{depth:>10} {offset['p50_ms']:>10.2f}ms {keyset['p50_ms']:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
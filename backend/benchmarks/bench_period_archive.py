@@ -0,0 +1,92 @@
+"""Expense queries before and after closing old periods into `expenses_archive`.
+
+    python -m benchmarks.bench_period_archive --expenses 400000 --months 24 --open-months 3
+
+Generates `--months` months of data with `seed.generate`, times the
+expense routes, closes all but the last `--open-months` months with
+`app.periods.close_periods` (timed once) and times the same requests again.
+The response cache is off. "older page" is a cursor page inside the
+months that get archived, and "full scan" an unindexed count over the
+live table, standing in for ad-hoc reporting and maintenance queries.
+"""
+import argparse
+import os
+import time
+from datetime import date
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--franchises", type=int, default=20)
+    parser.add_argument("--branches", type=int, default=200)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--open-months", type=int, default=3)
+    parser.add_argument("--expenses", type=int, default=400_000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_period_archive")
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select, text
+    from app.bootstrap import prepare_database
+    from app.database.database import SessionLocal, engine
+    from app.models import Expense, ExpenseArchive
+    from app.pagination import encode_cursor
+    from app.periods import close_periods, next_period
+    from main import app
+    import seed
+
+    prepare_database()
+    scale = seed.Scale(args.franchises, args.branches, args.branches * args.months, args.expenses)
+    seed.generate(scale, first_period="2023-01", progress=lambda _: None)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    first_open = "2023-01"
+    for _ in range(args.months - args.open_months):
+        first_open = next_period(first_open)
+    # a page from the second year, archived as long as --open-months is below 12
+    older_cursor = encode_cursor(["2024-01-01", 0])
+
+    def full_scan():
+        with engine.connect() as conn:
+            conn.scalar(text("SELECT count(*) FROM expenses WHERE note IS NULL"))
+
+    requests = {
+        "newest page, one franchise": lambda: client.get("/expenses?franchise_id=1&limit=50", headers=headers),
+        "older page, one franchise": lambda: client.get(
+            "/expenses", params={"franchise_id": 1, "limit": 50, "cursor": older_cursor}, headers=headers
+        ),
+        "aggregate by budget": lambda: client.get("/expenses/aggregate?group_by=budget&franchise_id=1", headers=headers),
+        "full scan": full_scan,
+    }
+
+    def measure() -> dict:
+        with engine.connect() as conn:
+            live = conn.scalar(select(func.count()).select_from(Expense))
+            archived = conn.scalar(select(func.count()).select_from(ExpenseArchive))
+        print(f"  live expenses {live}, archived {archived}")
+        return {name: time_call(request, args.repeat)["p50_ms"] for name, request in requests.items()}
+
+    print("before closing:")
+    before = measure()
+
+    db = SessionLocal()
+    start = time.perf_counter()
+    year, month = map(int, first_open.split("-"))
+    result = close_periods(db, date(year, month, 20), grace_days=15)
+    db.close()
+    print(f"closed {len(result['periods'])} months, archived {result['expenses_archived']} expenses "
+          f"in {time.perf_counter() - start:.1f} s")
+
+    print("after closing:")
+    after = measure()
+    for name in requests:
+        print(f"{name:<28} before {before[name]:9.2f} ms  after {after[name]:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
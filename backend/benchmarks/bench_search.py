@@ -0,0 +1,86 @@
+"""GET /search typeahead latency over a large branch table.
+
+    python -m benchmarks.bench_search --branches 1000000
+"""
+import argparse
+import random
+
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Antalya", "Konya", "Gaziantep", "Şanlıurfa", "Kayseri", "Eskişehir"]
+DISTRICTS = [
+    "Kadıköy", "Beşiktaş", "Üsküdar", "Çankaya", "Keçiören", "Karşıyaka", "Bornova", "Nilüfer",
+    "Muratpaşa", "Selçuklu", "Şahinbey", "Melikgazi", "Odunpazarı", "Ataşehir", "Çiğli", "Yenimahalle",
+]
+BRANDS = ["Simit", "Kebap", "Döner", "Kahve", "Börek", "Lokanta", "Pide", "Tatlı", "Çiğ Köfte", "Mantı"]
+
+
+def seed(branches: int, franchises: int):
+    from sqlalchemy import insert
+    from app.database.database import engine, SessionLocal
+    from app.models import Branch, Franchise
+    from app.search import rebuild_search_index
+
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise), [
+            {"name": f"{rng.choice(BRANDS)} Evi {i}", "tax_number": f"TR{i:010d}", "is_active": True}
+            for i in range(1, franchises + 1)
+        ])
+        batch = []
+        for n in range(branches):
+            batch.append({
+                "name": f"{rng.choice(DISTRICTS)} Şubesi {n}",
+                "city": rng.choice(CITIES),
+                "franchise_id": rng.randint(1, franchises),
+            })
+            if len(batch) == 50_000:
+                conn.execute(insert(Branch), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Branch), batch)
+
+    # rows were inserted behind the API's back, so index them in one pass
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--branches", type=int, default=1_000_000)
+    parser.add_argument("--franchises", type=int, default=10_000)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_search")
+    # measure the query, not the response cache
+    import os
+    os.environ["CACHE_BACKEND"] = "none"
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+    seed(args.branches, args.franchises)
+    client = TestClient(app)
+    headers = auth_headers(client)
+
+    cases = {
+        "rare: 'cankaya subesi 4242'": "cankaya subesi 4242",
+        "common: 'istanbul'": "istanbul",
+        "accented: 'Karşıyaka'": "Karşıyaka",
+        "franchise tax number": "TR0000000042",
+        "short prefix: 'ka'": "ka",
+    }
+    for name, q in cases.items():
+        stats = time_call(lambda: client.get("/search", params={"q": q}, headers=headers))
+        print(f"{name:<34} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms")
+    old = time_call(lambda: client.get("/franchises", params={"search": "evi 4242"}, headers=headers))
+    print(f"{'GET /franchises?search=':<34} p50 {old['p50_ms']:8.2f} ms  p95 {old['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Live-traffic latency while reporting queries run against the database vs the Parquet snapshot.
+
+    python -m benchmarks.bench_snapshot --rows 2000000
+
+Needs `pip install pyarrow`.
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.bench_aggregate import seed
+from benchmarks.common import auth_headers, time_call, use_scratch_database
+
+# A month-end style report: every franchise, by budget and month, read from raw expenses
+REPORT = {"group_by": "franchise,budget,month", "from": "2024-01-01", "to": "2025-12-31"}
+
+
+def run_with_reporting(client, headers, source, reporters: int, probes: int) -> dict:
+    from sqlalchemy import event
+    from app.database.database import engine
+
+    report_queries = 0
+
+    def count(conn, cursor, statement, *args):
+        nonlocal report_queries
+        if "GROUP BY" in statement:
+            report_queries += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    stop = threading.Event()
+    reports = []
+
+    def reporter():
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/expenses/aggregate", params={**REPORT, "source": source}, headers=headers).raise_for_status()
+            reports.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=reporter) for _ in range(reporters if source else 0)]
+    for t in threads:
+        t.start()
+    try:
+        live = time_call(lambda: client.get("/expenses", params={"franchise_id": 1, "limit": 50}, headers=headers), probes)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        event.remove(engine, "before_cursor_execute", count)
+    return {
+        **live,
+        "reports": len(reports),
+        "report_p50_ms": round(statistics.median(reports), 1) if reports else None,
+        "report_db_queries": report_queries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--franchises", type=int, default=200)
+    parser.add_argument("--reporters", type=int, default=4)
+    parser.add_argument("--probes", type=int, default=300)
+    args = parser.parse_args()
+
+    use_scratch_database("bench_snapshot")
+    import app.snapshots as snapshots
+    snapshots.SNAPSHOT_DIR = Path(tempfile.mkdtemp(prefix="bench_snapshot_"))
+    from fastapi.testclient import TestClient
+    from app.bootstrap import prepare_database
+    from main import app
+
+    prepare_database()
+    seed(args.rows, args.franchises)
+    start = time.perf_counter()
+    result = snapshots.export_snapshot(full=True)
+    print(f"full export: {result['expenses']} expenses in {time.perf_counter() - start:.1f}s -> {snapshots.SNAPSHOT_DIR}")
+
+    client = TestClient(app)
+    headers = auth_headers(client)
+    for source in ("live", "snapshot"):
+        solo = time_call(lambda: client.get("/expenses/aggregate", params={**REPORT, "source": source}, headers=headers), 3)
+        print(f"report alone, source={source:<9} p50 {solo['p50_ms']:9.1f} ms")
+    print(f"{'reporting':<12} {'list p50':>9} {'list p95':>9} {'reports':>8} {'report p50':>11} {'report DB queries':>18}")
+    for label, source in (("none", None), ("database", "live"), ("snapshot", "snapshot")):
+        r = run_with_reporting(client, headers, source, args.reporters, args.probes)
+        print(
+            f"{label:<12} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['reports']:>8} "
+            f"{(str(r['report_p50_ms']) + 'ms') if r['report_p50_ms'] else '-':>11} {r['report_db_queries']:>18}"
+        )
+
+
+if __name__ == "__main__":
+    main()
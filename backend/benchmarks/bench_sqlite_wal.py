@@ -0,0 +1,64 @@
+"""Concurrent-write throughput on SQLite with and without WAL.
+
+Each writer thread commits one expense per transaction, like POST /expenses.
+
+    python -m benchmarks.bench_sqlite_wal --writers 8 --seconds 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import insert
+
+
+def run(sqlite_wal: bool, writers: int, seconds: float) -> dict:
+    from app.database.database import Base, build_engine
+    from app.models import Expense, Franchise
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_wal_{int(sqlite_wal)}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = build_engine(f"sqlite:///{path}", sqlite_wal=sqlite_wal)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Franchise).values(name="Bench", tax_number="BENCH-1", is_active=True))
+
+    commits, errors = [0] * writers, [0] * writers
+    deadline = time.perf_counter() + seconds
+
+    def writer(n: int):
+        row = {"franchise_id": 1, "date": date(2025, 1, 1), "category": "POS", "amount": 1}
+        while time.perf_counter() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(Expense), [row])
+                commits[n] += 1
+            except Exception:
+                errors[n] += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    return {"commits_per_s": sum(commits) / seconds, "errors": sum(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    for label, wal in (("rollback journal", False), ("WAL", True)):
+        result = run(wal, args.writers, args.seconds)
+        print(f"{label:>16}: {result['commits_per_s']:8.0f} commits/s  errors {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file so they never touch the
+development database. Call `use_scratch_database` before importing anything
+from `app` or `main`, since the engine is created at import time.
+"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def use_scratch_database(name: str) -> str:
+    path = os.path.join(tempfile.gettempdir(), f"{name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def time_call(fn, repeat: int = 20) -> dict:
+    """Run `fn` `repeat` times and return latency percentiles in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def auth_headers(client) -> dict:
+    response = client.post("/auth/login?username=admin&password=secret")
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
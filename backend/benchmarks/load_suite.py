@@ -0,0 +1,257 @@
+"""Throughput and p50/p95/p99 per route against a generated dataset, with a JSON baseline.
+
+    python -m benchmarks.load_suite --scale small --save baseline.json
+    python -m benchmarks.load_suite --scale small --baseline baseline.json   # exit 1 on regression
+    python -m benchmarks.load_suite --database-url postgresql://... --concurrency 64 --workers 4
+
+The dataset comes from `seed.generate` and is kept in the temp directory
+per scale and seed, so later runs skip generation; `--database-url` points
+at an existing database instead. The real app is started with `serve.py`
+and every route is driven in turn by `--concurrency` clients for
+`--seconds`, each request with ids drawn at random (seeded) from the data.
+
+With `--baseline`, a route regresses when its p95 grows, or its throughput
+drops, by more than `--tolerance` against the baseline; any regression
+makes the exit status 1. Compare runs on the same machine, scale and
+concurrency only.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# name -> (method, path template, JSON body template); {franchise}, {branch}, {budget}, {period}, {word} are drawn per request
+ROUTES = {
+    "GET /franchises": ("GET", "/franchises?limit=50", None),
+    "GET /franchises/{franchise_id}": ("GET", "/franchises/{franchise}", None),
+    "GET /branches?franchise_id": ("GET", "/branches?franchise_id={franchise}&limit=100", None),
+    "GET /branches/{branch_id}": ("GET", "/branches/{branch}", None),
+    "GET /budgets?franchise_id&period": ("GET", "/budgets?franchise_id={franchise}&period={period}&limit=100", None),
+    "GET /budgets/{budget_id}": ("GET", "/budgets/{budget}", None),
+    "GET /budgets/{budget_id}/summary": ("GET", "/budgets/{budget}/summary", None),
+    "GET /budgets/rollup": ("GET", "/budgets/rollup?franchise_id={franchise}&period={period}", None),
+    "POST /budgets/summary:batch": ("POST", "/budgets/summary:batch", {"franchise_id": ["{franchise}"], "period_from": "{period}", "period_to": "{period}"}),
+    "GET /expenses?franchise_id": ("GET", "/expenses?franchise_id={franchise}&limit=100", None),
+    "GET /expenses/aggregate": ("GET", "/expenses/aggregate?group_by=category,month&franchise_id={franchise}", None),
+    "GET /search": ("GET", "/search?q={word}", None),
+}
+
+SEARCH_WORDS = ["kadikoy", "cankaya", "izmir", "subesi 12", "kebap", "ka", "istanbul", "evi 42"]
+
+
+def prepare_dataset(args) -> dict:
+    """Point DATABASE_URL at the dataset, generating it if needed; returns what requests draw from."""
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        path = os.path.join(tempfile.gettempdir(), f"load_suite_{args.scale}_{args.seed}.db")
+        if args.regenerate and os.path.exists(path):
+            os.remove(path)
+        fresh = not os.path.exists(path)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from sqlalchemy import distinct, func, select
+    from app.bootstrap import prepare_database
+    from app.database.database import engine
+    from app.models import Branch, Budget, Franchise
+    import seed
+
+    prepare_database()
+    if not args.database_url and fresh:
+        seed.generate(seed.SCALES[args.scale], seed=args.seed)
+    with engine.connect() as conn:
+        dataset = {
+            "franchises": conn.scalar(select(func.max(Franchise.id))) or 0,
+            "branches": conn.scalar(select(func.max(Branch.id))) or 0,
+            "budgets": conn.scalar(select(func.max(Budget.id))) or 0,
+            "periods": sorted(conn.scalars(select(distinct(Budget.period)))),
+        }
+    engine.dispose()
+    if not (dataset["franchises"] and dataset["branches"] and dataset["budgets"]):
+        raise SystemExit("The database has no franchises, branches or budgets to drive requests with")
+    return dataset
+
+
+def start_server(port: int, workers: int):
+    # access logs would bury the results; they go to a file next to the dataset
+    log = open(os.path.join(tempfile.gettempdir(), "load_suite_server.log"), "w")
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        env={**os.environ, "DB_AUTO_MIGRATE": "false"}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if httpx.get(base_url + "/health").status_code == 200:
+                return server, base_url
+        except httpx.HTTPError:
+            pass
+        if server.poll() is not None:
+            raise SystemExit(f"The server exited during startup; see {log.name}")
+        time.sleep(0.1)
+    server.terminate()
+    raise SystemExit("The server did not become healthy in 30s")
+
+
+def _fill(template, values: dict):
+    if isinstance(template, str):
+        # a lone placeholder keeps the value's type, so ids stay ints in JSON bodies
+        if template.startswith("{") and template[1:-1] in values:
+            return values[template[1:-1]]
+        return template.format(**values)
+    if isinstance(template, list):
+        return [_fill(item, values) for item in template]
+    if isinstance(template, dict):
+        return {key: _fill(item, values) for key, item in template.items()}
+    return template
+
+
+def _draw(rng: random.Random, dataset: dict) -> dict:
+    return {
+        "franchise": rng.randint(1, dataset["franchises"]),
+        "branch": rng.randint(1, dataset["branches"]),
+        "budget": rng.randint(1, dataset["budgets"]),
+        "period": rng.choice(dataset["periods"]),
+        "word": rng.choice(SEARCH_WORDS),
+    }
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000
+
+
+async def drive_route(http: httpx.AsyncClient, route: tuple, dataset: dict, args, seed: int) -> dict:
+    method, path, body = route
+    latencies, errors = [], 0
+
+    async def client_loop(n: int, deadline: float, record: bool):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + n)
+        while time.perf_counter() < deadline:
+            values = _draw(rng, dataset)
+            payload = _fill(body, values)
+            start = time.perf_counter()
+            try:
+                r = await http.request(method, _fill(path, values), json=payload)
+                r.raise_for_status()
+            except httpx.HTTPError:
+                if record:
+                    errors += 1
+                continue
+            if record:
+                latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client_loop(n, time.perf_counter() + args.warmup, False) for n in range(args.concurrency)))
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(n, started + args.seconds, True) for n in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        return {"requests": 0, "errors": errors, "rps": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+    }
+
+
+async def run_suite(base_url: str, routes: dict, dataset: dict, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        login = await http.post("/auth/login", params={"username": "admin", "password": "secret"})
+        http.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+        results = {}
+        for i, (name, route) in enumerate(routes.items()):
+            results[name] = await drive_route(http, route, dataset, args, args.seed + i)
+            r = results[name]
+            print(f"{name:<36} {r['rps']:8.1f} req/s  p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  "
+                  f"p99 {r['p99_ms']} ms  errors {r['errors']}", flush=True)
+        return results
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Routes slower than the baseline by more than `tolerance` (0.2 = 20%)."""
+    regressions = []
+    for name, base in baseline["routes"].items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name}: {current['errors']} errors (baseline {base['errors']})")
+        if base["p95_ms"] and (current["p95_ms"] is None or current["p95_ms"] > base["p95_ms"] * (1 + tolerance)):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms (baseline {base['p95_ms']} ms)")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s (baseline {base['rps']} req/s)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="small", help="seed.SCALES entry to generate (small, medium, large)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the cached dataset")
+    parser.add_argument("--database-url", help="drive an existing database instead of a generated one")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8821)
+    parser.add_argument("--routes", nargs="*", help="only routes whose name contains one of these")
+    parser.add_argument("--save", help="write the results as a JSON baseline")
+    parser.add_argument("--baseline", help="compare against a saved baseline; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    routes = {name: route for name, route in ROUTES.items() if not args.routes or any(r in name for r in args.routes)}
+    dataset = prepare_dataset(args)
+    meta = {
+        "scale": None if args.database_url else args.scale,
+        "seed": args.seed,
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "workers": args.workers,
+        "dataset": {k: v for k, v in dataset.items() if k != "periods"},
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+    server, base_url = start_server(args.port, args.workers)
+    try:
+        results = asyncio.run(run_suite(base_url, routes, dataset, args))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "routes": results}, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("scale", "concurrency", "workers", "dataset"):
+            if baseline["meta"].get(key) != meta[key]:
+                print(f"warning: {key} differs from the baseline ({baseline['meta'].get(key)} vs {meta[key]})")
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No route regressed by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Requests/sec and p99 for sync (threadpool) vs async (DB_ASYNC) route handlers.
+
+Starts a uvicorn server per mode on a scratch SQLite database and drives
+GET /franchises, GET /budgets/{id} and POST /budgets/summary:batch from
+many concurrent clients. The summary's numpy pass is work besides queries,
+which under DB_ASYNC must leave the event loop (`run_blocking`).
+
+    python -m benchmarks.loadtest_async --clients 500 --seconds 20
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.common import use_scratch_database
+
+
+async def drive(base_url: str, clients: int, seconds: float) -> dict:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as http:
+        token = (await http.post("/auth/login", params={"username": "admin", "password": "secret"})).json()["access_token"]
+        http.headers["Authorization"] = f"Bearer {token}"
+        franchise_id = (await http.post("/franchises", json={"name": "Load", "tax_number": f"LOAD-{time.time_ns()}"})).json()["id"]
+        budget_id = (await http.post("/budgets", json={"franchise_id": franchise_id, "period": "2025-01", "planned_amount": 1})).json()["id"]
+
+        calls = [
+            ("GET", "/franchises?limit=20", None),
+            ("GET", f"/budgets/{budget_id}", None),
+            ("POST", "/budgets/summary:batch", {"franchise_id": [franchise_id]}),
+        ]
+        latencies, errors = [], 0
+        deadline = time.perf_counter() + seconds
+
+        async def client_loop(n: int):
+            nonlocal errors
+            method, path, body = calls[n % len(calls)]
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    r = await http.request(method, path, json=body)
+                    r.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        "errors": errors,
+    }
+
+
+def run_mode(async_db: bool, port: int, args) -> dict:
+    env = {**os.environ, "DB_ASYNC": "true" if async_db else "false"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        for _ in range(100):
+            try:
+                httpx.get(base_url + "/health")
+                break
+            except httpx.HTTPError:
+                time.sleep(0.1)
+        return asyncio.run(drive(base_url, args.clients, args.seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+
+    use_scratch_database("loadtest_async")
+    for label, async_db, port in (("sync ", False, 8811), ("async", True, 8812)):
+        result = run_mode(async_db, port, args)
+        print(f"{label}: {result['rps']:8.1f} req/s  p50 {result['p50_ms']:.1f}ms  "
+              f"p99 {result['p99_ms']:.1f}ms  errors {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Gunicorn settings for `gunicorn -c gunicorn.conf.py` (also used by serve.py).
+
+The app is imported once in the master and forked into uvicorn workers.
+`kill -HUP <master>` replaces workers gracefully; with a preloaded app,
+code changes need `kill -USR2` (re-exec the master) instead.
+"""
+import multiprocessing
+import os
+
+wsgi_app = "main:app"
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+# read by app.cache when the app is preloaded: per-process caching is off with several workers
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+
+def on_starting(server):
+    # Leader step: create the schema once, before any worker exists
+    from app.bootstrap import run_leader_step
+
+    run_leader_step()
+    server.log.info("Database prepared by the master process")
+
+
+def post_fork(server, worker):
+    # app.database also registers this with os.register_at_fork; repeated here so it is explicit
+    from app.database.database import dispose_engines_after_fork
+
+    dispose_engines_after_fork()
@@ -1,17 +1,33 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database.database import Base, engine
-from app.routes import franchise_router, branch_router, budget_router, expenses_router
+from app.bootstrap import check_schema_current, prepare_database, schema_ready
+from app.database.database import DB_ASYNC, dispose_engines, engine, pool_status
+from app.routes import franchise_router, branch_router, budget_router, expenses_router, search_router, events_router
+from app.routes.async_support import to_async_router
 from app.routes.auth import router as auth_router
-from app.models import Franchise, Branch
+from app.pagination import NEXT_CURSOR_HEADER
+from app.cache import response_cache
+from app.metrics import METRICS_ENABLED, MetricsMiddleware, instrument_engine, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # serve.py prepares the schema once before starting workers; they only verify it
+    if schema_ready():
+        check_schema_current()
+    else:
+        prepare_database()
+    yield
+    await dispose_engines()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Franchise Management API",
     version="1.0.0",
-    description="Professional franchise and branch management system with authentication"
+    description="Professional franchise and branch management system with authentication",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -21,14 +37,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
 )
 
+# Added last so it wraps everything else, CORS included
+if METRICS_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
-app.include_router(franchise_router)
-app.include_router(branch_router)
-app.include_router(budget_router)
-app.include_router(expenses_router)
+for router in (franchise_router, branch_router, budget_router, expenses_router, search_router, events_router):
+    app.include_router(to_async_router(router) if DB_ASYNC else router)
 
 
 @app.get("/health")
@@ -36,7 +56,21 @@ def health_check():
     return {"status": "ok", "version": "1.0.0"}
 
 
+@app.get("/health/cache")
+def cache_stats():
+    return response_cache.stats()
+
+
+@app.get("/health/pool")
+def pool_stats():
+    return pool_status()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    import serve
+    serve.main()
@@ -0,0 +1,170 @@
+"""Administrative commands.
+
+    python manage.py rollups check     # report drift in budget_rollups / expense_daily
+    python manage.py rollups rebuild   # recompute both rollup tables from scratch
+    python manage.py users import FILE # bulk-load users from CSV or NDJSON
+    python manage.py db upgrade        # apply pending migrations
+    python manage.py db check          # exit non-zero if migrations are pending
+    python manage.py snapshots export  # append new expenses to the Parquet snapshot (--full to rebuild)
+    python manage.py snapshots status  # last export time and expenses not yet exported
+    python manage.py search rebuild    # reindex every franchise and branch for GET /search
+    python manage.py periods close     # close past months and archive their expenses (--dry-run to preview)
+    python manage.py periods status    # last closed month and live / archived expense counts
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import date
+from sqlalchemy import func, select
+from app.bootstrap import check_schema_current, migrate, prepare_database, schema_revisions, SchemaOutOfDate
+from app.database.database import SessionLocal
+from app.models import Expense, ExpenseArchive
+from app.periods import PERIOD_CLOSE_GRACE_DAYS, close_periods, last_closed_period
+from app.rollups import find_drift, rebuild_rollups
+from app.search import rebuild_search_index
+from app.security import _hash_executor, pwd_context
+from app.snapshots import SnapshotUnavailable, export_snapshot, read_state, snapshot_lag
+from app.users import import_users
+
+
+def rollups(args) -> int:
+    db = SessionLocal()
+    try:
+        drift = find_drift(db)
+        for row in drift:
+            print(f"drift {row['table']} {row['key']}: stored={row['stored']} expected={row['expected']}")
+        if args.action == "check":
+            print(f"{len(drift)} rollup row(s) out of date")
+            return 1 if drift else 0
+        count = rebuild_rollups(db)
+        print(f"Rebuilt {count} rollup row(s); fixed {len(drift)} drifted row(s)")
+        return 0
+    finally:
+        db.close()
+
+
+def _read_user_rows(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _hash_plaintext(rows, chunk: int = 256):
+    """Replace `password` with `hashed_password`, hashing a chunk at a time on the hash pool."""
+    rows = iter(rows)
+    while True:
+        batch = [row for _, row in zip(range(chunk), rows)]
+        if not batch:
+            return
+        plain = [row for row in batch if not row.get("hashed_password")]
+        hashes = _hash_executor.map(pwd_context.hash, [row.pop("password") for row in plain])
+        for row, hashed in zip(plain, hashes):
+            row["hashed_password"] = hashed
+        yield from batch
+
+
+def users(args) -> int:
+    result = import_users(_hash_plaintext(_read_user_rows(args.file)))
+    print(f"Imported {result['inserted']} user(s); skipped {result['skipped']} existing")
+    return 0
+
+
+def db(args) -> int:
+    if args.action == "upgrade":
+        migrate()
+    current, head = schema_revisions()
+    print(f"Database at revision {current or '(none)'}; latest is {head}")
+    try:
+        check_schema_current()
+    except SchemaOutOfDate:
+        return 1
+    return 0
+
+
+def snapshots(args) -> int:
+    if args.action == "status":
+        state = read_state()
+        print(f"Last export: {state['exported_at'] or 'never'}; {snapshot_lag()} expense(s) not yet exported")
+        return 0
+    try:
+        result = export_snapshot(full=args.full)
+    except SnapshotUnavailable as exc:
+        print(exc)
+        return 1
+    print(f"Exported {result['expenses']} expense(s) and {result['budgets']} budget(s); high-water mark {result['expenses_max_id']}")
+    return 0
+
+
+def search(args) -> int:
+    db = SessionLocal()
+    try:
+        count = rebuild_search_index(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Indexed {count} franchise(s) and branch(es)")
+    return 0
+
+
+def periods(args) -> int:
+    db = SessionLocal()
+    try:
+        if args.action == "status":
+            live = db.scalar(select(func.count()).select_from(Expense))
+            archived = db.scalar(select(func.count()).select_from(ExpenseArchive))
+            print(f"Closed through {last_closed_period(db) or '(none)'}; {live} live and {archived} archived expense(s)")
+            return 0
+        result = close_periods(db, args.today, args.grace_days, dry_run=args.dry_run)
+    finally:
+        db.close()
+    print(f"{'Would close' if args.dry_run else 'Closed'} {', '.join(result['periods']) or 'no new periods'}; "
+          f"{result['budgets_closed']} budget(s) closed, {result['expenses_archived']} expense(s) archived")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Franchise Management admin commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("rollups", help="Check or rebuild the budget_rollups and expense_daily tables")
+    p.add_argument("action", choices=["check", "rebuild"])
+    p.set_defaults(handler=rollups)
+
+    p = commands.add_parser("users", help="Bulk-import users")
+    p.add_argument("action", choices=["import"])
+    p.add_argument("file", help="CSV or NDJSON with username and password (or hashed_password)")
+    p.set_defaults(handler=users)
+
+    p = commands.add_parser("db", help="Apply or check schema migrations")
+    p.add_argument("action", choices=["upgrade", "check"])
+    p.set_defaults(handler=db)
+
+    p = commands.add_parser("snapshots", help="Export or inspect the Parquet reporting snapshot")
+    p.add_argument("action", choices=["export", "status"])
+    p.add_argument("--full", action="store_true", help="rebuild instead of appending (drops deleted expenses)")
+    p.set_defaults(handler=snapshots)
+
+    p = commands.add_parser("search", help="Rebuild the franchise and branch search index")
+    p.add_argument("action", choices=["rebuild"])
+    p.set_defaults(handler=search)
+
+    p = commands.add_parser("periods", help="Close past months and archive their expenses")
+    p.add_argument("action", choices=["close", "status"])
+    p.add_argument("--grace-days", type=int, default=PERIOD_CLOSE_GRACE_DAYS, help="days after a month ends before it closes")
+    p.add_argument("--today", type=date.fromisoformat, help="close as if run on this date (YYYY-MM-DD)")
+    p.add_argument("--dry-run", action="store_true", help="report what would be closed and archived")
+    p.set_defaults(handler=periods)
+
+    args = parser.parse_args(argv)
+    if args.handler is not db:
+        prepare_database()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+from logging.config import fileConfig
+
+from alembic import context
+from app import models  # noqa: F401  (registers every table on Base.metadata)
+from app.database.database import Base, engine
+
+config = context.config
+
+# app.bootstrap passes its own connection and keeps the app's logging setup
+connection = config.attributes.get("connection")
+if connection is None and config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+# Dialect-specific search index objects from 0004 and the yearly archive
+# partitions app.periods creates on PostgreSQL; the models don't describe them
+UNMODELED_OBJECTS = ("search_fts", "ix_search_entries_terms_trgm", "expenses_archive_")
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and name.startswith(UNMODELED_OBJECTS))
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # SQLite can't ALTER most things in place; batch mode rebuilds the table
+        render_as_batch=connection.dialect.name == "sqlite",
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif connection is not None:
+    run_migrations_online(connection)
+else:
+    with engine.connect() as conn:
+        run_migrations_online(conn)
@@ -0,0 +1,128 @@
+"""initial schema
+
+Every table that `Base.metadata.create_all` used to create at startup.
+Databases created that way before migrations existed already have some or
+all of these tables; those are left alone, so upgrading such a database
+only fills in what is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _missing(table: str) -> bool:
+    if context.is_offline_mode():
+        return True
+    return not sa.inspect(op.get_bind()).has_table(table)
+
+
+def upgrade() -> None:
+    if _missing('franchises'):
+        op.create_table('franchises',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('tax_number', sa.String(length=50), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tax_number')
+        )
+        op.create_index('ix_franchises_id', 'franchises', ['id'])
+
+    if _missing('branches'):
+        op.create_table('branches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('city', sa.String(length=255), nullable=False),
+        sa.Column('franchise_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_branches_id', 'branches', ['id'])
+
+    if _missing('budgets'):
+        op.create_table('budgets',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('franchise_id', sa.Integer(), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=True),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('currency', sa.String(length=3), nullable=False),
+        sa.Column('planned_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('approved_amount', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('actual_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('status', sa.Enum('draft', 'approved', 'rejected', 'closed', name='budgetstatus'), nullable=False),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ),
+        sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('franchise_id', 'branch_id', 'period', name='uq_budget_scope_period')
+        )
+        op.create_index('ix_budgets_id', 'budgets', ['id'])
+        op.create_index('ix_budgets_franchise_id', 'budgets', ['franchise_id'])
+        op.create_index('ix_budgets_branch_id', 'budgets', ['branch_id'])
+        op.create_index('ix_budgets_period', 'budgets', ['period'])
+
+    if _missing('expenses'):
+        op.create_table('expenses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('budget_id', sa.Integer(), nullable=True),
+        sa.Column('franchise_id', sa.Integer(), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=True),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('note', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ),
+        sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ),
+        sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_expenses_id', 'expenses', ['id'])
+        op.create_index('ix_expenses_budget_id', 'expenses', ['budget_id'])
+        op.create_index('ix_expenses_franchise_id', 'expenses', ['franchise_id'])
+        op.create_index('ix_expenses_branch_id', 'expenses', ['branch_id'])
+
+    if _missing('budget_rollups'):
+        # filled by `python manage.py rollups rebuild` on databases that already have budgets
+        op.create_table('budget_rollups',
+        sa.Column('franchise_id', sa.Integer(), nullable=False),
+        sa.Column('branch_id', sa.Integer(), nullable=False),
+        sa.Column('period', sa.String(length=7), nullable=False),
+        sa.Column('planned_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('approved_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('actual_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+        sa.PrimaryKeyConstraint('franchise_id', 'branch_id', 'period')
+        )
+
+    if _missing('users'):
+        op.create_table('users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('full_name', sa.String(length=255), nullable=True),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('disabled', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_username', 'users', ['username'], unique=True)
+
+
+def downgrade() -> None:
+    for table in ('users', 'budget_rollups', 'expenses', 'budgets', 'branches', 'franchises'):
+        op.drop_table(table)
+    sa.Enum(name='budgetstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,43 @@
+"""hot path composite indexes
+
+Indexes for the list endpoints' filter + sort order. On PostgreSQL they
+are built with CREATE INDEX CONCURRENTLY outside a transaction, so reads
+and writes continue while they build. A failed concurrent build leaves an
+INVALID index behind; `if_not_exists` would then skip it, so drop it
+before retrying.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # GET /expenses?franchise_id=... orders by date DESC, id DESC
+    ('ix_expenses_franchise_date_id', 'expenses', ['franchise_id', sa.text('date DESC'), sa.text('id DESC')]),
+    ('ix_budgets_franchise_period', 'budgets', ['franchise_id', 'period']),
+    ('ix_branches_franchise_id_id', 'branches', ['franchise_id', 'id']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
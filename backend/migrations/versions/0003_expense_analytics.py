@@ -0,0 +1,56 @@
+"""expense analytics: expense_daily rollup and covering index
+
+`expense_daily` is backfilled from `expenses` here; afterwards the
+expense endpoints keep it up to date. The covering index serves the
+aggregate queries that have to read `expenses` directly (those by
+budget) and is built concurrently on PostgreSQL, like 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('expense_daily',
+    sa.Column('franchise_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    sa.Column('expense_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+    sa.PrimaryKeyConstraint('franchise_id', 'day', 'category', 'branch_id')
+    )
+    op.execute(
+        "INSERT INTO expense_daily (franchise_id, day, category, branch_id, expense_count, total_amount) "
+        "SELECT franchise_id, date, category, COALESCE(branch_id, 0), COUNT(*), COALESCE(SUM(amount), 0) "
+        "FROM expenses GROUP BY franchise_id, date, category, COALESCE(branch_id, 0)"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_expenses_franchise_date_category_amount', 'expenses',
+            ['franchise_id', 'date', 'category', 'amount'],
+            if_not_exists=True, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_expenses_franchise_date_category_amount', table_name='expenses',
+            if_exists=True, postgresql_concurrently=True,
+        )
+    op.drop_table('expense_daily')
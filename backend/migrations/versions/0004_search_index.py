@@ -0,0 +1,112 @@
+"""search index for franchise and branch names
+
+Creates `search_entries` and backfills it from `franchises` and
+`branches`, folding the text like `app.search.normalize`. The backfill
+uses table snapshots and a copy of `normalize` defined here, not the app's
+models, so later model changes can't alter this revision. The trigram index
+depends on the dialect: an external-content FTS5 table with the trigram
+tokenizer, kept in sync by triggers, on SQLite; a pg_trgm GIN index
+(built concurrently, like 0002) on PostgreSQL.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+franchises = sa.table('franchises', sa.column('id'), sa.column('name'), sa.column('tax_number'))
+branches = sa.table('branches', sa.column('id'), sa.column('franchise_id'), sa.column('name'), sa.column('city'))
+search_entries = sa.table(
+    'search_entries', sa.column('kind'), sa.column('ref_id'), sa.column('franchise_id'),
+    sa.column('title'), sa.column('subtitle'), sa.column('terms'),
+)
+
+# app.search.normalize as of this revision
+_FOLD = str.maketrans({"İ": "i", "I": "i", "ı": "i"})
+
+
+def normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    text = "".join(c for c in text if not unicodedata.combining(c)).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def backfill(bind) -> None:
+    sources = (
+        ("franchise", franchises.c.id, (franchises.c.id, franchises.c.id, franchises.c.name, franchises.c.tax_number)),
+        ("branch", branches.c.id, (branches.c.id, branches.c.franchise_id, branches.c.name, branches.c.city)),
+    )
+    for kind, key, columns in sources:
+        last_id = 0
+        while True:
+            chunk = bind.execute(sa.select(*columns).where(key > last_id).order_by(key).limit(BATCH_SIZE)).all()
+            if not chunk:
+                break
+            last_id = chunk[-1][0]
+            bind.execute(sa.insert(search_entries), [
+                {"kind": kind, "ref_id": ref_id, "franchise_id": f_id, "title": title,
+                 "subtitle": subtitle, "terms": normalize(f"{title} {subtitle}")}
+                for ref_id, f_id, title, subtitle in chunk
+            ])
+
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE search_fts USING fts5("
+    "terms, content='search_entries', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER search_entries_ai AFTER INSERT ON search_entries BEGIN "
+    "INSERT INTO search_fts(rowid, terms) VALUES (new.id, new.terms); END",
+    "CREATE TRIGGER search_entries_ad AFTER DELETE ON search_entries BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, terms) VALUES ('delete', old.id, old.terms); END",
+    "CREATE TRIGGER search_entries_au AFTER UPDATE ON search_entries BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, terms) VALUES ('delete', old.id, old.terms); "
+    "INSERT INTO search_fts(rowid, terms) VALUES (new.id, new.terms); END",
+]
+
+
+def upgrade() -> None:
+    op.create_table('search_entries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('ref_id', sa.Integer(), nullable=False),
+    sa.Column('franchise_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('subtitle', sa.String(length=255), nullable=False),
+    sa.Column('terms', sa.String(length=600), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('ref_id', 'kind', name='uq_search_entries_ref_kind')
+    )
+    op.create_index('ix_search_entries_terms', 'search_entries', ['terms'])
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+    backfill(op.get_bind())
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        with op.get_context().autocommit_block():
+            op.create_index(
+                'ix_search_entries_terms_trgm', 'search_entries', ['terms'],
+                if_not_exists=True, postgresql_concurrently=True,
+                postgresql_using='gin', postgresql_ops={'terms': 'gin_trgm_ops'},
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS search_fts")
+    op.drop_table('search_entries')
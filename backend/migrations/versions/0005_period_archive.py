@@ -0,0 +1,65 @@
+"""period closing: closed_periods and expenses_archive
+
+`expenses_archive` takes the expenses of closed periods (see
+`app.periods`). On PostgreSQL it is partitioned by range of `date`; the
+yearly partitions are created by the closing job as it needs them. Both
+tables start empty, so their indexes are built directly.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('closed_periods',
+    sa.Column('period', sa.String(length=7), nullable=False),
+    sa.Column('closed_at', sa.DateTime(), nullable=False),
+    sa.Column('budgets_closed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('period')
+    )
+    op.create_table('expenses_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('budget_id', sa.Integer(), nullable=True),
+    sa.Column('franchise_id', sa.Integer(), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=True),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('note', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['branch_id'], ['branches.id'], ),
+    sa.ForeignKeyConstraint(['budget_id'], ['budgets.id'], ),
+    sa.ForeignKeyConstraint(['franchise_id'], ['franchises.id'], ),
+    sa.PrimaryKeyConstraint('id', 'date'),
+    postgresql_partition_by='RANGE (date)'
+    )
+    op.create_index('ix_expenses_archive_budget_id', 'expenses_archive', ['budget_id'])
+    op.create_index(
+        'ix_expenses_archive_franchise_date_id', 'expenses_archive',
+        ['franchise_id', sa.text('date DESC'), sa.text('id DESC')],
+    )
+    op.create_index(
+        'ix_expenses_archive_aggregate', 'expenses_archive',
+        ['franchise_id', 'date', 'category', 'amount', 'budget_id', 'branch_id'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_expenses_archive_aggregate', table_name='expenses_archive')
+    op.drop_index('ix_expenses_archive_franchise_date_id', table_name='expenses_archive')
+    op.drop_index('ix_expenses_archive_budget_id', table_name='expenses_archive')
+    # partitions go with their parent table
+    op.drop_table('expenses_archive')
+    op.drop_table('closed_periods')
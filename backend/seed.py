@@ -1,12 +1,169 @@
+"""Development data.
+
+    python seed.py                     # a handful of demo franchises, budgets and expenses
+    python seed.py --scale large       # 10k franchises, 200k branches, 1M budgets, 50M expenses
+    python seed.py --scale small --expenses 1000000 --seed 7
+
+`generate` fills an empty database with synthetic data through Core bulk
+inserts, batch by batch, so memory stays flat at any size. The same seed
+and sizes always produce the same rows, ids included. Branches are skewed
+towards the lower franchise ids, like real chains. Each budget's
+`actual_amount` is the sum of its expenses. Rollups and the search index
+are rebuilt at the end.
+"""
+import argparse
+import calendar
+import random
+import time
 from datetime import date
 from decimal import Decimal
-from app.database.database import SessionLocal, Base, engine
+from typing import NamedTuple
+from sqlalchemy import func, insert, select, text
+from app.bootstrap import prepare_database
+from app.database.database import SessionLocal, engine
 from app.models.franchise import Franchise
 from app.models.branch import Branch
 from app.models.budget import Budget, Expense, BudgetStatus
+from app.rollups import rebuild_rollups
+from app.search import rebuild_search_index
+
+
+class Scale(NamedTuple):
+    franchises: int
+    branches: int
+    budgets: int
+    expenses: int
+
+
+SCALES = {
+    "small": Scale(100, 2_000, 10_000, 200_000),
+    "medium": Scale(1_000, 20_000, 100_000, 5_000_000),
+    "large": Scale(10_000, 200_000, 1_000_000, 50_000_000),
+}
+
+# Rows per INSERT round trip
+GENERATE_BATCH_SIZE = 50_000
+
+CITIES = ["İstanbul", "Ankara", "İzmir", "Bursa", "Antalya", "Konya", "Gaziantep", "Şanlıurfa", "Kayseri", "Eskişehir"]
+DISTRICTS = [
+    "Kadıköy", "Beşiktaş", "Üsküdar", "Çankaya", "Keçiören", "Karşıyaka", "Bornova", "Nilüfer",
+    "Muratpaşa", "Selçuklu", "Şahinbey", "Melikgazi", "Odunpazarı", "Ataşehir", "Çiğli", "Yenimahalle",
+]
+BRANDS = ["Simit", "Kebap", "Döner", "Kahve", "Börek", "Lokanta", "Pide", "Tatlı", "Çiğ Köfte", "Mantı"]
+CATEGORIES = ["Marketing", "Operations", "Salaries", "Rent", "Utilities", "Supplies", "Travel", "Maintenance"]
+STATUSES = [BudgetStatus.draft, BudgetStatus.approved, BudgetStatus.rejected, BudgetStatus.closed]
+STATUS_WEIGHTS = [20, 60, 5, 15]
+
+
+def _cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+def _month(first_period: str, offset: int) -> tuple[int, int]:
+    months = int(first_period[:4]) * 12 + int(first_period[5:7]) - 1 + offset
+    return months // 12, months % 12 + 1
+
+
+def _sync_sequences(conn) -> None:
+    # ids were given explicitly, so PostgreSQL's serial sequences never moved
+    if conn.dialect.name == "postgresql":
+        for table in ("franchises", "branches", "budgets", "expenses"):
+            conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+
+
+def generate(
+    scale: Scale,
+    seed: int = 42,
+    first_period: str = "2024-01",
+    batch_size: int = GENERATE_BATCH_SIZE,
+    progress=print,
+) -> Scale:
+    """Fill an empty database with `scale` rows; returns the counts inserted.
+
+    Budgets are per branch, one period after another from `first_period`,
+    so `scale.budgets` should be a multiple of `scale.branches` for every
+    branch to have the same months. Expenses are spread evenly over the
+    budgets and dated inside their budget's month.
+    """
+    rng = random.Random(seed)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(Franchise)):
+            raise ValueError("generate needs an empty database; franchises already exist")
+
+        def flush(model, rows):
+            if rows:
+                conn.execute(insert(model), rows)
+                rows.clear()
+
+        franchise_rows = []
+        for i in range(1, scale.franchises + 1):
+            franchise_rows.append({"id": i, "name": f"{rng.choice(BRANDS)} Evi {i}", "tax_number": f"TR{i:010d}", "is_active": rng.random() > 0.02})
+            if len(franchise_rows) >= batch_size:
+                flush(Franchise, franchise_rows)
+        flush(Franchise, franchise_rows)
+
+        # squaring a uniform draw puts more branches on low franchise ids
+        branch_franchise = [0] + [int(scale.franchises * rng.random() ** 2) + 1 for _ in range(scale.branches)]
+        branch_rows = []
+        for i in range(1, scale.branches + 1):
+            branch_rows.append({"id": i, "name": f"{rng.choice(DISTRICTS)} Şubesi {i}", "city": rng.choice(CITIES), "franchise_id": branch_franchise[i]})
+            if len(branch_rows) >= batch_size:
+                flush(Branch, branch_rows)
+        flush(Branch, branch_rows)
+        conn.commit()
+        progress(f"{scale.franchises} franchises, {scale.branches} branches")
+
+        per_budget, extra = divmod(scale.expenses, scale.budgets) if scale.budgets else (0, 0)
+        budget_rows, expense_rows = [], []
+        expense_id = 0
+        started = time.perf_counter()
+        for k in range(scale.budgets):
+            branch_id = k % scale.branches + 1
+            year, month = _month(first_period, k // scale.branches)
+            days = calendar.monthrange(year, month)[1]
+            status = rng.choices(STATUSES, STATUS_WEIGHTS)[0]
+            planned = rng.randint(100, 5_000) * 10_000
+            approved = planned * rng.randint(90, 100) // 100 if status in (BudgetStatus.approved, BudgetStatus.closed) else None
+            count = per_budget + (k < extra)
+            # spend lands around the plan, so some budgets run over
+            typical = planned // count if count else 0
+            actual = 0
+            for _ in range(count):
+                expense_id += 1
+                amount = max(1, typical * rng.randint(20, 150) // 100)
+                actual += amount
+                expense_rows.append({
+                    "id": expense_id, "budget_id": k + 1, "franchise_id": branch_franchise[branch_id], "branch_id": branch_id,
+                    "date": date(year, month, rng.randint(1, days)), "category": rng.choice(CATEGORIES),
+                    "amount": _cents(amount), "note": None,
+                })
+            budget_rows.append({
+                "id": k + 1, "franchise_id": branch_franchise[branch_id], "branch_id": branch_id,
+                "period": f"{year:04d}-{month:02d}", "currency": "TRY", "planned_amount": _cents(planned),
+                "approved_amount": _cents(approved) if approved is not None else None,
+                "actual_amount": _cents(actual), "status": status,
+            })
+            if len(expense_rows) >= batch_size or len(budget_rows) >= batch_size:
+                # budgets first: their expenses reference them
+                flush(Budget, budget_rows)
+                flush(Expense, expense_rows)
+                conn.commit()
+                progress(f"{k + 1} budgets, {expense_id} expenses ({expense_id / (time.perf_counter() - started):.0f} expenses/s)")
+        flush(Budget, budget_rows)
+        flush(Expense, expense_rows)
+        _sync_sequences(conn)
+        conn.commit()
+
+    db = SessionLocal()
+    try:
+        progress("rebuilding rollups and the search index")
+        rebuild_rollups(db)
+        rebuild_search_index(db)
+        db.commit()
+    finally:
+        db.close()
+    return Scale(scale.franchises, scale.branches, scale.budgets, expense_id)
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
 
 def run():
     db = SessionLocal()
@@ -92,11 +249,32 @@ def run():
             ]
             db.add_all(expenses)
             db.commit()
+            rebuild_rollups(db)
             print("Seeded demo franchises, branches, budgets, and expenses.")
         else:
             print("Database already seeded; skipping.")
     finally:
         db.close()
 
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Seed the development database")
+    parser.add_argument("--scale", choices=SCALES, help="generate synthetic data instead of the demo rows")
+    for field in Scale._fields:
+        parser.add_argument(f"--{field}", type=int, help=f"override the scale's number of {field}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--first-period", default="2024-01")
+    args = parser.parse_args(argv)
+
+    prepare_database()
+    overrides = {field: getattr(args, field) for field in Scale._fields if getattr(args, field) is not None}
+    if args.scale is None and not overrides:
+        run()
+        return
+    scale = SCALES[args.scale or "small"]._replace(**overrides)
+    started = time.perf_counter()
+    counts = generate(scale, seed=args.seed, first_period=args.first_period)
+    print(f"Generated {counts} in {time.perf_counter() - started:.0f}s")
+
+
 if __name__ == "__main__":
-    run()
+    main()
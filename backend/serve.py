@@ -0,0 +1,51 @@
+"""Serving entry point.
+
+    python serve.py                    # gunicorn master + WEB_CONCURRENCY uvicorn workers
+    python serve.py --workers 4
+    python serve.py --reload           # single auto-reloading process for development
+
+The database is prepared once here (the leader step) before any worker
+starts. Without gunicorn installed (e.g. on Windows), falls back to
+uvicorn's own process manager, which imports the app in each worker.
+"""
+import argparse
+import os
+import sys
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Run the Franchise Management API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to WEB_CONCURRENCY or gunicorn.conf.py")
+    parser.add_argument("--reload", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.workers:
+        os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    os.environ.setdefault("BIND", f"{args.host}:{args.port}")
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None and not args.reload:
+        # gunicorn.conf.py runs the leader step in the master
+        os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"])
+
+    import uvicorn
+    from app.bootstrap import run_leader_step
+
+    run_leader_step()
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        reload=args.reload,
+        workers=None if args.reload else int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
+
+
+if __name__ == "__main__":
+    main()
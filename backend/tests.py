@@ -1,6 +1,24 @@
+import csv
+import io
+import json
+import os
+import resource
+import tempfile
+import uuid
+from contextlib import contextmanager
 import pytest
+
+# A scratch database unless one is given, so test runs never write to the tracked dev database
+if "DATABASE_URL" not in os.environ:
+    TEST_DB = os.path.join(tempfile.gettempdir(), "franchise_tests.db")
+    for leftover in (TEST_DB, TEST_DB + "-wal", TEST_DB + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DB}"
+from sqlalchemy import event
 from fastapi.testclient import TestClient
-from app.database.database import Base, SessionLocal, engine
+from app.bootstrap import prepare_database
+from app.database.database import SessionLocal, engine
 from main import app
 
 # Override get_db for testing
@@ -19,7 +37,7 @@ client = TestClient(app)
 
 
 # Create tables for testing
-Base.metadata.create_all(bind=engine)
+prepare_database()
 
 
 class TestAuth:
@@ -37,6 +55,90 @@ class TestAuth:
         response = client.post("/auth/login?username=nonexistent&password=password")
         assert response.status_code == 401
 
+    def test_signup_then_login(self):
+        username = f"user_{uuid.uuid4().hex[:8]}"
+        assert client.post("/auth/signup", json={"username": username, "password": "hunter22"}).status_code == 200
+        assert client.post("/auth/signup", json={"username": username, "password": "hunter22"}).status_code == 400
+        assert client.post(f"/auth/login?username={username}&password=hunter22").status_code == 200
+
+    def test_login_rehashes_when_cost_policy_changes(self, monkeypatch):
+        from passlib.context import CryptContext
+        from app import security as security_module
+        from app.users import get_user
+
+        username = f"user_{uuid.uuid4().hex[:8]}"
+        client.post("/auth/signup", json={"username": username, "password": "hunter22"})
+        old_hash = get_user(username)["hashed_password"]
+
+        stronger = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__rounds=30000)
+        monkeypatch.setattr(security_module, "pwd_context", stronger)
+        assert client.post(f"/auth/login?username={username}&password=hunter22").status_code == 200
+        new_hash = get_user(username)["hashed_password"]
+        assert new_hash != old_hash and "$30000$" in new_hash
+        assert not stronger.needs_update(new_hash)
+
+    def test_users_persist_past_the_lookup_cache(self):
+        from app.users import clear_user_cache, get_user, import_users
+
+        username = f"user_{uuid.uuid4().hex[:8]}"
+        client.post("/auth/signup", json={"username": username, "password": "hunter22"})
+        clear_user_cache()
+        assert client.post(f"/auth/login?username={username}&password=hunter22").status_code == 200
+
+        token = client.post(f"/auth/login?username={username}&password=hunter22").json()["access_token"]
+        response = client.post(
+            "/auth/password",
+            json={"current_password": "hunter22", "new_password": "hunter33"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        assert client.post(f"/auth/login?username={username}&password=hunter22").status_code == 401
+        assert client.post(f"/auth/login?username={username}&password=hunter33").status_code == 200
+
+        result = import_users([{"username": username, "hashed_password": "x"}, {"username": username + "_b", "hashed_password": "x"}])
+        assert result == {"inserted": 1, "skipped": 1}
+
+        # CSV values arrive as strings
+        rows = [{"username": f"{username}_{flag}", "hashed_password": "x", "disabled": flag} for flag in ("false", "False", "0", "true", "1")]
+        import_users(rows)
+        assert [get_user(row["username"])["disabled"] for row in rows] == [False, False, False, True, True]
+
+    def test_protected_route_rejects_bad_tokens(self):
+        from datetime import timedelta
+        from app.security import create_access_token
+
+        assert client.get("/franchises", headers={"Authorization": "Bearer not-a-jwt"}).status_code == 401
+        expired = create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+        assert client.get("/franchises", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+
+    def test_verified_claims_are_cached(self):
+        from app.security import token_cache
+
+        token = get_jwt_token()
+        token_cache.clear()
+        response = client.get("/auth/verify", headers={"Authorization": f"Bearer {token}"})
+        assert response.json()["username"] == "admin"
+        assert token_cache.get(token)["sub"] == "admin"
+
+    def test_asymmetric_keys(self, monkeypatch):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        from app import security as security_module
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_pem = key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+        monkeypatch.setattr(security_module, "ALGORITHM", "RS256")
+        monkeypatch.setattr(security_module, "SIGNING_KEY", private_pem)
+        monkeypatch.setattr(security_module, "VERIFICATION_KEY", public_pem)
+
+        token = security_module.create_access_token({"sub": "edge"})
+        assert security_module.decode_access_token(token)["sub"] == "edge"
+
 
 
 def get_jwt_token():
@@ -98,8 +200,1179 @@ class TestFranchises:
         assert response.status_code == 404
 
 
+def auth_header():
+    return {"Authorization": f"Bearer {get_jwt_token()}"}
+
+
+def create_test_franchise(headers):
+    response = client.post(
+        "/franchises",
+        json={"name": "Fixture Franchise", "tax_number": uuid.uuid4().hex[:20], "is_active": True},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+class TestCursorPagination:
+    def test_branches_cursor_walks_every_row_once(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        created = []
+        for i in range(5):
+            r = client.post("/branches", json={"name": f"Branch {i}", "city": "İzmir", "franchise_id": franchise_id}, headers=headers)
+            created.append(r.json()["id"])
+
+        seen, cursor = [], None
+        while True:
+            params = {"franchise_id": franchise_id, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            r = client.get("/branches", params=params, headers=headers)
+            assert r.status_code == 200
+            seen += [b["id"] for b in r.json()]
+            cursor = r.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == created
+
+    def test_expenses_cursor_orders_by_date_then_id(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        for day in ["2025-01-03", "2025-01-01", "2025-01-03", "2025-01-02"]:
+            client.post("/expenses", json={"franchise_id": franchise_id, "date": day, "category": "Ops", "amount": 10}, headers=headers)
+
+        first = client.get("/expenses", params={"franchise_id": franchise_id, "limit": 3}, headers=headers)
+        second = client.get(
+            "/expenses",
+            params={"franchise_id": franchise_id, "limit": 3, "cursor": first.headers["X-Next-Cursor"]},
+            headers=headers,
+        )
+        offset_page = client.get("/expenses", params={"franchise_id": franchise_id, "limit": 3, "skip": 3}, headers=headers)
+        dates = [e["date"] for e in first.json() + second.json()]
+        assert dates == ["2025-01-03", "2025-01-03", "2025-01-02", "2025-01-01"]
+        assert second.json() == offset_page.json()
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_invalid_cursor_is_rejected(self):
+        from app.pagination import encode_cursor
+
+        headers = auth_header()
+        response = client.get("/budgets", params={"cursor": "not-a-cursor"}, headers=headers)
+        assert response.status_code == 400
+        # well-formed tokens whose values have the wrong types
+        for path, values in (
+            ("/budgets", [{"a": 1}]),
+            ("/franchises", ["1"]),
+            ("/branches", [True]),
+            ("/expenses", [1, 2]),
+            ("/expenses", ["2031-13-01", 2]),
+            ("/expenses", ["2031-01-01", None]),
+            ("/franchises", [10 ** 30]),
+            ("/budgets", [-(2 ** 63) - 1]),
+            ("/expenses", ["2031-01-01", 2 ** 63]),
+        ):
+            response = client.get(path, params={"cursor": encode_cursor(values)}, headers=headers)
+            assert response.status_code == 400, (path, values)
+
+
+class TestExport:
+    def test_export_expenses_ndjson_and_csv(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        for day in ["2025-02-01", "2025-02-02"]:
+            client.post("/expenses", json={"franchise_id": franchise_id, "date": day, "category": "Rent", "amount": 12.5}, headers=headers)
+
+        r = client.get("/expenses/export", params={"franchise_id": franchise_id}, headers=headers)
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in r.text.splitlines()]
+        assert [row["date"] for row in rows] == ["2025-02-02", "2025-02-01"]
+        assert rows[0]["amount"] == 12.5
+
+        r = client.get("/expenses/export", params={"franchise_id": franchise_id, "format": "csv"}, headers=headers)
+        table = list(csv.reader(io.StringIO(r.text)))
+        assert table[0][:2] == ["id", "franchise_id"]
+        assert len(table) == 3
+
+    def test_export_budgets_rejects_unknown_format(self):
+        r = client.get("/budgets/export", params={"format": "xml"}, headers=auth_header())
+        assert r.status_code == 422
+
+    @pytest.mark.skipif(not os.getenv("RUN_SLOW_TESTS"), reason="seeds 1M rows; set RUN_SLOW_TESTS=1")
+    def test_export_million_rows_with_bounded_memory(self):
+        from datetime import date
+        from sqlalchemy import insert, select
+        from app.export import stream_rows, EXPORT_CHUNK_SIZE
+        from app.models import Expense
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        total = 1_000_000
+        row = {"franchise_id": franchise_id, "date": date(2025, 3, 1), "category": "Bulk", "amount": 1}
+        with engine.begin() as conn:
+            for _ in range(total // 10_000):
+                conn.execute(insert(Expense), [row] * 10_000)
+
+        stmt = select(Expense.id, Expense.amount).where(Expense.franchise_id == franchise_id)
+        peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        exported = sum(chunk.count("\n") for chunk in stream_rows(stmt, ["id", "amount"], "ndjson"))
+        peak_growth_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - peak_before
+        assert exported == total
+        # a fully materialized result would need several hundred MB
+        assert peak_growth_kb < 64 * 1024, f"RSS grew by {peak_growth_kb} KB with chunk size {EXPORT_CHUNK_SIZE}"
+
+
+class TestBulkExpenses:
+    def create_budget(self, headers, franchise_id):
+        r = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2025-04", "planned_amount": 1000}, headers=headers)
+        assert r.status_code == 200
+        return r.json()["id"]
+
+    def test_bulk_json_reports_bad_rows_and_updates_budget_once(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        budget_id = self.create_budget(headers, franchise_id)
+        rows = [
+            {"franchise_id": franchise_id, "budget_id": budget_id, "date": "2025-04-01", "category": "Rent", "amount": 100.10},
+            {"franchise_id": franchise_id, "budget_id": budget_id, "date": "not-a-date", "category": "Rent", "amount": 5},
+            {"franchise_id": franchise_id, "budget_id": 99999999, "date": "2025-04-02", "category": "Rent", "amount": 5},
+            {"franchise_id": franchise_id, "budget_id": budget_id, "date": "2025-04-03", "category": "Ads", "amount": 49.90},
+        ]
+        r = client.post("/expenses/bulk", json=rows, headers=headers)
+        assert r.status_code == 200
+        body = r.json()
+        assert body["inserted"] == 2
+        assert [e["index"] for e in body["errors"]] == [1, 2]
+        assert client.get(f"/budgets/{budget_id}", headers=headers).json()["actual_amount"] == 150.0
+
+    def test_bulk_ndjson(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        lines = [
+            json.dumps({"franchise_id": franchise_id, "date": "2025-04-01", "category": "Rent", "amount": 1}),
+            "{broken",
+            json.dumps({"franchise_id": franchise_id, "date": "2025-04-02", "category": "Rent", "amount": 2}),
+        ]
+        r = client.post(
+            "/expenses/bulk",
+            content="\n".join(lines),
+            headers={**headers, "Content-Type": "application/x-ndjson"},
+        )
+        assert r.json()["inserted"] == 2
+        assert r.json()["errors"][0]["index"] == 1
+        listed = client.get("/expenses", params={"franchise_id": franchise_id}, headers=headers).json()
+        assert len(listed) == 2
+
+
+class TestConcurrentExpenses:
+    def test_parallel_posts_keep_actuals_exact(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from app.rollups import find_drift
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        budget_id = client.post(
+            "/budgets", json={"franchise_id": franchise_id, "period": "2025-09", "planned_amount": 0}, headers=headers
+        ).json()["id"]
+        expense = {"franchise_id": franchise_id, "budget_id": budget_id, "date": "2025-09-01", "category": "Ops", "amount": 1.25}
+
+        def post(_):
+            return client.post("/expenses", json=expense, headers=headers).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(post, range(200)))
+        assert statuses == [200] * 200
+
+        assert client.get(f"/budgets/{budget_id}", headers=headers).json()["actual_amount"] == 250.0
+        total = client.get("/budgets/rollup", params={"franchise_id": franchise_id, "period": "2025-09"}, headers=headers)
+        assert total.json()["actual"] == 250.0
+        db = SessionLocal()
+        try:
+            assert [d for d in find_drift(db) if d["key"][0] == franchise_id] == []
+        finally:
+            db.close()
+
+
+class TestExpenseAggregate:
+    def test_groups_by_time_bucket_and_category(self):
+        headers = auth_header()
+        first = create_test_franchise(headers)
+        second = create_test_franchise(headers)
+        rows = [
+            (first, "2025-03-03", "Ads", 10), (first, "2025-03-20", "Ads", 5),
+            (first, "2025-04-01", "Rent", 100), (second, "2025-03-10", "Ads", 7),
+            (second, "2026-01-01", "Ads", 1000),
+        ]
+        for franchise_id, day, category, amount in rows:
+            client.post("/expenses", json={"franchise_id": franchise_id, "date": day, "category": category, "amount": amount}, headers=headers)
+
+        response = client.get(
+            "/expenses/aggregate",
+            params={"group_by": "category,month", "franchise_id": [first, second], "from": "2025-01-01", "to": "2025-12-31"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert body["group_by"] == ["category", "month"]
+        assert body["rows"] == 2
+        assert body["columns"] == {
+            "category": ["Ads", "Rent"],
+            "month": ["2025-03", "2025-04"],
+            "count": [3, 1],
+            "total": [22.0, 100.0],
+        }
+
+        weekly = client.get("/expenses/aggregate", params={"group_by": "week", "franchise_id": first}, headers=headers).json()
+        assert weekly["columns"]["week"] == ["2025-03-03", "2025-03-17", "2025-03-31"]
+
+        overall = client.get("/expenses/aggregate", params={"franchise_id": second}, headers=headers).json()
+        assert overall["columns"] == {"count": [2], "total": [1007.0]}
+
+    def test_daily_rollup_follows_every_write_path(self):
+        from app.rollups import find_drift
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        budget_id = client.post(
+            "/budgets", json={"franchise_id": franchise_id, "period": "2025-06", "planned_amount": 100}, headers=headers
+        ).json()["id"]
+        expense = {"franchise_id": franchise_id, "budget_id": budget_id, "date": "2025-06-02", "category": "Ads", "amount": 4}
+        first = client.post("/expenses", json=expense, headers=headers).json()["id"]
+        client.post("/expenses/bulk", json=[expense, {**expense, "category": "Rent"}], headers=headers)
+        client.delete(f"/expenses/{first}", headers=headers)
+
+        params = {"group_by": "category", "franchise_id": franchise_id}
+        daily = client.get("/expenses/aggregate", params=params, headers=headers).json()
+        by_budget = client.get("/expenses/aggregate", params={**params, "budget_id": budget_id}, headers=headers).json()
+        assert daily["columns"] == by_budget["columns"] == {"category": ["Ads", "Rent"], "count": [1, 1], "total": [4.0, 4.0]}
+
+        client.delete(f"/budgets/{budget_id}", headers=headers)
+        emptied = client.get("/expenses/aggregate", params=params, headers=headers).json()
+        assert emptied["rows"] == 0
+        db = SessionLocal()
+        try:
+            assert [d for d in find_drift(db) if d["key"][0] == franchise_id] == []
+        finally:
+            db.close()
+
+    def test_rejects_unknown_group_keys(self):
+        headers = auth_header()
+        assert client.get("/expenses/aggregate", params={"group_by": "hour"}, headers=headers).status_code == 400
+        assert client.get("/expenses/aggregate", params={"from": "2025-02-01", "to": "2025-01-01"}, headers=headers).status_code == 400
+
+
+class TestSearch:
+    def test_folds_turkish_case_and_accents(self):
+        from app.search import normalize
+
+        assert normalize("İSTANBUL Çankaya-Şubesi") == "istanbul cankaya subesi"
+        assert normalize("ıĞÖÜ") == normalize("IGOU") == "igou"
+
+    def test_finds_franchises_and_branches_as_they_change(self):
+        headers = auth_header()
+        tag = uuid.uuid4().hex[:8]
+        franchise = client.post(
+            "/franchises", json={"name": f"İstanbul Kebap {tag}", "tax_number": f"TR{tag}"}, headers=headers
+        ).json()
+        branch = client.post(
+            "/branches", json={"name": f"Çankaya Şubesi {tag}", "city": "Ankara", "franchise_id": franchise["id"]}, headers=headers
+        ).json()
+
+        hits = client.get("/search", params={"q": f"istanbul {tag}"}, headers=headers).json()
+        assert [(h["kind"], h["id"]) for h in hits] == [("franchise", franchise["id"])]
+        hits = client.get("/search", params={"q": f"CANKAYA {tag}"}, headers=headers).json()
+        assert hits == [{
+            "kind": "branch", "id": branch["id"], "franchise_id": franchise["id"],
+            "title": f"Çankaya Şubesi {tag}", "subtitle": "Ankara",
+        }]
+        assert client.get("/search", params={"q": f"tr{tag}", "kind": "branch"}, headers=headers).json() == []
+        listed = client.get("/franchises", params={"search": f"ıstanbul kebap {tag}"}, headers=headers).json()
+        assert [f["id"] for f in listed] == [franchise["id"]]
+
+        client.put(f"/franchises/{franchise['id']}", json={"name": f"Ege Döner {tag}"}, headers=headers)
+        client.delete(f"/branches/{branch['id']}", headers=headers)
+        assert client.get("/search", params={"q": f"istanbul {tag}"}, headers=headers).json() == []
+        assert client.get("/search", params={"q": f"cankaya {tag}"}, headers=headers).json() == []
+        hits = client.get("/search", params={"q": f"doner {tag}"}, headers=headers).json()
+        assert [h["title"] for h in hits] == [f"Ege Döner {tag}"]
+
+        client.delete(f"/franchises/{franchise['id']}", headers=headers)
+        assert client.get("/search", params={"q": tag}, headers=headers).json() == []
+
+    def test_ranks_prefix_matches_first_and_handles_short_queries(self):
+        headers = auth_header()
+        tag = uuid.uuid4().hex[:8]
+        inner = client.post("/franchises", json={"name": f"Zeytin Ölçü {tag}", "tax_number": f"A{tag}"}, headers=headers).json()["id"]
+        leading = client.post("/franchises", json={"name": f"Ölçü Zeytin {tag}", "tax_number": f"B{tag}"}, headers=headers).json()["id"]
+
+        hits = client.get("/search", params={"q": f"olcu {tag}"}, headers=headers).json()
+        assert [h["id"] for h in hits] == [leading, inner]
+        short = client.get("/search", params={"q": "öl", "limit": 50}, headers=headers).json()
+        assert leading in [h["id"] for h in short]
+        assert inner not in [h["id"] for h in short]
+        assert client.get("/search", params={"q": "x", "kind": "city"}, headers=headers).status_code == 400
+
+
+class TestSnapshots:
+    def test_snapshot_answers_like_the_database(self, tmp_path, monkeypatch):
+        pytest.importorskip("pyarrow")
+        from app import snapshots
+
+        monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", tmp_path / "snapshots")
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        expense = {"franchise_id": franchise_id, "date": "2025-07-04", "category": "Ads", "amount": 12.5}
+        first = client.post("/expenses", json=expense, headers=headers).json()["id"]
+        client.post("/expenses", json={**expense, "date": "2025-08-01", "category": "Rent"}, headers=headers)
+
+        params = {"group_by": "category,month", "franchise_id": franchise_id}
+        assert client.get("/expenses/aggregate", params={**params, "source": "snapshot"}, headers=headers).status_code == 503
+        snapshots.export_snapshot()
+        live = client.get("/expenses/aggregate", params=params, headers=headers).json()
+        snap = client.get("/expenses/aggregate", params={**params, "source": "snapshot"}, headers=headers).json()
+        assert snap["as_of"] is not None
+        assert snap["columns"] == live["columns"]
+        assert list((tmp_path / "snapshots" / "expenses").glob(f"franchise_id={franchise_id}/period=2025-07/*.parquet"))
+
+        # incremental runs append new expenses; deletes wait for a full rebuild
+        client.post("/expenses", json=expense, headers=headers)
+        client.delete(f"/expenses/{first}", headers=headers)
+        assert snapshots.snapshot_lag() == 1
+        assert snapshots.export_snapshot()["expenses"] == 1
+        query = {"group_by": "category", "franchise_id": franchise_id, "source": "snapshot"}
+        assert client.get("/expenses/aggregate", params=query, headers=headers).json()["columns"]["count"] == [2, 1]
+        snapshots.export_snapshot(full=True)
+        assert client.get("/expenses/aggregate", params=query, headers=headers).json()["columns"]["count"] == [1, 1]
+
+
+class TestRollups:
+    def test_rollup_tracks_budget_and_expense_writes(self):
+        from app.rollups import find_drift
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        branch_id = client.post("/branches", json={"name": "Merkez", "city": "Bursa", "franchise_id": franchise_id}, headers=headers).json()["id"]
+        branch_budget = client.post(
+            "/budgets", json={"franchise_id": franchise_id, "branch_id": branch_id, "period": "2025-05", "planned_amount": 300}, headers=headers
+        ).json()["id"]
+        franchise_budget = client.post(
+            "/budgets", json={"franchise_id": franchise_id, "period": "2025-05", "planned_amount": 200}, headers=headers
+        ).json()["id"]
+        client.post(f"/budgets/{branch_budget}/approve", headers=headers)
+        client.put(f"/budgets/{franchise_budget}", json={"planned_amount": 250}, headers=headers)
+        expense_id = client.post(
+            "/expenses", json={"franchise_id": franchise_id, "budget_id": branch_budget, "date": "2025-05-02", "category": "Ads", "amount": 40}, headers=headers
+        ).json()["id"]
+        client.post("/expenses", json={"franchise_id": franchise_id, "budget_id": branch_budget, "date": "2025-05-03", "category": "Ads", "amount": 10}, headers=headers)
+        client.delete(f"/expenses/{expense_id}", headers=headers)
+
+        total = client.get("/budgets/rollup", params={"franchise_id": franchise_id, "period": "2025-05"}, headers=headers)
+        assert total.status_code == 200
+        assert total.json()["planned"] == 550.0
+        assert total.json()["approved"] == 300.0
+        assert total.json()["actual"] == 10.0
+        branch = client.get("/budgets/rollup", params={"franchise_id": franchise_id, "period": "2025-05", "branch_id": branch_id}, headers=headers)
+        assert branch.json()["planned"] == 300.0
+
+        client.delete(f"/budgets/{branch_budget}", headers=headers)
+        total = client.get("/budgets/rollup", params={"franchise_id": franchise_id, "period": "2025-05"}, headers=headers)
+        assert total.json()["planned"] == 250.0
+        assert total.json()["actual"] == 0.0
+
+        db = SessionLocal()
+        try:
+            assert [d for d in find_drift(db) if d["key"][0] == franchise_id] == []
+        finally:
+            db.close()
+
+
+class TestBudgetSummaryBatch:
+    def test_summarizes_ids_and_scope_in_one_call(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        over = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2020-01", "planned_amount": 100}, headers=headers).json()["id"]
+        under = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2020-02", "planned_amount": 0}, headers=headers).json()["id"]
+        future = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2999-01", "planned_amount": 50}, headers=headers).json()["id"]
+        client.post("/expenses", json={"franchise_id": franchise_id, "budget_id": over, "date": "2020-01-05", "category": "Ads", "amount": 120.5}, headers=headers)
+        client.post(f"/budgets/{under}/approve", headers=headers)
+
+        response = client.post("/budgets/summary:batch", json={"ids": [future, over, under, 999999]}, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["rows"] == 3
+        assert body["missing"] == [999999]
+        columns = body["columns"]
+        assert columns["id"] == [over, under, future]
+        assert columns["status"] == ["draft", "approved", "draft"]
+        # as GET /budgets/{id}/summary reports it
+        assert columns["approved"] == [0.0, 0.0, 0.0]
+        assert columns["approved"] == [client.get(f"/budgets/{i}/summary", headers=headers).json()["approved"] for i in columns["id"]]
+        assert columns["variance"] == [20.5, 0.0, -50.0]
+        assert columns["burn_rate"] == [1.205, None, 0.0]
+        assert columns["over_budget"] == [True, False, False]
+        assert columns["projected"] == [120.5, 0.0, 0.0]
+
+        scoped = client.post(
+            "/budgets/summary:batch",
+            json={"franchise_id": [franchise_id], "period_from": "2020-01", "period_to": "2020-12"},
+            headers=headers,
+        ).json()
+        assert scoped["columns"]["id"] == [over, under]
+        assert scoped["missing"] == []
+
+    def test_invalid_stored_period_only_affects_its_row(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        # the create schema only checks the digits
+        bad = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2024-13", "planned_amount": 10}, headers=headers).json()["id"]
+        good = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2020-03", "planned_amount": 10}, headers=headers).json()["id"]
+
+        response = client.post("/budgets/summary:batch", json={"franchise_id": [franchise_id]}, headers=headers)
+        assert response.status_code == 200
+        columns = response.json()["columns"]
+        assert columns["id"] == [bad, good]
+        assert columns["projected"] == [None, 0.0]
+        assert columns["projected_over_budget"] == [False, False]
+        assert client.get(f"/budgets/{bad}/summary", headers=headers).status_code == 200
+
+    def test_projects_current_period_from_elapsed_days(self):
+        from datetime import date
+        from app.summaries import elapsed_fraction, summarize_budgets
+
+        assert elapsed_fraction("2025-04", date(2025, 4, 10)) == 10 / 30
+        assert elapsed_fraction("2025-03", date(2025, 4, 10)) == 1.0
+        assert elapsed_fraction("2025-05", date(2025, 4, 10)) == 0.0
+        assert elapsed_fraction("2024-13", date(2025, 4, 10)) is None
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        budget_id = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2021-04", "planned_amount": 100}, headers=headers).json()["id"]
+        client.post("/expenses", json={"franchise_id": franchise_id, "budget_id": budget_id, "date": "2021-04-02", "category": "Ads", "amount": 40}, headers=headers)
+        db = SessionLocal()
+        try:
+            summary = summarize_budgets(db, ids=[budget_id], today=date(2021, 4, 10))
+        finally:
+            db.close()
+        assert summary["columns"]["projected"] == [120.0]
+        assert summary["columns"]["projected_over_budget"] == [True]
+        assert summary["columns"]["over_budget"] == [False]
+        assert summary["as_of"] == "2021-04-10"
+
+    def test_rejects_missing_scope(self):
+        headers = auth_header()
+        assert client.post("/budgets/summary:batch", json={}, headers=headers).status_code == 422
+        assert client.post(
+            "/budgets/summary:batch", json={"franchise_id": [1], "period_from": "2025-06", "period_to": "2025-01"}, headers=headers
+        ).status_code == 422
+
+
+class TestBudgetTransitions:
+    def test_approves_a_period_and_reports_each_budget(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        branch_id, other_branch = (
+            client.post("/branches", json={"name": f"Şube {i}", "city": "Bursa", "franchise_id": franchise_id}, headers=headers).json()["id"]
+            for i in range(2)
+        )
+
+        def budget(planned, branch=None):
+            body = {"franchise_id": franchise_id, "branch_id": branch, "period": "2025-09", "planned_amount": planned}
+            return client.post("/budgets", json=body, headers=headers).json()["id"]
+
+        draft, preset, rejected = budget(100, branch_id), budget(40), budget(10, other_branch)
+        client.put(f"/budgets/{preset}", json={"approved_amount": 30}, headers=headers)
+        client.post(f"/budgets/{rejected}/reject", headers=headers)
+        client.get(f"/budgets/{draft}/summary", headers=headers)  # cached before the change
+
+        response = client.post("/budgets:transition", json={"target": "approved", "franchise_id": franchise_id, "period": "2025-09"}, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["counts"] == {"applied": 2, "unchanged": 0, "not_allowed": 1}
+        assert body["columns"] == {
+            "id": [draft, preset, rejected],
+            "previous_status": ["draft", "draft", "rejected"],
+            "outcome": ["applied", "applied", "not_allowed"],
+        }
+        assert client.get(f"/budgets/{draft}", headers=headers).json()["approved_amount"] == 100
+        assert client.get(f"/budgets/{preset}", headers=headers).json()["approved_amount"] == 30
+        assert client.get(f"/budgets/{draft}/summary", headers=headers).json()["status"] == "approved"
+        assert client.get(f"/budgets/rollup?franchise_id={franchise_id}&period=2025-09", headers=headers).json()["approved"] == 130
+        assert client.get(f"/budgets/rollup?franchise_id={franchise_id}&period=2025-09&branch_id={branch_id}", headers=headers).json()["approved"] == 100
+
+        again = client.post("/budgets:transition", json={"target": "closed", "ids": [draft, rejected, 999999]}, headers=headers).json()
+        assert again["columns"]["outcome"] == ["applied", "not_allowed"]
+        assert again["missing"] == [999999]
+        filtered = client.post(
+            "/budgets:transition", json={"target": "draft", "franchise_id": franchise_id, "status": "rejected"}, headers=headers
+        ).json()
+        assert filtered["columns"]["id"] == [rejected] and filtered["counts"]["applied"] == 1
+
+    def test_rejects_unscoped_and_oversized_calls(self, monkeypatch):
+        from app import workflow
+
+        headers = auth_header()
+        assert client.post("/budgets:transition", json={"target": "approved"}, headers=headers).status_code == 422
+        assert client.post("/budgets:transition", json={"target": "archived", "ids": [1]}, headers=headers).status_code == 422
+        monkeypatch.setattr(workflow, "TRANSITION_BATCH_MAX", 1)
+        assert client.post("/budgets:transition", json={"target": "approved", "ids": [1, 2]}, headers=headers).status_code == 400
+
+
+class TestPeriodClosing:
+    def test_closes_and_archives_past_months_transparently(self):
+        from datetime import date
+        from app.models import Expense, ExpenseArchive
+        from app.periods import close_periods
+        from app.rollups import find_drift
+
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+
+        def budget(period):
+            return client.post("/budgets", json={"franchise_id": franchise_id, "period": period, "planned_amount": 100}, headers=headers).json()["id"]
+
+        def expense(budget_id, day, amount):
+            body = {"franchise_id": franchise_id, "budget_id": budget_id, "date": day, "category": "Ops", "amount": amount}
+            return client.post("/expenses", json=body, headers=headers)
+
+        january, february, march = budget("2019-01"), budget("2019-02"), budget("2019-03")
+        client.post(f"/budgets/{january}/approve", headers=headers)
+        archived = [expense(january, "2019-01-10", 20).json()["id"], expense(january, "2019-01-12", 5).json()["id"],
+                    expense(february, "2019-02-03", 7).json()["id"]]
+        expense(march, "2019-03-05", 9)
+
+        scope = {"franchise_id": franchise_id}
+        by_budget = {"group_by": "budget,month", "franchise_id": franchise_id}
+        before = client.get("/expenses", params=scope, headers=headers).json()
+        totals = client.get("/expenses/aggregate", params=by_budget, headers=headers).json()
+        rollup = client.get("/budgets/rollup", params={**scope, "period": "2019-01"}, headers=headers).json()
+
+        db = SessionLocal()
+        try:
+            today = date(2019, 3, 20)
+            assert close_periods(db, today, grace_days=15, dry_run=True) == {
+                "periods": ["2019-01", "2019-02"], "budgets_closed": 1, "expenses_archived": 3,
+            }
+            assert close_periods(db, today, grace_days=15) == {
+                "periods": ["2019-01", "2019-02"], "budgets_closed": 1, "expenses_archived": 3,
+            }
+            assert db.query(Expense).filter(Expense.id.in_(archived)).count() == 0
+            assert db.query(ExpenseArchive).filter(ExpenseArchive.id.in_(archived)).count() == 3
+            assert close_periods(db, today, grace_days=15)["periods"] == []
+            assert [d for d in find_drift(db) if d["key"][0] == franchise_id] == []
+        finally:
+            db.close()
+
+        # reads see archived expenses where they were
+        assert client.get("/expenses", params=scope, headers=headers).json() == before
+        walked, cursor = [], None
+        while True:
+            page = client.get("/expenses", params={**scope, "limit": 1, **({"cursor": cursor} if cursor else {})}, headers=headers)
+            walked += page.json()
+            cursor = page.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert walked == before
+        assert client.get("/expenses", params={**scope, "skip": 2, "limit": 2}, headers=headers).json() == before[2:]
+        assert client.get(f"/expenses/{archived[0]}", params={"expand": "budget"}, headers=headers).json()["budget"]["status"] == "closed"
+        assert client.get("/expenses/aggregate", params=by_budget, headers=headers).json() == totals
+        assert client.get("/budgets/rollup", params={**scope, "period": "2019-01"}, headers=headers).json() == rollup
+        exported = client.get("/expenses/export", params=scope, headers=headers).text.splitlines()
+        assert [json.loads(line)["id"] for line in exported] == [e["id"] for e in before]
+
+        # closed months are frozen
+        assert client.delete(f"/expenses/{archived[0]}", headers=headers).status_code == 409
+        assert expense(None, "2019-02-10", 1).status_code == 409
+        assert expense(february, "2019-03-10", 1).status_code == 409
+        assert client.put(f"/budgets/{february}", json={"planned_amount": 1}, headers=headers).status_code == 409
+        assert client.post(f"/budgets/{february}/approve", headers=headers).status_code == 409
+        assert client.delete(f"/budgets/{january}", headers=headers).status_code == 409
+        transition = client.post("/budgets:transition", json={"target": "approved", "ids": [february]}, headers=headers).json()
+        assert transition["columns"]["outcome"] == ["not_allowed"]
+        bulk = [{"franchise_id": franchise_id, "date": day, "category": "Ops", "amount": 1} for day in ("2019-02-28", "2019-03-01")]
+        result = client.post("/expenses/bulk", json=bulk, headers=headers).json()
+        assert result["inserted"] == 1 and result["errors"] == [{"index": 0, "detail": "Period 2019-02 is closed"}]
+        assert expense(march, "2019-03-11", 1).status_code == 200
+
+
+class TestChangeFeed:
+    @pytest.fixture(autouse=True)
+    def short_streams(self, monkeypatch):
+        from app import changes
+        monkeypatch.setattr(changes, "EVENTS_MAX_STREAM_SECONDS", 0.3)
+
+    def events(self, headers, last_event_id=None, **params):
+        if last_event_id is not None:
+            headers = {**headers, "Last-Event-ID": str(last_event_id)}
+        response = client.get("/events", params=params, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        frames = []
+        for block in response.text.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+            if fields:
+                frames.append((fields["event"], int(fields["id"]), json.loads(fields["data"])))
+        return frames
+
+    def test_replays_missed_changes_of_one_franchise(self):
+        headers = auth_header()
+        [(kind, start, _)] = self.events(headers)
+        assert kind == "ready"
+
+        franchise_id = create_test_franchise(headers)
+        other = create_test_franchise(headers)
+        budget = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2030-01", "planned_amount": 100}, headers=headers).json()
+        client.post(f"/budgets/{budget['id']}/approve", headers=headers)
+        body = {"franchise_id": franchise_id, "budget_id": budget["id"], "date": "2030-01-05", "category": "Ops", "amount": 12.5}
+        expense_id = client.post("/expenses", json=body, headers=headers).json()["id"]
+        client.delete(f"/expenses/{expense_id}", headers=headers)
+        client.post("/budgets:transition", json={"target": "closed", "ids": [budget["id"]]}, headers=headers)
+        client.put(f"/franchises/{other}", json={"name": "Renamed"}, headers=headers)
+
+        frames = self.events(headers, start, franchise_id=franchise_id)
+        changes = [data for kind, _, data in frames if kind == "change"]
+        assert [(c["entity"], c["op"], c["id"]) for c in changes] == [
+            ("franchise", "created", franchise_id),
+            ("budget", "created", budget["id"]),
+            ("budget", "updated", budget["id"]),
+            ("expense", "created", expense_id),
+            ("expense", "deleted", expense_id),
+            ("budget", "updated", budget["id"]),
+        ]
+        assert [c["seq"] for c in changes] == sorted(c["seq"] for c in changes)
+        assert changes[2]["data"]["status"] == "approved" and changes[2]["data"]["approved_amount"] == 100
+        assert changes[3]["data"]["amount"] == 12.5 and changes[4]["data"] is None
+        assert changes[5]["data"]["status"] == "closed"
+        assert frames[-1][0] == "ready" and frames[-1][1] >= changes[-1]["seq"]
+
+        everything = self.events(headers, start)
+        assert ("franchise", "updated", other) in [(d["entity"], d["op"], d["id"]) for k, _, d in everything if k == "change"]
+        # resuming from the end replays nothing
+        assert [kind for kind, _, _ in self.events(headers, frames[-1][1], franchise_id=franchise_id)] == ["ready"]
+
+    def test_streams_changes_as_they_commit(self, monkeypatch):
+        import threading
+        import time
+        from app import changes
+        monkeypatch.setattr(changes, "EVENTS_MAX_STREAM_SECONDS", 1.5)
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        received = []
+        stream = threading.Thread(target=lambda: received.extend(self.events(headers, franchise_id=franchise_id)))
+        stream.start()
+        time.sleep(0.5)
+        branch = client.post("/branches", json={"franchise_id": franchise_id, "name": "Live", "city": "Izmir"}, headers=headers).json()
+        rows = [{"franchise_id": franchise_id, "date": "2030-02-01", "category": "Ops", "amount": amount} for amount in (1, 2)]
+        client.post("/expenses/bulk", json=rows, headers=headers)
+        stream.join()
+
+        assert received[0][0] == "ready"
+        live = [data for kind, _, data in received[1:] if kind == "change"]
+        assert [(c["entity"], c["op"]) for c in live] == [("branch", "created"), ("expense", "created"), ("expense", "created")]
+        assert live[0]["id"] == branch["id"] and live[0]["data"]["city"] == "Izmir"
+        assert [c["data"]["amount"] for c in live[1:]] == [1, 2]
+
+    def test_reset_when_missed_changes_were_pruned(self):
+        from app.changes import prune_changes
+        headers = auth_header()
+        [(_, start, _)] = self.events(headers)
+        create_test_franchise(headers)
+        create_test_franchise(headers)
+        assert prune_changes(retention_hours=0) >= 1
+        [(kind, seq, _)] = self.events(headers, start)
+        assert kind == "reset" and seq > start
+        # an id from the future can't be resumed either
+        assert self.events(headers, seq + 1000)[0][0] == "reset"
+
+
+class TestIdempotency:
+    def setup_method(self):
+        self.headers = auth_header()
+        self.franchise_id = create_test_franchise(self.headers)
+        budget = {"franchise_id": self.franchise_id, "period": "2031-01", "planned_amount": 100}
+        self.budget_id = client.post("/budgets", json=budget, headers=self.headers).json()["id"]
+        self.expense = {"franchise_id": self.franchise_id, "budget_id": self.budget_id, "date": "2031-01-10", "category": "POS", "amount": 12.5}
+
+    def post_expense(self, key, body=None):
+        return client.post("/expenses", json=body or self.expense, headers={**self.headers, "Idempotency-Key": key})
+
+    def actual(self):
+        return client.get(f"/budgets/{self.budget_id}", headers=self.headers).json()["actual_amount"]
+
+    def test_retry_replays_the_first_response(self):
+        from app.idempotency import _recent
+
+        first = self.post_expense("retry-1")
+        assert first.status_code == 200 and "Idempotent-Replayed" not in first.headers
+        with assert_max_queries(0):
+            retry = self.post_expense("retry-1")
+        assert retry.status_code == 200 and retry.headers["Idempotent-Replayed"] == "true"
+        assert retry.json() == first.json()
+        # from the table once the in-process entry is gone
+        _recent.clear()
+        assert self.post_expense("retry-1").json() == first.json()
+        assert self.actual() == 12.5
+        listed = client.get("/expenses", params={"budget_id": self.budget_id}, headers=self.headers).json()
+        assert [e["id"] for e in listed] == [first.json()["id"]]
+
+        assert self.post_expense("retry-1", {**self.expense, "amount": 99}).status_code == 422
+        # requests without a key are never deduplicated
+        assert self.post_expense("retry-2").json()["id"] != first.json()["id"]
+        client.post("/expenses", json=self.expense, headers=self.headers)
+        assert self.actual() == 37.5
+        # keys are scoped to the route
+        budget = {"franchise_id": self.franchise_id, "period": "2031-02", "planned_amount": 5}
+        created = client.post("/budgets", json=budget, headers={**self.headers, "Idempotency-Key": "retry-1"})
+        replayed = client.post("/budgets", json=budget, headers={**self.headers, "Idempotency-Key": "retry-1"})
+        assert created.json()["period"] == "2031-02" and replayed.json() == created.json()
+
+    def test_bulk_retry_and_expired_keys(self):
+        from datetime import datetime, timedelta
+        from sqlalchemy import update
+        from app.idempotency import _recent
+        from app.models import IdempotencyKey
+
+        rows = [self.expense, {**self.expense, "amount": 7.5}]
+        headers = {**self.headers, "Idempotency-Key": "bulk-1"}
+        first = client.post("/expenses/bulk", json=rows, headers=headers)
+        retry = client.post("/expenses/bulk", json=rows, headers=headers)
+        assert first.json() == retry.json() == {"inserted": 2, "errors": []}
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert self.actual() == 20
+
+        # an expired key is forgotten and taken over by the next request
+        expense = self.post_expense("expired-1").json()
+        _recent.clear()
+        with engine.begin() as conn:
+            conn.execute(update(IdempotencyKey).values(created_at=datetime.utcnow() - timedelta(days=2)))
+        again = self.post_expense("expired-1")
+        assert "Idempotent-Replayed" not in again.headers and again.json()["id"] != expense["id"]
+        assert self.post_expense("expired-1").json() == again.json()
+
+    def test_concurrent_duplicate_rolls_back_and_replays(self):
+        from datetime import date
+        from app.idempotency import IdempotentRequest
+        from app.models import Expense
+        from app.schemas.budget import ExpenseResponse
+
+        def expense(note):
+            return Expense(franchise_id=self.franchise_id, date=date(2031, 1, 11), category="POS", amount=1, note=note)
+
+        key = uuid.uuid4().hex
+        loser, winner = SessionLocal(), SessionLocal()
+        try:
+            # both requests find no stored response, then race to commit
+            assert IdempotentRequest(key, "body").replay(loser) is None
+            assert IdempotentRequest(key, "body").replay(winner) is None
+            won = expense("winner")
+            winner.add(won)
+            assert IdempotentRequest(key, "body").commit(winner, ExpenseResponse, won) is None
+
+            lost = expense("loser")
+            loser.add(lost)
+            replayed = IdempotentRequest(key, "body").commit(loser, ExpenseResponse, lost)
+            assert json.loads(replayed.body)["note"] == "winner"
+            assert loser.query(Expense).filter(Expense.note == "loser").count() == 0
+        finally:
+            loser.close()
+            winner.close()
+
+    def test_budget_create_race_replays_the_winner(self, monkeypatch):
+        from app.idempotency import IdempotentRequest
+        from app.models import Budget
+        from app.routes import budget as budget_routes
+        from app.schemas.budget import BudgetCreate, BudgetResponse
+
+        branch_id = client.post(
+            "/branches", json={"name": "Yarış", "city": "Izmir", "franchise_id": self.franchise_id}, headers=self.headers
+        ).json()["id"]
+
+        def race(period, loser):
+            """Create the budget from `loser` while the same-key winner commits first at `loser`'s next step."""
+            key = uuid.uuid4().hex
+            payload = BudgetCreate(franchise_id=self.franchise_id, branch_id=branch_id, period=period, planned_amount=5)
+
+            def win(*_):
+                with SessionLocal() as winner:
+                    won = Budget(**payload.model_dump())
+                    winner.add(won)
+                    IdempotentRequest(key, "body").commit(winner, BudgetResponse, won)
+                    return won.id
+
+            return win, lambda: budget_routes.create_budget(payload, loser, None, IdempotentRequest(key, "body"))
+
+        # the winner commits before the loser's existence check
+        with SessionLocal() as loser:
+            win, create = race("2031-03", loser)
+            winner_id = []
+            monkeypatch.setattr(budget_routes, "ensure_open", lambda *_: winner_id.append(win()))
+            replayed = create()
+            assert replayed.headers["Idempotent-Replayed"] == "true"
+            assert json.loads(replayed.body)["id"] == winner_id[0]
+        monkeypatch.undo()
+
+        # the winner commits after the check, so the loser's insert hits the unique constraint
+        with SessionLocal() as loser:
+            win, create = race("2031-04", loser)
+            event.listen(loser, "before_flush", win, once=True)
+            replayed = create()
+            assert replayed.headers["Idempotent-Replayed"] == "true"
+            assert json.loads(replayed.body)["period"] == "2031-04"
+            assert loser.query(Budget).filter(Budget.period == "2031-04").count() == 1
+
+
+class TestResponseCache:
+    def test_stats_hit_etag_and_invalidation(self):
+        from app.cache import response_cache
+
+        headers = auth_header()
+        create_test_franchise(headers)
+        first = client.get("/franchises/stats", headers=headers)
+        hits = response_cache.hits
+        second = client.get("/franchises/stats", headers=headers)
+        assert response_cache.hits == hits + 1
+        assert second.json() == first.json()
+
+        etag = second.headers["ETag"]
+        not_modified = client.get("/franchises/stats", headers={**headers, "If-None-Match": etag})
+        assert not_modified.status_code == 304
+
+        create_test_franchise(headers)
+        after = client.get("/franchises/stats", headers={**headers, "If-None-Match": etag})
+        assert after.status_code == 200
+        assert after.json()["total_franchises"] == first.json()["total_franchises"] + 1
+
+    def test_budget_summary_invalidated_by_expense(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        budget_id = client.post("/budgets", json={"franchise_id": franchise_id, "period": "2025-06", "planned_amount": 100}, headers=headers).json()["id"]
+        assert client.get(f"/budgets/{budget_id}/summary", headers=headers).json()["actual"] == 0.0
+        client.post("/expenses", json={"franchise_id": franchise_id, "budget_id": budget_id, "date": "2025-06-01", "category": "Ads", "amount": 25}, headers=headers)
+        assert client.get(f"/budgets/{budget_id}/summary", headers=headers).json()["actual"] == 25.0
+
+    def test_branch_list_keeps_cursor_header_on_hit(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        for i in range(3):
+            client.post("/branches", json={"name": f"Şube {i}", "city": "Konya", "franchise_id": franchise_id}, headers=headers)
+        params = {"franchise_id": franchise_id, "limit": 2}
+        miss = client.get("/branches", params=params, headers=headers)
+        hit = client.get("/branches", params=params, headers=headers)
+        assert hit.headers["X-Next-Cursor"] == miss.headers["X-Next-Cursor"]
+        assert hit.json() == miss.json()
+
+    def test_memory_backend_off_with_several_workers(self):
+        from app.cache import MemoryCache, build_backend
+
+        assert isinstance(build_backend("memory", workers=1), MemoryCache)
+        assert build_backend("memory", workers=4) is None
+        assert build_backend("none", workers=1) is None
+
+
+class TestAsyncRoutes:
+    def test_async_router_serves_same_data(self):
+        from fastapi import FastAPI
+        from app.routes import franchise_router, budget_router
+        from app.routes.async_support import to_async_router
+
+        async_app = FastAPI()
+        async_app.include_router(to_async_router(franchise_router))
+        async_app.include_router(to_async_router(budget_router))
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+
+        with TestClient(async_app) as async_client:
+            r = async_client.get(f"/franchises/{franchise_id}", headers=headers)
+            assert r.status_code == 200
+            assert r.json() == client.get(f"/franchises/{franchise_id}", headers=headers).json()
+
+            created = async_client.post("/budgets", json={"franchise_id": franchise_id, "period": "2025-07", "planned_amount": 10}, headers=headers)
+            assert created.status_code == 200
+            detail = client.get(f"/budgets/{created.json()['id']}", headers=headers).json()
+            assert detail["period"] == "2025-07"
+            # response_model_exclude_unset carries over: no null relationships without expand=
+            assert async_client.get(f"/budgets/{created.json()['id']}", headers=headers).json() == detail
+            assert "franchise" not in detail
+            assert async_client.get("/franchises/999999", headers=headers).status_code == 404
+
+    def test_blocking_calls_leave_the_event_loop(self):
+        import asyncio
+        import threading
+        import time
+        from app.database.database import get_async_sessionmaker, run_blocking
+
+        def slow_call():
+            time.sleep(0.2)
+            return threading.get_ident()
+
+        async def handler_with_other_traffic():
+            ticks = 0
+
+            async def other_request():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.create_task(other_request())
+            async with get_async_sessionmaker()() as db:
+                thread = await db.run_sync(lambda session: run_blocking(slow_call))
+            ticker.cancel()
+            return thread, ticks
+
+        thread, ticks = asyncio.run(handler_with_other_traffic())
+        assert thread != threading.get_ident()
+        # the loop kept running while the call slept
+        assert ticks >= 5
+        # outside the loop it is a plain call
+        assert run_blocking(threading.get_ident) == threading.get_ident()
+
+
+@contextmanager
+def assert_max_queries(budget):
+    """Fail if the wrapped block issues more than `budget` SQL statements."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(statements) <= budget, f"{len(statements)} queries (budget {budget}):\n" + "\n".join(statements)
+
+
+class TestExpand:
+    # route -> maximum statements per request, independent of page size
+    QUERY_BUDGETS = {
+        "/franchises?limit=20&expand=branches": 2,
+        "/branches?limit=20&expand=franchise&franchise_id={franchise_id}": 1,
+        "/budgets?limit=20&expand=franchise,branch&franchise_id={franchise_id}": 1,
+        "/expenses?limit=20&expand=budget,franchise,branch&franchise_id={franchise_id}": 1,
+        "/franchises/{franchise_id}?expand=branches": 2,
+    }
+
+    @pytest.fixture(scope="class")
+    def populated(self):
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        for i in range(6):
+            branch_id = client.post("/branches", json={"name": f"Şube {i}", "city": "Antalya", "franchise_id": franchise_id}, headers=headers).json()["id"]
+            budget_id = client.post(
+                "/budgets", json={"franchise_id": franchise_id, "branch_id": branch_id, "period": "2025-08", "planned_amount": 100}, headers=headers
+            ).json()["id"]
+            client.post(
+                "/expenses",
+                json={"franchise_id": franchise_id, "branch_id": branch_id, "budget_id": budget_id, "date": "2025-08-01", "category": "Ops", "amount": 1},
+                headers=headers,
+            )
+        return headers, franchise_id
+
+    @pytest.mark.parametrize("route", list(QUERY_BUDGETS))
+    def test_route_stays_within_query_budget(self, populated, route):
+        headers, franchise_id = populated
+        with assert_max_queries(self.QUERY_BUDGETS[route]):
+            response = client.get(route.format(franchise_id=franchise_id), headers=headers)
+        assert response.status_code == 200
+
+    def test_expanded_payload(self, populated):
+        headers, franchise_id = populated
+        expenses = client.get("/expenses", params={"franchise_id": franchise_id, "expand": "budget,branch"}, headers=headers).json()
+        assert expenses[0]["budget"]["period"] == "2025-08"
+        assert expenses[0]["branch"]["city"] == "Antalya"
+        assert "franchise" not in expenses[0]
+
+        franchise = client.get(f"/franchises/{franchise_id}", params={"expand": "branches"}, headers=headers).json()
+        assert len(franchise["branches"]) == 6
+        plain = client.get(f"/franchises/{franchise_id}", headers=headers).json()
+        assert "branches" not in plain
+
+    def test_plain_lists_match_validated_detail_payloads(self, populated):
+        headers, franchise_id = populated
+        for route in ("/branches", "/budgets", "/expenses", "/franchises/{franchise_id}/branches"):
+            rows = client.get(route.format(franchise_id=franchise_id), params={"franchise_id": franchise_id}, headers=headers).json()
+            assert rows
+            detail_route = "/" + route.rsplit("/", 1)[-1]
+            for row in rows:
+                assert row == client.get(f"{detail_route}/{row['id']}", headers=headers).json()
+        franchise = client.get(f"/franchises/{franchise_id}", headers=headers).json()
+        assert client.get("/franchises", params={"search": franchise["tax_number"]}, headers=headers).json() == [franchise]
+
+    def test_unknown_expansion_is_rejected(self):
+        response = client.get("/budgets", params={"expand": "expenses"}, headers=auth_header())
+        assert response.status_code == 400
+
+
 class TestHealth:
     def test_health_check(self):
         response = client.get("/health")
         assert response.status_code == 200
         assert response.json()["status"] == "ok"
+
+    def test_pool_stats(self):
+        client.get("/franchises", headers=auth_header())
+        stats = client.get("/health/pool").json()["sync"]
+        assert stats["checkouts_total"] > 0
+        assert stats["checkout_timeouts_total"] == 0
+        assert {"pool_size", "overflow_in_use", "checkout_wait_seconds_max"} <= stats.keys()
+
+    def test_sqlite_pragmas_applied(self):
+        if engine.dialect.name != "sqlite":
+            pytest.skip("SQLite only")
+        from sqlalchemy import text
+        from app.database.database import SQLITE_WAL
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == ("wal" if SQLITE_WAL else "delete")
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+    def test_forked_worker_gets_its_own_pool(self):
+        if not hasattr(os, "fork"):
+            pytest.skip("fork only")
+        client.get("/health/pool")
+        parent_pool = engine.pool
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write_end, b"1" if engine.pool is not parent_pool else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        assert os.read(read_end, 1) == b"1"
+        assert engine.pool is parent_pool
+
+
+class TestMetrics:
+    def test_server_timing_and_route_template_labels(self):
+        import re
+        headers = auth_header()
+        franchise_id = create_test_franchise(headers)
+        response = client.get(f"/franchises/{franchise_id}", headers=headers)
+        timing = response.headers["server-timing"]
+        assert re.match(r'app;dur=[\d.]+, db;dur=[\d.]+, sql;desc="(\d+) statements, (\d+) rows"', timing)
+        statements, rows = map(int, re.search(r'"(\d+) statements, (\d+) rows"', timing).groups())
+        assert statements >= 1 and rows >= 1
+
+        client.get("/no-such-page")
+        body = client.get("/metrics").text
+        label = 'method="GET",route="/franchises/{franchise_id}",status="200"'
+        assert f"http_requests_total{{{label}}}" in body
+        assert f'http_request_duration_seconds_bucket{{{label},le="+Inf"}}' in body
+        assert re.search(rf"db_statements_total\{{{re.escape(label)}\}} [1-9]", body)
+        assert 'route="unmatched",status="404"' in body
+        assert f"/franchises/{franchise_id}\"" not in body
+
+    def test_slow_queries_logged_with_parameter_shapes(self, monkeypatch, caplog):
+        from app import metrics as metrics_module
+
+        monkeypatch.setattr(metrics_module, "SLOW_QUERY_MS", 0)
+        with caplog.at_level("WARNING", logger="app.slow_query"):
+            client.get("/franchises?search=SecretNeedle", headers=auth_header())
+        messages = [r.getMessage() for r in caplog.records if r.name == "app.slow_query"]
+        assert any("route=/franchises" in m and "params=(" in m for m in messages)
+        assert not any("SecretNeedle".lower() in m.lower() for m in messages)
+        assert metrics_module.parameter_shapes([(1, "a"), (2, "b")]) == "2 x (int, str)"
+        assert metrics_module.parameter_shapes({"ids": [1, 2, 3]}) == "{ids: list[3]}"
+
+    def test_failed_statements_leave_no_timing_state(self):
+        from sqlalchemy import text
+        from sqlalchemy.exc import OperationalError
+
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                conn.rollback()
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert "query_start" not in conn.info
+
+
+class TestMigrations:
+    def test_schema_is_at_head(self):
+        from app.bootstrap import check_schema_current, schema_revisions
+
+        current, head = schema_revisions()
+        assert current == head
+        check_schema_current()
+
+    def test_startup_check_fails_when_schema_is_behind(self, tmp_path):
+        from alembic import command
+        from sqlalchemy import create_engine
+        from app.bootstrap import SchemaOutOfDate, alembic_config, check_schema_current, migrate
+
+        # a throwaway database: downgrading drops tables and their rows
+        scratch = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+        try:
+            migrate(bind=scratch)
+            config = alembic_config()
+            with scratch.connect() as connection:
+                config.attributes["connection"] = connection
+                command.downgrade(config, "0001")
+            with pytest.raises(SchemaOutOfDate):
+                check_schema_current(scratch)
+            migrate(bind=scratch)
+            check_schema_current(scratch)
+        finally:
+            scratch.dispose()
+
+    def test_search_migration_backfills_existing_rows(self, tmp_path):
+        from sqlalchemy import create_engine, text
+        from app.bootstrap import migrate
+        from app.search import normalize
+
+        scratch = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+        try:
+            migrate("0003", bind=scratch)
+            with scratch.begin() as conn:
+                conn.execute(text("INSERT INTO franchises (id, name, tax_number) VALUES (1, 'İzmir Kahve', 'TR-1')"))
+                conn.execute(text("INSERT INTO branches (id, name, city, franchise_id) VALUES (1, 'Alsancak', 'İzmir', 1)"))
+            migrate(bind=scratch)
+            with scratch.connect() as conn:
+                entries = conn.execute(text("SELECT kind, ref_id, franchise_id, terms FROM search_entries ORDER BY kind")).all()
+        finally:
+            scratch.dispose()
+        assert [tuple(e) for e in entries] == [
+            ("branch", 1, 1, normalize("Alsancak İzmir")),
+            ("franchise", 1, 1, normalize("İzmir Kahve TR-1")),
+        ]
+
+    def test_expense_list_uses_composite_index(self):
+        if engine.dialect.name != "sqlite":
+            pytest.skip("SQLite query plan")
+        from sqlalchemy import text
+        with engine.connect() as conn:
+            plan = " ".join(str(row) for row in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM expenses WHERE franchise_id = 1 ORDER BY date DESC, id DESC LIMIT 50"
+            )))
+        assert "ix_expenses_franchise_date_id" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestSyntheticData:
+    def test_generator_is_deterministic_and_consistent(self, tmp_path):
+        import sqlite3
+        import subprocess
+        import sys
+
+        dumps = []
+        for name in ("a", "b"):
+            path = tmp_path / f"{name}.db"
+            subprocess.run(
+                [sys.executable, "seed.py", "--franchises", "5", "--branches", "12", "--budgets", "36", "--expenses", "400", "--seed", "3"],
+                env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"}, check=True, capture_output=True,
+            )
+            check = subprocess.run(
+                [sys.executable, "manage.py", "rollups", "check"],
+                env={**os.environ, "DATABASE_URL": f"sqlite:///{path}"}, capture_output=True,
+            )
+            assert check.returncode == 0, check.stdout
+            with sqlite3.connect(path) as conn:
+                assert conn.execute("SELECT count(*) FROM expenses").fetchone() == (400,)
+                assert conn.execute("SELECT count(DISTINCT period) FROM budgets").fetchone() == (3,)
+                # each budget's actual amount is the sum of its expenses
+                assert conn.execute(
+                    "SELECT count(*) FROM budgets b WHERE b.actual_amount != "
+                    "(SELECT round(sum(amount), 2) FROM expenses e WHERE e.budget_id = b.id)"
+                ).fetchone() == (0,)
+                dumps.append([conn.execute(f"SELECT * FROM {t} ORDER BY id").fetchall() for t in ("branches", "budgets", "expenses")])
+        assert dumps[0] == dumps[1]
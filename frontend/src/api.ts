@@ -11,6 +11,11 @@ export const setAuthToken = (token: string) => {
   api.defaults.headers.common["Authorization"] = `Bearer ${token}`;
 };
 
+// Create requests sent again with the same key get the first response back
+// instead of creating a duplicate; use one key per record being created.
+const idempotent = (key?: string) =>
+  key ? { headers: { "Idempotency-Key": key } } : undefined;
+
 // Auth API
 export const authAPI = {
   login: (username: string, password: string) =>
@@ -31,6 +36,7 @@ export const franchiseAPI = {
     is_active?: boolean;
     skip?: number;
     limit?: number;
+    cursor?: string;
   }) => api.get("/franchises", { params }),
   getStats: () => api.get("/franchises/stats"),
   getById: (id: number) => api.get(`/franchises/${id}`),
@@ -59,14 +65,29 @@ export const budgetAPI = {
     period?: string;
     skip?: number;
     limit?: number;
+    cursor?: string;
   }) => api.get("/budgets", { params }),
   getById: (id: number) => api.get(`/budgets/${id}`),
   getSummary: (id: number) => api.get(`/budgets/${id}/summary`),
-  create: (data: any) => api.post("/budgets", data),
+  summaryBatch: (scope: {
+    ids?: number[];
+    franchise_id?: number[];
+    period_from?: string;
+    period_to?: string;
+  }) => api.post("/budgets/summary:batch", scope),
+  create: (data: any, idempotencyKey?: string) =>
+    api.post("/budgets", data, idempotent(idempotencyKey)),
   update: (id: number, data: any) => api.put(`/budgets/${id}`, data),
   delete: (id: number) => api.delete(`/budgets/${id}`),
   approve: (id: number) => api.post(`/budgets/${id}/approve`),
   reject: (id: number) => api.post(`/budgets/${id}/reject`),
+  transition: (request: {
+    target: 'draft' | 'approved' | 'rejected' | 'closed';
+    ids?: number[];
+    franchise_id?: number;
+    period?: string;
+    status?: 'draft' | 'approved' | 'rejected' | 'closed';
+  }) => api.post('/budgets:transition', request),
 };
 
 // Expense API
@@ -77,8 +98,104 @@ export const expenseAPI = {
     budget_id?: number;
     skip?: number;
     limit?: number;
+    cursor?: string;
   }) => api.get("/expenses", { params }),
+  aggregate: (params: {
+    group_by?: string;
+    franchise_id?: number | number[];
+    branch_id?: number;
+    budget_id?: number;
+    from?: string;
+    to?: string;
+  }) =>
+    api.get("/expenses/aggregate", {
+      params,
+      // repeat franchise_id rather than franchise_id[]
+      paramsSerializer: { indexes: null },
+    }),
   getById: (id: number) => api.get(`/expenses/${id}`),
-  create: (data: any) => api.post("/expenses", data),
+  create: (data: any, idempotencyKey?: string) =>
+    api.post("/expenses", data, idempotent(idempotencyKey)),
   delete: (id: number) => api.delete(`/expenses/${id}`),
 };
+
+// Search API
+export const searchAPI = {
+  // typeahead over franchise and branch names; matching ignores case and accents
+  query: (q: string, params?: { kind?: "franchise" | "branch"; limit?: number }) =>
+    api.get("/search", { params: { q, ...params } }),
+};
+
+// Change feed
+export type ChangeEvent = {
+  seq: number;
+  franchise_id: number;
+  entity: "franchise" | "branch" | "budget" | "expense";
+  op: "created" | "updated" | "deleted";
+  id: number;
+  data: any | null;
+};
+
+export const eventsAPI = {
+  // follows GET /events, reconnecting and resuming from the last event seen;
+  // onReset means changes were missed for good and the view should refetch.
+  // Returns a function that stops the subscription.
+  subscribe: (
+    franchiseIds: number[],
+    onChange: (change: ChangeEvent) => void,
+    onReset?: () => void
+  ) => {
+    const controller = new AbortController();
+    let lastEventId: string | undefined;
+
+    const handle = (frame: string) => {
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("id: ")) lastEventId = line.slice(4);
+        else if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (event === "change") onChange(JSON.parse(data));
+      else if (event === "reset") onReset?.();
+    };
+
+    const connect = async () => {
+      const params = new URLSearchParams();
+      franchiseIds.forEach((id) => params.append("franchise_id", String(id)));
+      const headers: Record<string, string> = {
+        Authorization: String(api.defaults.headers.common["Authorization"] ?? ""),
+      };
+      if (lastEventId) headers["Last-Event-ID"] = lastEventId;
+      const response = await fetch(`${API_BASE_URL}/events?${params}`, {
+        headers,
+        signal: controller.signal,
+      });
+      if (!response.ok || !response.body) throw new Error(`events: ${response.status}`);
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) return;
+        buffer += value;
+        let end;
+        while ((end = buffer.indexOf("\n\n")) >= 0) {
+          handle(buffer.slice(0, end));
+          buffer = buffer.slice(end + 2);
+        }
+      }
+    };
+
+    (async () => {
+      while (!controller.signal.aborted) {
+        try {
+          await connect();
+        } catch {
+          if (controller.signal.aborted) return;
+          await new Promise((resolve) => setTimeout(resolve, 2000));
+        }
+      }
+    })();
+    return () => controller.abort();
+  },
+};
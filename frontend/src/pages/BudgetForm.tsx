@@ -25,6 +25,8 @@ export default function BudgetForm({ budgetId, onSuccess }: Props) {
     setValue,
   } = useForm<BudgetFormData>();
   const [loading, setLoading] = useState(false);
+  // one key per form, so a resubmit after a lost response can't create a second budget
+  const [idempotencyKey] = useState(() => crypto.randomUUID());
   const [franchises, setFranchises] = useState<any[]>([]);
   const [branches, setBranches] = useState<any[]>([]);
   const [selectedFranchise, setSelectedFranchise] = useState<number | "">("");
@@ -84,7 +86,7 @@ export default function BudgetForm({ budgetId, onSuccess }: Props) {
         await budgetAPI.update(budgetId, data);
         addToast("Budget updated successfully", "success");
       } else {
-        await budgetAPI.create(data);
+        await budgetAPI.create(data, idempotencyKey);
         addToast("Budget created successfully", "success");
       }
       onSuccess();